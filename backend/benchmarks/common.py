@@ -0,0 +1,97 @@
+"""
+Shared by the benchmark scripts: percentiles, the run environment, and
+the JSON result files that compare.py diffs.
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+RESULT_FORMAT = "safesurf-benchmark"
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending sequence (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(q / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize(seconds: List[float]) -> Dict[str, Any]:
+    """Latency summary in microseconds for per-call timings in seconds."""
+    values = sorted(seconds)
+    total = sum(values)
+    return {
+        "calls": len(values),
+        "meanUs": round(total / len(values) * 1e6, 3) if values else 0.0,
+        "p50Us": round(percentile(values, 50) * 1e6, 3),
+        "p95Us": round(percentile(values, 95) * 1e6, 3),
+        "p99Us": round(percentile(values, 99) * 1e6, 3),
+        "maxUs": round(values[-1] * 1e6, 3) if values else 0.0,
+        "opsPerSec": round(len(values) / total, 1) if total else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def environment() -> Dict[str, Any]:
+    """What a result depends on besides the code: interpreter, machine, settings."""
+    import numpy as np
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "settings": {k: v for k, v in sorted(os.environ.items()) if k.startswith("SAFESURF_")},
+    }
+
+
+def write_results(kind: str, results: Dict[str, Any], params: Dict[str, Any], output: str = "") -> str:
+    """Write {format, kind, createdAt, environment, params, results}; returns the path."""
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    document = {
+        "format": RESULT_FORMAT,
+        "kind": kind,
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": environment(),
+        "params": params,
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+    return output
+
+
+def read_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        document = json.load(f)
+    if document.get("format") != RESULT_FORMAT:
+        raise SystemExit(f"{path} is not a benchmark result file")
+    return document
+
+
+def add_backend_to_path() -> None:
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,93 @@
+"""
+Compare two benchmark result files of the same kind (micro or replay).
+
+    python backend/benchmarks/compare.py base.json new.json
+    python backend/benchmarks/compare.py base.json new.json --max-regression 0.10
+
+Prints every metric with its change. Exits with status 1 when a metric
+regressed by more than --max-regression (default 15%), so a detector or
+model change can be gated in CI. Latencies regress when they go up,
+throughput when it goes down. Compare runs from the same machine and
+settings: the environment block of each file says what they were.
+"""
+import os
+import sys
+from typing import Dict, Tuple
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.common import read_results  # noqa: E402
+
+# metric name -> True when higher is better
+Metrics = Dict[str, Tuple[float, bool]]
+
+
+def micro_metrics(results: Dict) -> Metrics:
+    metrics: Metrics = {}
+    for name, stats in results["benchmarks"].items():
+        metrics[f"{name} p50 us"] = (stats["p50Us"], False)
+        metrics[f"{name} p95 us"] = (stats["p95Us"], False)
+    return metrics
+
+
+def replay_metrics(results: Dict) -> Metrics:
+    metrics: Metrics = {}
+    for run in results["runs"]:
+        prefix = f"c={run['concurrency']}"
+        metrics[f"{prefix} req/s"] = (run["overall"]["throughputRps"], True)
+        for q in ("p50Ms", "p95Ms", "p99Ms"):
+            metrics[f"{prefix} {q[:3]} ms"] = (run["overall"][q], False)
+        for path, stats in run["paths"].items():
+            metrics[f"{prefix} {path} p95 ms"] = (stats["p95Ms"], False)
+    return metrics
+
+
+EXTRACTORS = {"micro": micro_metrics, "replay": replay_metrics}
+
+
+def compare(base: Dict, new: Dict, max_regression: float) -> int:
+    if base["kind"] != new["kind"]:
+        raise SystemExit(f"Cannot compare a {base['kind']} result with a {new['kind']} result")
+    extract = EXTRACTORS[base["kind"]]
+    old_metrics, new_metrics = extract(base["results"]), extract(new["results"])
+
+    for key in ("commit", "python", "machine", "cpus"):
+        a, b = base["environment"].get(key), new["environment"].get(key)
+        print(f"{key:<8} {a} -> {b}" if a != b else f"{key:<8} {a}")
+    print()
+
+    width = max((len(name) for name in old_metrics), default=10)
+    regressions = []
+    print(f"{'metric':<{width}}  {'base':>12}  {'new':>12}  {'change':>8}")
+    for name, (old, higher_is_better) in old_metrics.items():
+        if name not in new_metrics:
+            print(f"{name:<{width}}  {old:>12.2f}  {'-':>12}  {'missing':>8}")
+            continue
+        value = new_metrics[name][0]
+        change = (value - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > max_regression:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<{width}}  {old:>12.2f}  {value:>12.2f}  {change:>+8.1%}{flag}")
+
+    print()
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {max_regression:.0%}")
+        return 1
+    print(f"No metric regressed by more than {max_regression:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="allowed relative slowdown (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    sys.exit(compare(read_results(args.base), read_results(args.new), args.max_regression))
@@ -0,0 +1,223 @@
+"""
+Synthetic, labelled URL and email corpus for the benchmarks, and the
+request records load replay sends.
+
+    python backend/benchmarks/corpus.py --urls 5000 --emails 1000 --output traffic.jsonl
+    python backend/benchmarks/corpus.py --emails 20000 --emails-csv emails.csv   # train_email_model.py input
+
+Everything is derived from one seed, so two runs with the same arguments
+produce the same corpus. URLs mix what the extension sees: allowlisted
+sites, ordinary unknown sites, and phishing shapes (brand lookalikes,
+kit paths with long tokens, IP hosts, deep random subdomains). Emails
+mix newsletters and receipts with credential lures, and their links are
+drawn from the URL corpus of the matching label.
+
+A traffic file has one request per line, the format replay.py reads:
+    {"method": "POST", "path": "/analyze-url", "json": {"url": "..."}}
+"""
+import csv
+import json
+import os
+import random
+import sys
+from typing import Any, Dict, List
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.common import BACKEND_DIR  # noqa: E402
+
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
+
+WORDS = ["login", "verify", "secure", "update", "account", "signin", "wallet", "confirm", "billing", "unlock"]
+TLDS = ["com", "net", "org", "xyz", "top", "info", "online", "de", "io", "shop"]
+BENIGN_PATHS = ["", "/", "/about", "/news/2025/03/rates", "/blog/post-12", "/search?q=shoes",
+                "/cart?id=42", "/docs/getting-started", "/products/item-9931", "/careers"]
+FIRST_NAMES = ["anna", "omar", "li", "maria", "john", "sara", "yusuf", "emma", "noah", "mariam"]
+
+# Share of each request kind in generated traffic
+TRAFFIC_MIX = {"/analyze-url": 70, "/analyze-urls": 10, "/analyze-email": 15, "/analyze-page": 5}
+
+
+def _read_lines(name: str) -> List[str]:
+    with open(os.path.join(DATA_DIR, name), encoding="utf-8") as f:
+        return [line.strip().lower() for line in f if line.strip() and not line.startswith("#")]
+
+
+class Corpus:
+    """Generators over one random stream; same seed, same corpus."""
+
+    def __init__(self, seed: int = 7, phishing_share: float = 0.3):
+        self.rng = random.Random(seed)
+        self.phishing_share = phishing_share
+        self.trusted = _read_lines("trusted_domains.txt")
+        self.brands = [b.split(".")[0] for b in _read_lines("brands.txt")]
+
+    def _label(self, n: int) -> str:
+        return "".join(self.rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(n))
+
+    def _word_host(self) -> str:
+        rng = self.rng
+        parts = [rng.choice(["blue", "north", "city", "green", "open", "daily", "smart", "river"]),
+                 rng.choice(["shop", "news", "labs", "media", "travel", "books", "foods", "works"])]
+        return "".join(parts) + (str(rng.randint(1, 99)) if rng.random() < 0.2 else "")
+
+    def _typo(self, brand: str) -> str:
+        i = self.rng.randrange(len(brand))
+        return brand[:i] + self.rng.choice("01l-") + brand[i + 1:]
+
+    def benign_url(self) -> str:
+        rng = self.rng
+        if rng.random() < 0.5:
+            host = rng.choice(["", "www.", "mail.", "docs."]) + rng.choice(self.trusted)
+        else:
+            host = f"{rng.choice(['', 'www.'])}{self._word_host()}.{rng.choice(TLDS[:4] + ['de', 'io'])}"
+        return f"https://{host}{rng.choice(BENIGN_PATHS)}"
+
+    def phishing_url(self) -> str:
+        rng = self.rng
+        brand, word, tld = rng.choice(self.brands), rng.choice(WORDS), rng.choice(TLDS)
+        shape = rng.randrange(5)
+        if shape == 0:
+            return f"http://{self._typo(brand)}.{tld}/{word}"
+        if shape == 1:
+            return (f"http://{brand}-{word}.{tld}/{rng.choice(WORDS)}.php"
+                    f"?{word}=1&token={self._label(rng.randint(32, 80))}")
+        if shape == 2:
+            return (f"http://{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}."
+                    f"{rng.randint(1, 254)}/{word}/@{brand}")
+        if shape == 3:
+            return f"https://{brand}.{word}.{self._label(6)}.{self._label(5)}.{tld}/{word}/index.html"
+        return f"https://{self._label(rng.randint(8, 14))}.{tld}/{brand}/{word}?session={self._label(24)}"
+
+    def urls(self, n: int) -> List[Dict[str, Any]]:
+        out = []
+        for _ in range(n):
+            phishing = self.rng.random() < self.phishing_share
+            out.append({"url": self.phishing_url() if phishing else self.benign_url(), "label": int(phishing)})
+        return out
+
+    def email(self, phishing: bool) -> Dict[str, Any]:
+        rng = self.rng
+        name = rng.choice(FIRST_NAMES)
+        if phishing:
+            brand = rng.choice(self.brands)
+            sender = f"{rng.choice(['support', 'security', 'no-reply', 'billing'])}@{brand}-{rng.choice(WORDS)}.{rng.choice(TLDS)}"
+            subject = rng.choice([
+                f"Urgent: your {brand} account is suspended",
+                "Action required: verify now",
+                f"Unusual activity on your {brand} account",
+                "Payment failed - update your billing details",
+            ])
+            links = [self.phishing_url() for _ in range(rng.randint(1, 3))]
+            lines = [
+                f"Dear {name},",
+                "We detected unusual activity and your account will be suspended immediately "
+                "unless you confirm your account.",
+                *(f'<a href="{u}">Click here to verify</a>' for u in links),
+                "Failure to act within 24 hours will result in permanent closure.",
+            ]
+        else:
+            site = rng.choice(self.trusted)
+            sender = f"{rng.choice(['news', 'orders', 'team', name])}@{site}"
+            subject = rng.choice([
+                "Your weekly digest", f"Order #{rng.randint(10000, 99999)} has shipped",
+                "Meeting notes from Tuesday", "Your March statement is available",
+                f"{name.title()} shared a document with you",
+            ])
+            links = [self.benign_url() for _ in range(rng.randint(0, 6))]
+            lines = [
+                f"Hi {name},",
+                "Here is the summary you asked for. " * rng.randint(1, 8),
+                *(f'<a href="{u}">{u}</a>' for u in links),
+                "Thanks, and have a good week.",
+            ]
+        return {"sender": sender, "subject": subject, "body": "\n".join(lines), "label": int(phishing)}
+
+    def emails(self, n: int) -> List[Dict[str, Any]]:
+        return [self.email(self.rng.random() < self.phishing_share) for _ in range(n)]
+
+    def page(self) -> Dict[str, Any]:
+        rng = self.rng
+        phishing = rng.random() < self.phishing_share
+        url = self.phishing_url() if phishing else self.benign_url()
+        links = [self.benign_url() for _ in range(rng.randint(10, 150))]
+        if phishing:
+            links += [self.phishing_url() for _ in range(rng.randint(1, 5))]
+        forms = ([{"action": self.phishing_url(), "hasPassword": True}] if phishing
+                 else [{"action": url, "hasPassword": rng.random() < 0.1}])
+        return {
+            "url": url,
+            "title": "Sign in" if phishing else "Home",
+            "textSample": "Verify your account immediately." if phishing else "Latest news and offers.",
+            "hasPasswordForm": any(f["hasPassword"] for f in forms),
+            "links": links,
+            "forms": forms,
+        }
+
+    def traffic(self, n: int, mix: Dict[str, int] = TRAFFIC_MIX, batch_size: int = 32) -> List[Dict[str, Any]]:
+        """Request records in TRAFFIC_MIX proportions."""
+        paths, weights = list(mix), list(mix.values())
+        records = []
+        for _ in range(n):
+            path = self.rng.choices(paths, weights)[0]
+            if path == "/analyze-url":
+                body = {"url": self.urls(1)[0]["url"]}
+            elif path == "/analyze-urls":
+                body = {"urls": [u["url"] for u in self.urls(batch_size)]}
+            elif path == "/analyze-email":
+                email = self.email(self.rng.random() < self.phishing_share)
+                body = {k: email[k] for k in ("sender", "subject", "body")}
+            else:
+                body = self.page()
+            records.append({"method": "POST", "path": path, "json": body})
+        return records
+
+
+def read_traffic(path: str) -> List[Dict[str, Any]]:
+    """Request records from a traffic JSONL file (recorded or generated)."""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "path" not in record:
+                raise SystemExit(f"{path}: traffic records need a 'path' (and 'json' for POST)")
+            records.append({"method": record.get("method", "POST").upper(), "path": record["path"],
+                            "json": record.get("json")})
+    return records
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--phishing-share", type=float, default=0.3)
+    parser.add_argument("--requests", type=int, default=2000, help="traffic records for --output")
+    parser.add_argument("--output", help="traffic JSONL for replay.py")
+    parser.add_argument("--urls", type=int, default=5000)
+    parser.add_argument("--urls-csv", help="write url,label rows")
+    parser.add_argument("--emails", type=int, default=1000)
+    parser.add_argument("--emails-csv", help="write sender,subject,body,label rows")
+    args = parser.parse_args()
+
+    corpus = Corpus(args.seed, args.phishing_share)
+    if args.urls_csv:
+        with open(args.urls_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["url", "label"])
+            writer.writeheader()
+            writer.writerows(corpus.urls(args.urls))
+    if args.emails_csv:
+        with open(args.emails_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["sender", "subject", "body", "label"])
+            writer.writeheader()
+            writer.writerows(corpus.emails(args.emails))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for record in corpus.traffic(args.requests):
+                f.write(json.dumps(record) + "\n")
+    if not (args.urls_csv or args.emails_csv or args.output):
+        parser.error("nothing to write: pass --output, --urls-csv or --emails-csv")
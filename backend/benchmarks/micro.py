@@ -0,0 +1,151 @@
+"""
+Microbenchmarks of the detector hot paths, on the synthetic corpus.
+
+    python backend/benchmarks/micro.py                     # -> benchmarks/results/micro-<time>.json
+    python backend/benchmarks/micro.py --urls 2000 --output base.json
+    python backend/benchmarks/compare.py base.json benchmarks/results/micro-<time>.json
+
+Each call is timed on its own (perf_counter_ns), so the report has
+percentiles and not only a mean. For the sub-microsecond calls the
+timer's own ~0.1 us is part of the figure.
+
+- shannon_entropy, levenshtein: the url_detector helpers, on hosts and
+  (label, brand) pairs
+- analyze_url: the rule engine; "cold" clears the per-host caches before
+  every pass, "warm" repeats the pass with them filled
+- URLDetector.analyze: the model; "cold" clears the result and host
+  feature caches before every pass, "warm" hits the result cache.
+  URLDetector.analyze_batch is timed per URL in batches of --batch
+- analyze_email: keyword rules, and EmailDetector.analyze_batch when an
+  email model is trained
+"""
+import gc
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.common import summarize, write_results  # noqa: E402
+from benchmarks.corpus import Corpus  # noqa: E402
+
+
+def time_calls(fn: Callable[[Any], Any], inputs: Iterable[Any], before_pass: Callable[[], None] = None,
+               passes: int = 3) -> Dict[str, Any]:
+    """Per-call timings of fn over inputs, `passes` times; before_pass() runs untimed."""
+    inputs = list(inputs)
+    seconds: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(passes):
+            if before_pass is not None:
+                before_pass()
+            for item in inputs:
+                started = time.perf_counter_ns()
+                fn(item)
+                seconds.append((time.perf_counter_ns() - started) / 1e9)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return summarize(seconds)
+
+
+def time_batches(fn: Callable[[List[Any]], Any], inputs: List[Any], batch: int,
+                 before_pass: Callable[[], None] = None, passes: int = 3) -> Dict[str, Any]:
+    """Like time_calls, per item, for a function that takes a batch."""
+    batches = [inputs[i:i + batch] for i in range(0, len(inputs), batch)]
+    seconds: List[float] = []
+    for _ in range(passes):
+        if before_pass is not None:
+            before_pass()
+        for chunk in batches:
+            started = time.perf_counter_ns()
+            fn(chunk)
+            seconds.extend([(time.perf_counter_ns() - started) / 1e9 / len(chunk)] * len(chunk))
+    return summarize(seconds)
+
+
+def run(n_urls: int = 2000, n_emails: int = 500, batch: int = 32, passes: int = 3, seed: int = 7) -> Dict[str, Any]:
+    from urllib.parse import urlsplit
+
+    from detectors import suffix_list
+    from detectors.email_detector import analyze_email
+    from detectors.url_detector import HOST_SIGNALS, analyze_url, levenshtein, shannon_entropy
+    from detectors.url_features import HOST_FEATURE_CACHE
+    from detectors.url_ml_detector import URLDetector
+
+    corpus = Corpus(seed)
+    urls = [u["url"] for u in corpus.urls(n_urls)]
+    emails = corpus.emails(n_emails)
+    hosts = [urlsplit(u).hostname or "" for u in urls]
+    pairs = [(h.split(".")[0], corpus.rng.choice(corpus.brands)) for h in hosts]
+
+    suffix_list.warm_up()
+    started = time.perf_counter()
+    detector = URLDetector()
+    model_load_ms = (time.perf_counter() - started) * 1000
+
+    def clear_url_caches():
+        HOST_SIGNALS.clear()
+        HOST_FEATURE_CACHE.clear()
+        detector.cache.clear()
+
+    results: Dict[str, Any] = {}
+    results["shannon_entropy"] = time_calls(shannon_entropy, hosts, passes=passes)
+    results["levenshtein"] = time_calls(lambda pair: levenshtein(*pair), pairs, passes=passes)
+
+    results["analyze_url.cold"] = time_calls(analyze_url, urls, clear_url_caches, passes=passes)
+    results["analyze_url.warm"] = time_calls(analyze_url, urls, passes=passes)
+
+    results["URLDetector.analyze.cold"] = time_calls(detector.analyze, urls, clear_url_caches, passes=passes)
+    detector.analyze_batch(urls)
+    results["URLDetector.analyze.warm"] = time_calls(detector.analyze, urls, passes=passes)
+    results[f"URLDetector.analyze_batch{batch}.cold"] = time_batches(
+        detector.analyze_batch, urls, batch, clear_url_caches, passes=passes)
+
+    messages = [(e["sender"], e["subject"], e["body"]) for e in emails]
+    results["analyze_email"] = time_calls(lambda m: analyze_email(*m), messages, passes=passes)
+
+    try:
+        from detectors.email_ml_detector import EmailDetector
+        email_detector = EmailDetector()
+    except FileNotFoundError:
+        email_detector = None
+    if email_detector is not None:
+        results[f"EmailDetector.analyze_batch{batch}"] = time_batches(
+            email_detector.analyze_batch, messages, batch, passes=passes)
+
+    return {
+        "benchmarks": results,
+        "modelVersion": detector.version,
+        "modelLoadMs": round(model_load_ms, 1),
+        "emailModelVersion": email_detector.version if email_detector is not None else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Detector microbenchmarks")
+    parser.add_argument("--urls", type=int, default=2000)
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--passes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="", help="result file (default benchmarks/results/micro-<time>.json)")
+    args = parser.parse_args()
+
+    params = {"urls": args.urls, "emails": args.emails, "batch": args.batch, "passes": args.passes, "seed": args.seed}
+    results = run(args.urls, args.emails, args.batch, args.passes, args.seed)
+    path = write_results("micro", results, params, args.output)
+
+    width = max(len(name) for name in results["benchmarks"])
+    print(f"{'benchmark':<{width}}  {'p50 us':>10}  {'p95 us':>10}  {'p99 us':>10}  {'ops/s':>12}")
+    for name, stats in results["benchmarks"].items():
+        print(f"{name:<{width}}  {stats['p50Us']:>10.2f}  {stats['p95Us']:>10.2f}  {stats['p99Us']:>10.2f}"
+              f"  {stats['opsPerSec']:>12.1f}")
+    print(json.dumps({"model": results["modelVersion"], "results": path}))
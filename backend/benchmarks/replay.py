@@ -0,0 +1,164 @@
+"""
+Load replay: drive the FastAPI app in-process through httpx.ASGITransport
+at a fixed concurrency and report throughput and latency percentiles.
+
+    python backend/benchmarks/replay.py                             # synthetic traffic, concurrency 16
+    python backend/benchmarks/replay.py --traffic traffic.jsonl --concurrency 64 --duration 30
+    python backend/benchmarks/replay.py --concurrency 1,8,32       # one result per level
+
+Traffic is a JSONL file of request records ({"method", "path", "json"},
+see corpus.py) or, by default, generated from the synthetic corpus. The
+records are replayed in order, cycling until --requests or --duration
+is reached. The app runs its real lifespan (model load, warm-up) first.
+Before each run the in-memory caches are emptied (unless --keep-caches),
+then --warmup requests are sent and left out of the figures. Caches fill
+during the run as they would in service.
+
+Client and app share one process and one event loop. The figures show
+what the handlers, the detector pool and the pipeline cost, without
+network or uvicorn overhead. They are the in-process ceiling, not what a
+remote client sees. Settings come from SAFESURF_* variables as usual
+(e.g. SAFESURF_POOL_WORKERS, SAFESURF_CASCADE).
+"""
+import asyncio
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.common import percentile, write_results  # noqa: E402
+from benchmarks.corpus import Corpus, read_traffic  # noqa: E402
+
+
+def latency_summary(seconds: List[float], wall_seconds: float) -> Dict[str, Any]:
+    values = sorted(seconds)
+    return {
+        "requests": len(values),
+        "throughputRps": round(len(values) / wall_seconds, 1) if wall_seconds else 0.0,
+        "meanMs": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50Ms": round(percentile(values, 50) * 1000, 3),
+        "p95Ms": round(percentile(values, 95) * 1000, 3),
+        "p99Ms": round(percentile(values, 99) * 1000, 3),
+        "maxMs": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+async def replay(app, records: List[Dict[str, Any]], concurrency: int, requests: int = 0,
+                 duration: float = 0.0, warmup: int = 0) -> Dict[str, Any]:
+    """
+    Send records (cycled) with `concurrency` requests in flight. Stops
+    after `requests` requests or `duration` seconds, whichever is set.
+    """
+    import httpx
+
+    if not records:
+        raise SystemExit("No traffic to replay")
+    total = requests or (0 if duration else len(records))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://safesurf.bench", timeout=60) as client:
+
+        async def send(record: Dict[str, Any]) -> int:
+            response = await client.request(record["method"], record["path"], json=record["json"])
+            return response.status_code
+
+        for i in range(warmup):
+            await send(records[i % len(records)])
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        statuses: Dict[str, Counter] = defaultdict(Counter)
+        state = {"next": 0}
+        stop_at = time.perf_counter() + duration if duration else float("inf")
+
+        async def worker() -> None:
+            while True:
+                i = state["next"]
+                if (total and i >= total) or time.perf_counter() >= stop_at:
+                    return
+                state["next"] = i + 1
+                record = records[i % len(records)]
+                started = time.perf_counter()
+                try:
+                    status = await send(record)
+                except Exception as e:  # noqa: BLE001 - a failed request is a result, not a crash
+                    status = type(e).__name__
+                latencies[record["path"]].append(time.perf_counter() - started)
+                statuses[record["path"]][str(status)] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    every = [s for values in latencies.values() for s in values]
+    return {
+        "concurrency": concurrency,
+        "wallSeconds": round(wall, 3),
+        "overall": {**latency_summary(every, wall),
+                    "statuses": dict(sum(statuses.values(), Counter()))},
+        "paths": {
+            path: {**latency_summary(values, wall), "statuses": dict(statuses[path])}
+            for path, values in sorted(latencies.items())
+        },
+    }
+
+
+def clear_caches(main) -> None:
+    """Empty the in-memory verdict, model and host caches, so runs do not inherit each other's hits."""
+    from detectors.url_detector import HOST_SIGNALS
+    from detectors.url_features import HOST_FEATURE_CACHE
+
+    for cache in (main.verdict_cache, main.model_registry.current.cache, HOST_SIGNALS, HOST_FEATURE_CACHE):
+        cache.clear()
+
+
+async def run(records: List[Dict[str, Any]], levels: List[int], requests: int, duration: float,
+              warmup: int, cold: bool = True) -> Dict[str, Any]:
+    import main
+
+    # The real startup: model load happened at import, warm-up runs here
+    async with main.app.router.lifespan_context(main.app):
+        runs = []
+        for concurrency in levels:
+            if cold:
+                clear_caches(main)
+            runs.append(await replay(main.app, records, concurrency, requests, duration, warmup))
+        return {"runs": runs, "modelVersion": main.STARTUP.get("modelVersion"), "startup": dict(main.STARTUP)}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="In-process load replay")
+    parser.add_argument("--traffic", help="JSONL request records (default: synthetic, see corpus.py)")
+    parser.add_argument("--concurrency", default="16", help="requests in flight; comma-separated for several runs")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per run (0 with --duration)")
+    parser.add_argument("--duration", type=float, default=0.0, help="seconds per run instead of a request count")
+    parser.add_argument("--warmup", type=int, default=100, help="requests sent first and not measured")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep-caches", action="store_true",
+                        help="do not clear the verdict/model/host caches before each run")
+    parser.add_argument("--output", default="", help="result file (default benchmarks/results/replay-<time>.json)")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    requests = 0 if args.duration and args.requests == parser.get_default("requests") else args.requests
+    records = read_traffic(args.traffic) if args.traffic else Corpus(args.seed).traffic(max(requests, 2000))
+
+    results = asyncio.run(run(records, levels, requests, args.duration, args.warmup, not args.keep_caches))
+    params = {"traffic": args.traffic or f"synthetic(seed={args.seed})", "records": len(records),
+              "concurrency": levels, "requests": requests, "duration": args.duration, "warmup": args.warmup,
+              "cold": not args.keep_caches}
+    path = write_results("replay", results, params, args.output)
+
+    print(f"{'concurrency':>11}  {'path':<16}  {'req/s':>9}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}")
+    for result in results["runs"]:
+        rows = [("all", result["overall"])] + list(result["paths"].items())
+        for name, stats in rows:
+            print(f"{result['concurrency']:>11}  {name:<16}  {stats['throughputRps']:>9.1f}  {stats['p50Ms']:>8.2f}"
+                  f"  {stats['p95Ms']:>8.2f}  {stats['p99Ms']:>8.2f}")
+    print(json.dumps({"model": results["modelVersion"], "results": path}))
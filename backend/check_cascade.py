@@ -0,0 +1,191 @@
+"""
+Verdict agreement between the cascade (core.pipeline, default policy) and
+the full pipeline (every URL through the model), on a URL corpus.
+
+    python backend/check_cascade.py                       # built-in sample corpus
+    python backend/check_cascade.py gateway.csv --column link
+    python backend/check_cascade.py proxy.log.gz --low 0.05 --high 0.84
+
+Reports how many URLs skipped the model, per tier, how many verdicts got a
+different status, and the largest riskScore difference. Exits with
+status 1 when the status agreement is below --min-agreement or the
+riskScore difference is above --max-score-diff, so it can gate a policy
+change in CI.
+
+The same check on the sample corpus, with the default policy, runs
+under pytest (tests/test_cascade.py):
+
+    python -m pytest -q backend
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from core.cache import canonicalize_url  # noqa: E402
+from core.pipeline import DEFAULT_POLICY, FULL_PIPELINE, CascadePolicy, score_urls  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+BATCH_SIZE = 32
+
+# Skipped URLs get the hybrid score with ML at 0.5, not the model's score,
+# so riskScore moves (0.16 on the sample corpus); the status must not
+MIN_AGREEMENT = 0.999
+MAX_RISK_SCORE_DIFF = 0.2
+
+
+# ==============================
+# Corpus
+# ==============================
+
+def sample_corpus(size: int = 5000, seed: int = 7) -> List[str]:
+    """
+    Deterministic mix of what the extension sends: allowlisted sites,
+    unknown sites, brand lookalikes, phishing-kit paths and IP hosts,
+    plus the model holdout URLs.
+    """
+    rng = random.Random(seed)
+
+    def read_lines(name):
+        with open(os.path.join(DATA_DIR, name), encoding="utf-8") as f:
+            return [line.strip().lower() for line in f if line.strip() and not line.startswith("#")]
+
+    trusted = read_lines("trusted_domains.txt")
+    brands = [b.split(".")[0] for b in read_lines("brands.txt")]
+    words = ["login", "verify", "secure", "update", "account", "signin", "wallet", "confirm"]
+    tlds = ["com", "net", "org", "xyz", "top", "info", "online", "de", "io"]
+    paths = ["", "/", "/about", "/news/2025", "/blog/post-12", "/search?q=shoes", "/cart?id=42"]
+
+    def label(n):
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(n))
+
+    def typo(brand):
+        i = rng.randrange(len(brand))
+        return brand[:i] + rng.choice("01lI-") + brand[i + 1:]
+
+    makers = [
+        lambda: f"https://{rng.choice(['', 'www.', 'mail.'])}{rng.choice(trusted)}{rng.choice(paths)}",
+        lambda: f"{rng.choice(['http', 'https'])}://{label(rng.randint(5, 12))}.{rng.choice(tlds)}{rng.choice(paths)}",
+        lambda: f"http://{typo(rng.choice(brands))}.{rng.choice(tlds)}/{rng.choice(words)}",
+        lambda: f"http://{rng.choice(brands)}-{rng.choice(words)}.{rng.choice(tlds)}/{rng.choice(words)}.php"
+                f"?{rng.choice(words)}=1&token={label(60)}",
+        lambda: f"http://{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+                f"/{rng.choice(words)}/@{rng.choice(brands)}",
+        lambda: f"https://{label(4)}.{label(4)}.{label(6)}.{rng.choice(tlds)}/{rng.choice(words)}",
+    ]
+    weights = [40, 30, 10, 8, 4, 8]
+
+    urls = [rng.choices(makers, weights)[0]() for _ in range(size)]
+    with open(os.path.join(DATA_DIR, "model_holdout.csv"), encoding="utf-8") as f:
+        urls += [line.split(",")[0] for line in list(f)[1:]]
+    return urls
+
+
+def load_corpus(args) -> List[str]:
+    if not args.input:
+        return sample_corpus(args.size)
+    from scan_urls import detect_format, open_text, read_urls
+    with open_text(args.input) as f:
+        urls = [u for u in read_urls(f, args.format or detect_format(args.input), args.column, args.field) if u]
+    return urls[:args.size] if args.size else urls
+
+
+# ==============================
+# Comparison
+# ==============================
+
+def run(detector, keys: List[str], policy: CascadePolicy, urls: List[str]):
+    """Score urls (keyed by keys) in request-sized batches, every cache cold."""
+    from detectors.url_detector import HOST_SIGNALS
+    from detectors.url_features import HOST_FEATURE_CACHE
+
+    for cache in (detector.cache, HOST_SIGNALS, HOST_FEATURE_CACHE):
+        cache.clear()
+    verdicts = []
+    started = time.perf_counter()
+    for i in range(0, len(keys), BATCH_SIZE):
+        verdicts += score_urls(detector, keys[i:i + BATCH_SIZE], policy, urls=urls[i:i + BATCH_SIZE])
+    return verdicts, time.perf_counter() - started
+
+
+def distinct(urls: List[str]) -> Dict[str, str]:
+    """canonical key -> first spelling seen, which is what the API would score."""
+    sent: Dict[str, str] = {}
+    for url in urls:
+        sent.setdefault(canonicalize_url(url), url.strip())
+    return sent
+
+
+def compare(sent: Dict[str, str], policy: CascadePolicy) -> Dict[str, Any]:
+    from detectors import suffix_list
+    from detectors.url_ml_detector import URLDetector
+
+    suffix_list.warm_up()
+    detector = URLDetector()
+
+    keys, urls = list(sent), list(sent.values())
+    full, full_seconds = run(detector, keys, FULL_PIPELINE, urls)
+    cascade, cascade_seconds = run(detector, keys, policy, urls)
+
+    tiers = Counter(v["meta"].get("cascade", "ml") for v in cascade)
+    disagreements = []
+    max_diff = 0.0
+    for key, a, b in zip(keys, full, cascade):
+        max_diff = max(max_diff, abs(a["riskScore"] - b["riskScore"]))
+        if a["status"] != b["status"]:
+            disagreements.append({"key": key, "full": a["status"], "cascade": b["status"],
+                                  "tier": b["meta"].get("cascade"), "mlScore": a["meta"]["mlScore"]})
+
+    skipped = len(keys) - tiers["ml"]
+    return {
+        "urls": len(keys),
+        "policy": policy._asdict(),
+        "tiers": dict(tiers),
+        "modelCallsAvoided": skipped,
+        "modelCallsAvoidedPercent": round(100 * skipped / len(keys), 2) if keys else 0.0,
+        "statusAgreement": round(1 - len(disagreements) / len(keys), 6) if keys else 1.0,
+        "maxRiskScoreDiff": round(max_diff, 2),
+        "fullSeconds": round(full_seconds, 3),
+        "cascadeSeconds": round(cascade_seconds, 3),
+        "disagreements": disagreements[:20],
+    }
+
+
+def failures(report: Dict[str, Any], min_agreement: float = MIN_AGREEMENT,
+             max_score_diff: float = MAX_RISK_SCORE_DIFF) -> List[str]:
+    problems = []
+    if report["statusAgreement"] < min_agreement:
+        problems.append(f"status agreement {report['statusAgreement']} < {min_agreement}: {report['disagreements']}")
+    if report["maxRiskScoreDiff"] > max_score_diff:
+        problems.append(f"riskScore difference {report['maxRiskScoreDiff']} > {max_score_diff}")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare cascade verdicts with the full pipeline")
+    parser.add_argument("input", nargs="?", help="text/CSV/JSONL URL file, optionally .gz (default: sample corpus)")
+    parser.add_argument("--format", choices=("text", "csv", "jsonl"))
+    parser.add_argument("--column", default="url", help="CSV column name or 0-based index")
+    parser.add_argument("--field", default="url", help="JSONL field, dotted for nested objects")
+    parser.add_argument("--size", type=int, default=5000, help="sample size / max URLs read (0 = all)")
+    parser.add_argument("--low", type=float, default=DEFAULT_POLICY.low)
+    parser.add_argument("--high", type=float, default=DEFAULT_POLICY.high)
+    parser.add_argument("--no-trusted", action="store_true", help="send allowlisted hosts to the model too")
+    parser.add_argument("--min-agreement", type=float, default=MIN_AGREEMENT)
+    parser.add_argument("--max-score-diff", type=float, default=MAX_RISK_SCORE_DIFF)
+    args = parser.parse_args()
+
+    policy = CascadePolicy(True, not args.no_trusted, args.low, args.high)
+    report = compare(distinct(load_corpus(args)), policy)
+    print(json.dumps(report, indent=2))
+    problems = failures(report, args.min_agreement, args.max_score_diff)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if problems:
+        sys.exit(1)
@@ -0,0 +1,133 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from core.metrics import Histogram
+
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+WAIT_MS_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+# ==============================
+# Micro-Batching Scheduler
+# ==============================
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item requests into one batch call.
+
+    submit(key) parks the caller until its key is dispatched, which happens
+    when max_batch_size keys are queued or max_wait_ms after the first key
+    of the batch arrived, whichever comes first. The whole batch goes
+    through one batch_fn(keys) -> results call (e.g. one TF-IDF transform +
+    predict_proba), executed via runner (e.g. DetectorPool.run).
+
+    Single-flight: a key that is already queued or running is not queued
+    again; later callers await the same future. submit(key, item) sends
+    `item` to batch_fn in place of the key, so callers can carry data that
+    must not split the flight (the URL as sent, next to its canonical key).
+    The first caller's item is the one computed.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        runner: Callable[..., Awaitable[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+    ):
+        self.batch_fn = batch_fn
+        self.runner = runner
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+
+        self._queue: List[Tuple[Hashable, Any, float]] = []
+        self._in_flight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(WAIT_MS_BUCKETS)
+        self.submitted = 0
+        self.coalesced = 0
+
+    async def submit(self, key: Hashable, item: Any = None) -> Any:
+        self.submitted += 1
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._in_flight[key] = future
+        self._queue.append((key, key if item is None else item, time.perf_counter()))
+
+        if len(self._queue) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        # shield: one caller disconnecting must not cancel the shared result
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._queue:
+            return
+
+        batch, self._queue = self._queue, []
+
+        now = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, enqueued_at in batch:
+            self.wait_ms.observe((now - enqueued_at) * 1000.0)
+
+        task = asyncio.get_running_loop().create_task(
+            self._run([key for key, _, _ in batch], [item for _, item, _ in batch]))
+        # The loop only keeps a weak reference to tasks: hold it until it is done
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, keys: List[Hashable], items: List[Any]) -> None:
+        results: List[Any] = []
+        error: Optional[BaseException] = None
+        try:
+            results = await self.runner(self.batch_fn, items)
+        except Exception as e:
+            error = e
+        except BaseException as e:
+            # Cancelled (shutdown, a timeout around the runner): still settle the callers below
+            error = e
+            raise
+        finally:
+            # Every key leaves _in_flight, or later submits would join a future that never completes
+            for i, key in enumerate(keys):
+                future = self._in_flight.pop(key, None)
+                if future is None or future.done():
+                    continue
+                if error is None and i < len(results):
+                    future.set_result(results[i])
+                elif isinstance(error, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(error if isinstance(error, Exception)
+                                         else RuntimeError(f"Batch returned {len(results)} results for {len(keys)} keys"))
+                    # Mark retrieved: callers that already left must not trigger warnings
+                    future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxBatchSize": self.max_batch_size,
+            "maxWaitMs": self.max_wait * 1000.0,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "queued": len(self._queue),
+            "inFlight": len(self._in_flight),
+            "batchSize": self.batch_sizes.snapshot(),
+            "waitMs": self.wait_ms.snapshot(),
+        }
@@ -0,0 +1,141 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+
+_SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+# ==============================
+# URL Canonicalization
+# ==============================
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so equivalent spellings share one cache entry:
+    - missing scheme -> http:// (same as analyze_url)
+    - scheme and host lowercased, trailing dot and default port dropped
+    - bare "/" path dropped, fragment dropped (never sent to the server)
+    Path and query are kept as-is.
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+
+    if not _SCHEME_RE.match(url):
+        url = "http://" + url
+
+    try:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+
+        userinfo, _, hostport = parts.netloc.rpartition("@")
+        host, port = hostport, ""
+        if not hostport.endswith("]") and ":" in hostport:
+            host, _, port = hostport.rpartition(":")
+        host = host.lower().rstrip(".")
+        if port == _DEFAULT_PORTS.get(scheme):
+            port = ""
+
+        netloc = host + (":" + port if port else "")
+        if userinfo:
+            netloc = userinfo + "@" + netloc
+
+        path = "" if parts.path == "/" else parts.path
+        return urlunsplit((scheme, netloc, path, parts.query, ""))
+    except ValueError:
+        return url
+
+
+# ==============================
+# Bounded LRU + TTL Cache
+# ==============================
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a hard size bound and per-entry TTL.
+    Memory stays flat: the least recently used entry is evicted once
+    maxsize is reached, and expired entries are dropped when touched.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = max(int(maxsize), 1)
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (expires_at, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drop every entry for which predicate(key, value) is true."""
+        with self._lock:
+            stale = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for k in stale:
+                del self._data[k]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
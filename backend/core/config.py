@@ -0,0 +1,170 @@
+import os
+
+
+# ==============================
+# Helpers
+# ==============================
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_str(name: str, default: str) -> str:
+    return os.environ.get(name, default)
+
+
+# ==============================
+# Verdict Cache
+# ==============================
+
+# Merged /analyze-url verdicts, keyed on the canonical URL
+VERDICT_CACHE_SIZE = env_int("SAFESURF_VERDICT_CACHE_SIZE", 50000)
+VERDICT_CACHE_TTL = env_float("SAFESURF_VERDICT_CACHE_TTL", 3600.0)
+
+# URLDetector (ML half) results
+ML_CACHE_SIZE = env_int("SAFESURF_ML_CACHE_SIZE", 50000)
+ML_CACHE_TTL = env_float("SAFESURF_ML_CACHE_TTL", 3600.0)
+
+# Host-derived features (allowlist, IP, entropy, brand, typosquatting,
+# tldextract, TLD), keyed by hostname: every URL on a host shares one entry.
+# Hosts repeat far more than URLs, so the bound is larger and entries live longer
+HOST_CACHE_SIZE = env_int("SAFESURF_HOST_CACHE_SIZE", 100000)
+HOST_CACHE_TTL = env_float("SAFESURF_HOST_CACHE_TTL", 6 * 3600.0)
+
+
+# Optional on-disk verdict store (SQLite, WAL) shared by every worker on
+# the node and kept across restarts; empty = disabled
+VERDICT_STORE_PATH = env_str("SAFESURF_VERDICT_STORE_PATH", "")
+VERDICT_STORE_TTL = env_float("SAFESURF_VERDICT_STORE_TTL", 86400.0)
+
+
+# ==============================
+# Email links (detectors/email_links.py)
+# ==============================
+
+# Characters of an email body analyzed (keywords and links); the rest is ignored
+EMAIL_MAX_BODY_CHARS = env_int("SAFESURF_EMAIL_MAX_BODY_CHARS", 200000)
+# Distinct links per email sent through the URL pipeline
+EMAIL_MAX_LINKS = env_int("SAFESURF_EMAIL_MAX_LINKS", 50)
+# Time allowed for scoring the links of one request (one email, or one
+# /analyze-emails batch); links not scored by then are left out of the verdict
+EMAIL_LINK_BUDGET_MS = env_float("SAFESURF_EMAIL_LINK_BUDGET_MS", 250.0)
+# Messages per /analyze-emails request
+EMAIL_MAX_BATCH = env_int("SAFESURF_EMAIL_MAX_BATCH", 100)
+
+
+# ==============================
+# Cascade (core/pipeline.py)
+# ==============================
+
+# Skip the URL model when the rule engine already settles the verdict
+CASCADE_ENABLED = env_int("SAFESURF_CASCADE", 1) == 1
+CASCADE_SKIP_TRUSTED = env_int("SAFESURF_CASCADE_SKIP_TRUSTED", 1) == 1
+# Rule score <= LOW -> safe without ML (-1 = never); >= HIGH -> high_risk
+# without ML (0.84 is the lowest score where ML can't change the outcome).
+# Check a new LOW against real traffic with check_cascade.py first.
+CASCADE_LOW = env_float("SAFESURF_CASCADE_LOW", 0.0)
+CASCADE_HIGH = env_float("SAFESURF_CASCADE_HIGH", 0.84)
+
+
+# ==============================
+# Detector Worker Pool
+# ==============================
+
+# Threads; more cores are used by running more workers (serve.py)
+POOL_WORKERS = env_int("SAFESURF_POOL_WORKERS", min(os.cpu_count() or 1, 8))
+# Jobs allowed to wait for a free worker before requests get a 503
+POOL_QUEUE_DEPTH = env_int("SAFESURF_POOL_QUEUE_DEPTH", 64)
+
+
+# ==============================
+# Micro-Batching
+# ==============================
+
+# Concurrent /analyze-url requests are coalesced into one model call
+BATCH_MAX_SIZE = env_int("SAFESURF_BATCH_MAX_SIZE", 32)
+BATCH_MAX_WAIT_MS = env_float("SAFESURF_BATCH_MAX_WAIT_MS", 2.0)
+
+
+# ==============================
+# Allowlist / Brands
+# ==============================
+
+# Extra domain lists loaded on top of backend/data/*.txt at startup
+ALLOWLIST_PATH = env_str("SAFESURF_ALLOWLIST_PATH", "")
+BRANDS_PATH = env_str("SAFESURF_BRANDS_PATH", "")
+
+
+# ==============================
+# Page analysis (/analyze-page)
+# ==============================
+
+# Distinct links per page kept for scoring, highest priority first
+PAGE_MAX_LINKS = env_int("SAFESURF_PAGE_MAX_LINKS", 200)
+# Per request, from arrival: links not scored by then are left out (partial result)
+PAGE_LINK_BUDGET_MS = env_float("SAFESURF_PAGE_LINK_BUDGET_MS", 300.0)
+
+
+# ==============================
+# Streaming (/analyze-stream)
+# ==============================
+
+# A chunk (one detector-pool job) closes at this many records or bytes of input
+STREAM_CHUNK_RECORDS = env_int("SAFESURF_STREAM_CHUNK_RECORDS", 256)
+STREAM_CHUNK_BYTES = env_int("SAFESURF_STREAM_CHUNK_BYTES", 1048576)
+# Chunks per stream being scored at once; the body is not read further meanwhile
+STREAM_MAX_IN_FLIGHT = env_int("SAFESURF_STREAM_MAX_IN_FLIGHT", 4)
+# Longer lines are answered with an error record and not buffered
+STREAM_MAX_RECORD_BYTES = env_int("SAFESURF_STREAM_MAX_RECORD_BYTES", 1048576)
+
+
+# ==============================
+# Reputation (detectors/reputation.py)
+# ==============================
+
+# Compiled threat-intel store directory; empty = no reputation stage
+REPUTATION_PATH = env_str("SAFESURF_REPUTATION_PATH", "")
+# How often workers look for a new manifest (feed updates, compactions)
+REPUTATION_CHECK_SECONDS = env_float("SAFESURF_REPUTATION_CHECK_SECONDS", 5.0)
+
+
+# ==============================
+# Domain filter (GET /domain-filter)
+# ==============================
+
+# Target false-positive rate of the trusted / known-bad Bloom filters
+FILTER_FP_RATE = env_float("SAFESURF_FILTER_FP_RATE", 0.001)
+# Versions kept per worker to answer ?since= with a delta
+FILTER_HISTORY = env_int("SAFESURF_FILTER_HISTORY", 8)
+
+
+# ==============================
+# Model Registry
+# ==============================
+
+# URL model artifact directory (default: backend/models/url_ml_model)
+URL_MODEL_PATH = env_str("SAFESURF_URL_MODEL_PATH", "")
+# Email model artifact directory (default: backend/models/email_ml_model);
+# /analyze-email runs on the keyword rules alone while there is none
+EMAIL_MODEL_PATH = env_str("SAFESURF_EMAIL_MODEL_PATH", "")
+
+# Holdout sample a new model must pass before it is swapped in
+MODEL_HOLDOUT_PATH = env_str(
+    "SAFESURF_MODEL_HOLDOUT_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "model_holdout.csv")),
+)
+MODEL_MIN_ACCURACY = env_float("SAFESURF_MODEL_MIN_ACCURACY", 0.75)
+# Poll the model files every N seconds and hot-reload on change (0 = off)
+MODEL_WATCH_SECONDS = env_float("SAFESURF_MODEL_WATCH_SECONDS", 0.0)
+# Required in X-Admin-Token for /admin/*; unset = admin endpoints disabled
+ADMIN_TOKEN = env_str("SAFESURF_ADMIN_TOKEN", "")
@@ -0,0 +1,90 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class PoolSaturated(Exception):
+    """Raised when the detector pool already holds workers + queue_depth jobs."""
+
+
+# ==============================
+# Detector Worker Pool
+# ==============================
+
+class DetectorPool:
+    """
+    Runs CPU-bound detector work (rule engine, TF-IDF, predict_proba,
+    levenshtein loops) off the asyncio event loop, on threads that share
+    the process' model, caches, registry and metrics. For more cores, run
+    more server processes (serve.py) rather than a process pool: jobs
+    fill the parent's caches and follow its model reloads.
+
+    At most workers + queue_depth jobs are admitted at once. Anything
+    beyond that is rejected immediately with PoolSaturated instead of
+    queueing without bound, so latency stays flat under overload.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        queue_depth: int = 64,
+        initializer: Optional[Callable[[], None]] = None,
+    ):
+        self.workers = max(int(workers), 1)
+        self.queue_depth = max(int(queue_depth), 0)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="detector",
+            initializer=initializer,
+        )
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_depth
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise PoolSaturated(f"{self.in_flight} detector jobs in flight (capacity {self.capacity})")
+            self.in_flight += 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) on the pool and await its result."""
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queueDepth": self.queue_depth,
+            "inFlight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
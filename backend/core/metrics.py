@@ -0,0 +1,198 @@
+import bisect
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+# ==============================
+# Histogram
+# ==============================
+
+class Histogram:
+    """
+    Fixed-bucket histogram (cumulative, Prometheus-style "le" buckets).
+    observe() is O(log buckets) and allocation-free.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = sorted(float(b) for b in buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot = +Inf
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            count, total = self.count, self.sum
+
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, n in zip(self.buckets, counts):
+            running += n
+            cumulative[f"{bound:g}"] = running
+        cumulative["+Inf"] = count
+
+        return {
+            "buckets": cumulative,
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6) if count else 0.0,
+        }
+
+
+# ==============================
+# Counter
+# ==============================
+
+class Counter:
+    """Monotonic counter; inc() is a lock + add."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+# ==============================
+# Labelled families + Prometheus text
+# ==============================
+
+Labels = Tuple[str, ...]
+
+# Seconds: 10 us .. 1 s, wide enough for one rule pass up to a full batch
+STAGE_SECONDS_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0,
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Family:
+    """One metric name with label values -> child (Counter / Histogram)."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], factory: Callable[[], Any]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Labels, Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Any:
+        """
+        Child for these label values. Hot paths should bind the child once
+        (RULES = STAGE_SECONDS.labels("rules")) and skip this lookup.
+        """
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def children(self) -> List[Tuple[Labels, Any]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics rendered in the Prometheus text format (0.0.4).
+    Counters/histograms are updated in place on the request path; gauges
+    are callbacks evaluated only when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._counters: List[_Family] = []
+        self._histograms: List[_Family] = []
+        self._gauges: List[Tuple[str, str, str, Sequence[str], Callable[[], Iterable[Tuple[Labels, float]]]]] = []
+        self._external: List[Tuple[str, str, Sequence[str], Callable[[], Iterable[Tuple[Labels, Histogram]]]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> _Family:
+        family = _Family(name, help, labelnames, Counter)
+        self._counters.append(family)
+        return family
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = STAGE_SECONDS_BUCKETS) -> _Family:
+        family = _Family(name, help, labelnames, lambda: Histogram(buckets))
+        self._histograms.append(family)
+        return family
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str],
+              collect: Callable[[], Iterable[Tuple[Labels, float]]], kind: str = "gauge") -> None:
+        """collect() -> [(label values, value)]; kind="counter" for totals kept elsewhere."""
+        self._gauges.append((name, help, kind, tuple(labelnames), collect))
+
+    def external_histograms(self, name: str, help: str, labelnames: Sequence[str],
+                            collect: Callable[[], Iterable[Tuple[Labels, Histogram]]]) -> None:
+        """Expose Histogram objects owned by other components (e.g. MicroBatcher)."""
+        self._external.append((name, help, tuple(labelnames), collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        for family in self._counters:
+            lines += [f"# HELP {family.name} {family.help}", f"# TYPE {family.name} counter"]
+            for values, counter in family.children():
+                lines.append(f"{family.name}{_label_text(family.labelnames, values)} {_number(counter.value)}")
+
+        for family in self._histograms:
+            self._render_histogram(lines, family.name, family.help, family.labelnames, family.children())
+
+        for name, help, labelnames, collect in self._external:
+            self._render_histogram(lines, name, help, labelnames, collect())
+
+        for name, help, kind, labelnames, collect in self._gauges:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for values, value in collect():
+                lines.append(f"{name}{_label_text(labelnames, values)} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(lines: List[str], name: str, help: str, labelnames: Sequence[str],
+                          children: Iterable[Tuple[Labels, Histogram]]) -> None:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+        for values, histogram in children:
+            snap = histogram.snapshot()
+            for bound, count in snap["buckets"].items():
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_label_text(labelnames, values, le)} {count}")
+            lines.append(f"{name}_sum{_label_text(labelnames, values)} {_number(float(snap['sum']))}")
+            lines.append(f"{name}_count{_label_text(labelnames, values)} {snap['count']}")
+
+
+# Shared by the detectors and main.py; rendered on GET /metrics
+METRICS = MetricsRegistry()
+
+# Pipeline stages. rules/merge are per URL; features, tldextract, vectorize
+# and predict_proba are per URLDetector batch
+STAGE_SECONDS = METRICS.histogram(
+    "safesurf_stage_seconds", "Time spent per detection pipeline stage call", ("stage",),
+)
@@ -0,0 +1,179 @@
+import csv
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("safesurf.models")
+
+
+class ModelValidationError(Exception):
+    """A candidate model failed the holdout check and was not activated."""
+
+
+# ==============================
+# Helpers
+# ==============================
+
+def read_holdout(path: str) -> List[Tuple[str, int]]:
+    """CSV with url,label columns; label is phishing/legitimate (or 1/0)."""
+    if not path or not os.path.exists(path):
+        return []
+    samples = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            label = str(row.get("label", "")).strip().lower()
+            samples.append((row.get("url", ""), 1 if label in ("phishing", "1", "malicious") else 0))
+    return samples
+
+
+def holdout_accuracy(detector: Any, samples: List[Tuple[str, int]]) -> float:
+    """Accuracy of the raw model (p >= 0.5) on the holdout sample."""
+    urls = [url for url, _ in samples]
+    labels = np.array([label for _, label in samples])
+    probs = np.asarray(detector.model.predict_proba(detector.vectorizer.transform(urls)))[:, 1]
+    if probs.shape != labels.shape or not np.all(np.isfinite(probs)) \
+            or probs.min() < 0.0 or probs.max() > 1.0:
+        raise ModelValidationError("Model returned invalid probabilities on the holdout sample")
+    return float(np.mean((probs >= 0.5) == labels))
+
+
+# ==============================
+# Model Registry
+# ==============================
+
+class ModelRegistry:
+    """
+    Holds the active URLDetector and swaps in new ones without a restart.
+
+    reload() builds a candidate with loader() in the calling thread,
+    validates it on the holdout sample and only then replaces the active
+    detector (a single reference assignment, so requests see either the
+    old or the new model, never a mix). Batches already running keep the
+    detector they started with. on_swap(old_version, new_version) lets the
+    caller invalidate cached verdicts of the old model.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Any],
+        holdout: Iterable[Tuple[str, int]] = (),
+        min_accuracy: float = 0.0,
+        on_swap: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.loader = loader
+        self.holdout = list(holdout)
+        self.min_accuracy = float(min_accuracy)
+        self.on_swap = on_swap
+
+        self._lock = threading.Lock()
+        self._reloading = threading.Lock()
+        self._watch_stop = threading.Event()
+
+        self._current = loader()
+        self.loaded_at = time.time()
+        self.last_error: Optional[str] = None
+        self.history: List[Dict[str, Any]] = []
+
+    @property
+    def current(self) -> Any:
+        return self._current
+
+    @property
+    def version(self) -> str:
+        return self._current.version
+
+    def reload(self) -> Dict[str, Any]:
+        """Load, validate and activate a new model. Raises on failure."""
+        if not self._reloading.acquire(blocking=False):
+            raise RuntimeError("A model reload is already in progress")
+        return self._reload_holding_lock()
+
+    def _reload_holding_lock(self) -> Dict[str, Any]:
+        """reload() once the caller holds _reloading; releases it."""
+        started = time.perf_counter()
+        try:
+            candidate = self.loader()
+            accuracy = holdout_accuracy(candidate, self.holdout) if self.holdout else None
+            if accuracy is not None and accuracy < self.min_accuracy:
+                raise ModelValidationError(
+                    f"Holdout accuracy {accuracy:.3f} below minimum {self.min_accuracy:.3f}"
+                )
+
+            with self._lock:
+                old_version = self._current.version
+                self._current = candidate
+                self.loaded_at = time.time()
+                self.last_error = None
+
+            if self.on_swap and old_version != candidate.version:
+                self.on_swap(old_version, candidate.version)
+
+            event = {
+                "from": old_version,
+                "to": candidate.version,
+                "holdoutAccuracy": accuracy,
+                "reloadMs": round((time.perf_counter() - started) * 1000, 1),
+                "at": self.loaded_at,
+            }
+            self.history = (self.history + [event])[-10:]
+            return event
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._reloading.release()
+
+    def reload_in_background(self) -> bool:
+        """Start reload() on a background thread; False if one is running."""
+        # Taken here and handed to the thread, so two callers cannot both be told "started"
+        if not self._reloading.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self._reload_holding_lock()
+            except Exception:
+                logger.exception("Model reload failed")
+
+        threading.Thread(target=run, name="model-reload", daemon=True).start()
+        return True
+
+    def watch(self, paths: Iterable[str], interval: float) -> None:
+        """Poll the artifact files' mtimes and reload when they change."""
+        paths = list(paths)
+
+        def snapshot():
+            return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in paths)
+
+        def run():
+            last = snapshot()
+            while not self._watch_stop.wait(interval):
+                current = snapshot()
+                if current != last:
+                    last = current
+                    # let the writer finish before loading
+                    time.sleep(min(interval, 1.0))
+                    try:
+                        self.reload()
+                    except Exception:
+                        logger.exception("Model reload after a file change failed")
+
+        threading.Thread(target=run, name="model-watch", daemon=True).start()
+
+    def stop_watch(self) -> None:
+        self._watch_stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "version": self._current.version,
+            "backend": self._current.manifest.get("backend"),
+            "format": self._current.manifest.get("format"),
+            "loadedAt": self.loaded_at,
+            "reloading": self._reloading.locked(),
+            "lastError": self.last_error,
+            "history": self.history,
+        }
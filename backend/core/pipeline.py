@@ -0,0 +1,266 @@
+"""
+The /analyze-url decision pipeline without the web layer: reputation +
+rules + URLDetector + merge. main.py serves it over HTTP; scan_urls.py
+runs it over log files. Both produce identical verdicts.
+
+Reputation: URLs whose canonical URL, host or parent domain is in the
+threat-intel store (detectors/reputation.py) are high_risk at once; no
+rules, no model.
+
+Cascade: the rule engine runs first. The model only runs for URLs the
+rules leave undecided. The hybrid score is 60% rules + 40% ML, and ML
+confidence is never below 50 (URLDetector's confidence is a sigmoid of
+a non-negative risk). So with rule score r the final score lies in
+[0.6r + 0.2, 0.6r + 0.396]:
+- r >= 0.84 is high_risk whatever the model says (exact).
+- Trusted domains and r = 0 (CASCADE_LOW) are safe unless the model is
+  at least 98.5% confident. check_cascade.py measures how often that
+  happens on a corpus.
+"""
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from core.config import CASCADE_ENABLED, CASCADE_HIGH, CASCADE_LOW, CASCADE_SKIP_TRUSTED
+from core.metrics import METRICS, STAGE_SECONDS
+from detectors.reputation import REPUTATION, ReputationMatch
+from detectors.url_detector import analyze_url
+
+REPUTATION_SECONDS = STAGE_SECONDS.labels("reputation")
+RULES_SECONDS = STAGE_SECONDS.labels("rules")
+MERGE_SECONDS = STAGE_SECONDS.labels("merge")
+
+REPUTATION_HITS = METRICS.counter(
+    "safesurf_reputation_hits_total", "URLs listed in a threat-intel feed", ("source", "kind"),
+)
+
+CASCADE_URLS = METRICS.counter(
+    "safesurf_cascade_urls_total",
+    "URLs scored, by cascade tier (ml = reached the model; others skipped it)", ("tier",),
+)
+MODEL_CALLS_AVOIDED = METRICS.counter(
+    "safesurf_model_calls_avoided_total", "Batches the rules settled entirely (no model call)",
+).labels()
+
+# URLDetector confidence never drops below 50%
+ML_SCORE_FLOOR = 0.5
+
+RuleResult = Tuple[float, str, List[str]]
+
+
+class CascadePolicy(NamedTuple):
+    enabled: bool = True
+    skip_trusted: bool = True
+    low: float = 0.0    # rule score <= low -> safe without ML (-1 = off)
+    high: float = 0.84  # rule score >= high -> high_risk without ML (> 0.99 = off)
+
+
+DEFAULT_POLICY = CascadePolicy(CASCADE_ENABLED, CASCADE_SKIP_TRUSTED, CASCADE_LOW, CASCADE_HIGH)
+FULL_PIPELINE = CascadePolicy(enabled=False)
+
+
+def hybrid_status(final_score: float) -> str:
+    if final_score >= 0.7:
+        return "high_risk"
+    if final_score >= 0.4:
+        return "low_risk"
+    return "safe"
+
+
+def merge_url_results(
+    rule_score: float,
+    rule_status: str,
+    rule_reasons: List[str],
+    ml_pred: str,
+    ml_confidence: float,
+    model_version: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Merge Rule-based + ML into one final result for the frontend.
+    - riskScore: 0..0.99
+    - status: safe | low_risk | high_risk
+    - reasons: combined explainable list
+    """
+
+    # Convert ML confidence (0..100) to 0..0.99 scale
+    ml_score = round(min(max(ml_confidence, 0.0) / 100.0, 0.99), 2)
+
+    # Hybrid score (adjust weights as you like)
+    # rules more explainable -> 60%, ML -> 40%
+    final_score = round(min((rule_score * 0.6) + (ml_score * 0.4), 0.99), 2)
+
+    # Decide status using final_score
+    final_status = hybrid_status(final_score)
+
+    # Build reasons (keep it clean, not too long)
+    reasons: List[str] = []
+
+    # Add rule reasons first (most explainable)
+    if rule_reasons:
+        reasons.extend(rule_reasons[:6])
+
+    # Add ML summary
+    pred_label = "phishing" if str(ml_pred).lower() in ["phishing", "malicious", "1", "true"] else "legitimate"
+    reasons.append(f"ML prediction: {pred_label}")
+    reasons.append(f"ML confidence: {round(ml_confidence, 1)}%")
+
+    # Add final explanation
+    reasons.append(f"Hybrid score = 60% rules + 40% ML")
+
+    return {
+        "riskScore": final_score,
+        "status": final_status,
+        "reasons": reasons,
+        "meta": {  # optional: extra info (frontend can ignore)
+            "ruleScore": rule_score,
+            "ruleStatus": rule_status,
+            "mlScore": ml_score,
+            "mlPrediction": pred_label,
+            "mlConfidence": ml_confidence,
+            "modelVersion": model_version,
+        },
+    }
+
+
+def reputation_verdict(match: ReputationMatch) -> Dict[str, Any]:
+    listed = "URL" if match.kind == "url" else "domain"
+    return {
+        "riskScore": 0.99,
+        "status": "high_risk",
+        "reasons": [f"Known phishing {listed} ({match.source} feed): {match.value}"],
+        "meta": {
+            "ruleScore": None,
+            "ruleStatus": None,
+            "mlScore": None,
+            "mlPrediction": None,
+            "mlConfidence": None,
+            "modelVersion": None,
+            "reputation": match._asdict(),
+        },
+    }
+
+
+def reputation_verdicts(keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Verdicts for the canonical URLs that a feed lists; the rest are absent."""
+    started = time.perf_counter()
+    matches = REPUTATION.lookup_many(keys)
+    REPUTATION_SECONDS.observe(time.perf_counter() - started)
+
+    verdicts = {}
+    for key, match in zip(keys, matches):
+        if match is not None:
+            REPUTATION_HITS.labels(match.source, match.kind).inc()
+            verdicts[key] = reputation_verdict(match)
+    return verdicts
+
+
+def run_rules(url: str) -> RuleResult:
+    started = time.perf_counter()
+    result = analyze_url(url)
+    RULES_SECONDS.observe(time.perf_counter() - started)
+    return result
+
+
+def decisive_tier(rules: RuleResult, policy: CascadePolicy) -> Optional[str]:
+    """Why the model can be skipped for this rule result, or None."""
+    if not policy.enabled:
+        return None
+    rule_score, _, rule_reasons = rules
+    if policy.skip_trusted and rule_reasons == ["Trusted domain"]:
+        return "trusted"
+    if rule_score >= policy.high:
+        return "rules_high"
+    if rule_score <= policy.low:
+        return "rules_low"
+    return None
+
+
+def rules_only_verdict(rules: RuleResult, tier: str, model_version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Verdict when the cascade skipped the model: the hybrid formula with
+    the lowest ML score the model can give, so the score sits in the same
+    range (and status) the full pipeline would produce. model_version is
+    the active model's: the skip relies on its score range, and a reload
+    invalidates cached verdicts by this field.
+    """
+    rule_score, rule_status, rule_reasons = rules
+    final_score = round(min((rule_score * 0.6) + (ML_SCORE_FLOOR * 0.4), 0.99), 2)
+
+    reasons = list(rule_reasons[:6])
+    reasons.append("ML skipped: rule engine is decisive")
+
+    return {
+        "riskScore": final_score,
+        "status": hybrid_status(final_score),
+        "reasons": reasons,
+        "meta": {
+            "ruleScore": rule_score,
+            "ruleStatus": rule_status,
+            "mlScore": None,
+            "mlPrediction": None,
+            "mlConfidence": None,
+            "modelVersion": model_version,
+            "cascade": tier,
+        },
+    }
+
+
+def build_url_verdict(url: str, ml_result: Dict[str, Any], rules: Optional[RuleResult] = None) -> Dict[str, Any]:
+    """
+    Rule-based analysis + ML result -> merged verdict for one URL.
+    """
+
+    # 1) Rule-based analysis (your current engine)
+    rule_score, rule_status, rule_reasons = rules if rules is not None else run_rules(url)
+
+    # 2) ML analysis (from url_ml_model.pkl)
+    # expected keys: prediction, confidence, risk_score (varies)
+    ml_pred = ml_result.get("prediction", "legitimate")
+
+    # confidence might be missing -> fallback to 50
+    try:
+        ml_confidence = float(ml_result.get("confidence", 50.0))
+    except Exception:
+        ml_confidence = 50.0
+
+    # 3) Merge both results
+    started = time.perf_counter()
+    verdict = merge_url_results(
+        rule_score, rule_status, rule_reasons, ml_pred, ml_confidence,
+        model_version=ml_result.get("model_version"),
+    )
+    MERGE_SECONDS.observe(time.perf_counter() - started)
+    return verdict
+
+
+def score_urls(detector, keys: List[str], policy: CascadePolicy = DEFAULT_POLICY,
+               check_reputation: bool = True, urls: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Verdicts for canonical URLs (core.cache.canonicalize_url), in order:
+    reputation lookup for every URL, rules for the unlisted ones, then one
+    batched ML call for the URLs the rules leave undecided (policy), then
+    merge. No caching here; callers decide what to keep.
+    check_reputation=False when the caller already ran the lookup.
+
+    keys are only for lookups and the result mapping. The rules and the
+    model score urls[i], the URL as the client sent it (default: the key),
+    since canonicalizing changes their inputs (scheme, case, trailing "/").
+    """
+    urls = keys if urls is None else urls
+    verdicts = reputation_verdicts(keys) if check_reputation else {}
+    pending = [(key, url) for key, url in zip(keys, urls) if key not in verdicts]
+
+    rules = [run_rules(url) for _, url in pending]
+    tiers = [decisive_tier(r, policy) for r in rules]
+
+    undecided = [url for (_, url), tier in zip(pending, tiers) if tier is None]
+    ml_results = iter(detector.analyze_batch(undecided) if undecided else ())
+    if keys and not undecided:
+        MODEL_CALLS_AVOIDED.inc()
+
+    for (key, url), rule_result, tier in zip(pending, rules, tiers):
+        if tier is None:
+            verdicts[key] = build_url_verdict(url, next(ml_results), rule_result)
+        else:
+            verdicts[key] = rules_only_verdict(rule_result, tier, detector.version)
+        CASCADE_URLS.labels(tier or "ml").inc()
+    return [verdicts[key] for key in keys]
@@ -0,0 +1,231 @@
+"""
+NDJSON in, NDJSON out, in constant memory (POST /analyze-stream).
+
+The request body is read as it arrives and split into records. Records
+are grouped into chunks of one kind (at most `chunk_records` records and
+`chunk_bytes` of input). Each chunk runs as one detector-pool job. At
+most `max_in_flight` chunks are outstanding. While that many are
+running, the body is not read any further, so a fast client is held
+back by TCP flow control instead of by server memory. Verdicts are
+written in input order as each chunk completes. What the server holds
+at a time is bounded by about (max_in_flight + 1) * chunk_bytes, however
+large the submission.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+from core.executor import PoolSaturated
+
+# Wait before retrying a chunk the saturated detector pool turned away
+SATURATED_RETRY_SECONDS = 0.05
+
+
+class StreamRecord(NamedTuple):
+    index: int                 # 0-based line number among non-blank lines
+    kind: Optional[str]        # "url" / "email", None when the line is unusable
+    payload: Any               # what the kind's runner takes, or the error text
+    record_id: Any             # client "id", echoed back
+    size: int                  # bytes of input
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that lets the endpoint keep reading the request
+    body while it streams. The stock one, on servers speaking ASGI spec
+    < 2.4 (uvicorn), consumes receive() to watch for a disconnect. That
+    would swallow the body. A disconnect still ends the stream: reading
+    the body raises ClientDisconnect, which ends the response quietly.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except ClientDisconnect:
+            pass
+
+
+async def split_lines(body: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[bytes, bool]]:
+    """(line, too_long) per newline-terminated line. Over-long lines are dropped, not buffered."""
+    buffer = b""
+    skipping = False
+    async for data in body:
+        lines = (buffer + data).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if skipping:
+                # The end of a line already reported as too long
+                skipping = False
+                continue
+            yield (b"", True) if len(line) > max_line_bytes else (line, False)
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield b"", True
+            buffer = b""
+            skipping = True
+    if buffer and not skipping:
+        yield buffer, False
+
+
+# First characters of a line that is meant as JSON rather than a bare URL
+_JSON_START = frozenset('{["-0123456789')
+_JSON_WORDS = frozenset(("null", "true", "false"))
+
+
+def looks_like_url(text: str) -> bool:
+    """An http(s) URL, or a bare "host.tld[/...]" without whitespace."""
+    if not text or any(c.isspace() for c in text):
+        return False
+    scheme, sep, rest = text.partition("://")
+    if sep:
+        return scheme.lower() in ("http", "https") and bool(rest)
+    host = text.split("/", 1)[0].split("?", 1)[0].split("#", 1)[0]
+    return "." in host.strip(".")
+
+
+def parse_record(index: int, line: bytes, classify: Callable[[Any], Tuple[Optional[str], Any]]) -> StreamRecord:
+    """
+    One NDJSON line -> StreamRecord. JSON objects go to classify; a URL,
+    bare or as a JSON string, is classified as that string. Other JSON
+    (null, 123, [...]) and text that is not a URL are error records.
+    """
+    text = line.decode("utf-8", "replace").strip()
+    value: Any = text
+    if text[:1] in _JSON_START or text in _JSON_WORDS:
+        try:
+            value = json.loads(text)
+        except ValueError:
+            # "1.2.3.4/login" starts like a number
+            if not looks_like_url(text):
+                return StreamRecord(index, None, "Invalid JSON", None, len(line))
+    if isinstance(value, str):
+        if not looks_like_url(value.strip()):
+            return StreamRecord(index, None, "Not a URL or a JSON object", None, len(line))
+    elif not isinstance(value, dict):
+        return StreamRecord(index, None, f"Record must be a JSON object or a URL, not {type(value).__name__}",
+                            None, len(line))
+    record_id = value.get("id") if isinstance(value, dict) else None
+    kind, payload = classify(value)
+    return StreamRecord(index, kind, payload, record_id, len(line))
+
+
+async def records(body: AsyncIterator[bytes], classify: Callable[[Any], Tuple[Optional[str], Any]],
+                  max_record_bytes: int) -> AsyncIterator[StreamRecord]:
+    index = 0
+    async for line, too_long in split_lines(body, max_record_bytes):
+        if too_long:
+            yield StreamRecord(index, None, f"Record over {max_record_bytes} bytes", None, 0)
+        elif line.strip():
+            yield parse_record(index, line, classify)
+        else:
+            continue
+        index += 1
+
+
+async def chunks(stream: AsyncIterator[StreamRecord], chunk_records: int,
+                 chunk_bytes: int) -> AsyncIterator[List[StreamRecord]]:
+    """Consecutive records, cut at chunk_records / chunk_bytes or where the kind changes."""
+    chunk: List[StreamRecord] = []
+    kind, size = None, 0
+    async for record in stream:
+        if chunk and record.kind is not None and kind is not None and record.kind != kind:
+            yield chunk
+            chunk, kind, size = [], None, 0
+        chunk.append(record)
+        kind = kind or record.kind
+        size += record.size
+        if len(chunk) >= chunk_records or size >= chunk_bytes:
+            yield chunk
+            chunk, kind, size = [], None, 0
+    if chunk:
+        yield chunk
+
+
+async def run_chunk(chunk: List[StreamRecord], runners: Dict[str, Callable[[List[Any]], Any]],
+                    submit: Callable[..., Awaitable[Any]], counters: Dict[str, int],
+                    on_error: Optional[Callable[[Exception], None]] = None) -> List[Dict[str, Any]]:
+    """Verdict lines for a chunk, in order. Unusable records and failed chunks become error lines."""
+    scorable = [r for r in chunk if r.kind is not None]
+    verdicts: List[Dict[str, Any]] = []
+    failure = None
+    while scorable:
+        try:
+            verdicts = await submit(runners[scorable[0].kind], [r.payload for r in scorable])
+            break
+        except PoolSaturated:
+            # Other requests hold the pool: wait our turn instead of failing the stream
+            counters["poolRetries"] += 1
+            await asyncio.sleep(SATURATED_RETRY_SECONDS)
+        except Exception as e:
+            if on_error is not None:
+                on_error(e)
+            failure = f"Server error: {e}"
+            break
+
+    by_index = {r.index: v for r, v in zip(scorable, verdicts)}
+    lines = []
+    for record in chunk:
+        head = {"index": record.index, **({"id": record.record_id} if record.record_id is not None else {})}
+        if record.kind is None or failure is not None:
+            counters["errors"] += 1
+            lines.append({**head, "error": record.payload if record.kind is None else failure})
+        else:
+            counters[record.kind + "s"] += 1
+            lines.append({**head, "kind": record.kind, **by_index[record.index]})
+    return lines
+
+
+async def stream_verdicts(
+    body: AsyncIterator[bytes],
+    classify: Callable[[Any], Tuple[Optional[str], Any]],
+    runners: Dict[str, Callable[[List[Any]], Any]],
+    submit: Callable[..., Awaitable[Any]],
+    chunk_records: int,
+    chunk_bytes: int,
+    max_in_flight: int,
+    max_record_bytes: int,
+    on_chunk: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    on_error: Optional[Callable[[Exception], None]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON verdict lines for an NDJSON body, in input order, then one
+    {"summary": ...} line. classify(value) -> (kind, payload) or
+    (None, error text). runners[kind](payloads) runs on the pool, through
+    submit(fn, arg). on_chunk sees each chunk's lines, on_error each
+    failed chunk's exception (inside its except block).
+    """
+    started = time.perf_counter()
+    counters = {"urls": 0, "emails": 0, "errors": 0, "chunks": 0, "poolRetries": 0, "maxInFlight": 0}
+    pending: Deque["asyncio.Task[List[Dict[str, Any]]]"] = deque()
+
+    def encode(lines: List[Dict[str, Any]]) -> bytes:
+        if on_chunk is not None:
+            on_chunk(lines)
+        return "".join(json.dumps(line, separators=(",", ":")) + "\n" for line in lines).encode()
+
+    try:
+        async for chunk in chunks(records(body, classify, max_record_bytes), chunk_records, chunk_bytes):
+            pending.append(asyncio.create_task(run_chunk(chunk, runners, submit, counters, on_error)))
+            counters["chunks"] += 1
+            counters["maxInFlight"] = max(counters["maxInFlight"], len(pending))
+            # Finished chunks go out as soon as they are at the head of the queue
+            while pending and pending[0].done():
+                yield encode(pending.popleft().result())
+            # Full: stop reading the body until the oldest chunk is done
+            if len(pending) >= max_in_flight:
+                yield encode(await pending.popleft())
+        while pending:
+            yield encode(await pending.popleft())
+    finally:
+        for task in pending:
+            task.cancel()
+
+    summary = dict(counters)
+    summary["records"] = counters["urls"] + counters["emails"] + counters["errors"]
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    yield (json.dumps({"summary": summary}, separators=(",", ":")) + "\n").encode()
@@ -0,0 +1,257 @@
+"""
+Persistent /analyze-url verdict store shared by every worker process on
+a node, and kept across restarts.
+
+It is SQLite in WAL mode, so readers never block the single writer and
+all uvicorn workers can share one file. One row per canonical URL:
+
+    verdicts(key, model_version, expires_at, payload)
+
+A row only counts when it has not expired and was produced by the model
+that is active now. After a model change the old rows are ignored, and
+deleted on the next swap or purge.
+
+Warm start: load a previous scan_urls.py output into the store, so a
+fresh deploy doesn't recompute every popular URL once per worker.
+
+    python backend/core/verdict_store.py warm verdicts.jsonl[.gz] --store /var/lib/safesurf/verdicts.db
+"""
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# SQLite's default limit on bound parameters is 999 on older builds
+MAX_PARAMS = 900
+# Expired rows are swept after this many writes
+PURGE_EVERY_WRITES = 10000
+# COUNT(*) walks the whole table: stats() refreshes it at most this often
+SIZE_REFRESH_SECONDS = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    key TEXT PRIMARY KEY,
+    model_version TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    payload TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS verdicts_expires_at ON verdicts (expires_at);
+"""
+
+
+# ==============================
+# Store
+# ==============================
+
+class VerdictStore:
+    """
+    Thread- and process-safe: every thread (and every forked worker) opens
+    its own connection. Wall-clock (time.time) expiry, since rows outlive
+    the process.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400.0, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.ttl = float(ttl)
+        self.busy_timeout_ms = int(busy_timeout_ms)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self._size = 0
+        self._size_at = float("-inf")
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, keys: List[str], model_version: str) -> Dict[str, Dict[str, Any]]:
+        """Live verdicts for these keys from this model version."""
+        found: Dict[str, Dict[str, Any]] = {}
+        if not keys:
+            return found
+
+        now = time.time()
+        unique = list(dict.fromkeys(keys))
+        try:
+            conn = self._connect()
+            for i in range(0, len(unique), MAX_PARAMS):
+                part = unique[i:i + MAX_PARAMS]
+                rows = conn.execute(
+                    f"SELECT key, payload FROM verdicts WHERE key IN ({','.join('?' * len(part))})"
+                    " AND model_version = ? AND expires_at > ?",
+                    (*part, model_version, now),
+                )
+                for key, payload in rows:
+                    found[key] = json.loads(payload)
+        except sqlite3.Error:
+            # The store is only a shortcut: on a locked/broken file, recompute
+            with self._lock:
+                self.errors += 1
+            return {}
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any]]], model_version: str,
+                 ttl: Optional[float] = None) -> int:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        rows = [(key, model_version, expires_at, json.dumps(verdict, separators=(",", ":")))
+                for key, verdict in items]
+        if not rows:
+            return 0
+
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO verdicts (key, model_version, expires_at, payload) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error:
+            with self._lock:
+                self.errors += 1
+            return 0
+
+        with self._lock:
+            before = self.writes
+            self.writes += len(rows)
+            sweep = before // PURGE_EVERY_WRITES != self.writes // PURGE_EVERY_WRITES
+        if sweep:
+            self.purge()
+        return len(rows)
+
+    def purge(self, keep_version: Optional[str] = None) -> int:
+        """Delete expired rows, and rows of every other model version if keep_version is given."""
+        try:
+            conn = self._connect()
+            if keep_version is None:
+                cursor = conn.execute("DELETE FROM verdicts WHERE expires_at <= ?", (time.time(),))
+            else:
+                cursor = conn.execute(
+                    "DELETE FROM verdicts WHERE expires_at <= ? OR model_version != ?",
+                    (time.time(), keep_version),
+                )
+        except sqlite3.Error:
+            # Runs on the request path (put_many sweep) and in the model-swap hook:
+            # a locked file just postpones the cleanup
+            with self._lock:
+                self.errors += 1
+            return 0
+        return cursor.rowcount
+
+    def warm_start(self, path: str, model_version: str, batch_size: int = 5000) -> Dict[str, int]:
+        """
+        Preload scan_urls.py output (JSONL, optionally .gz). Only verdicts
+        from model_version are loaded; the rest would be ignored anyway.
+        """
+        loaded = stale = invalid = 0
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        opener = gzip.open if path.endswith(".gz") else open
+
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    key = record["key"]
+                    verdict = {k: record[k] for k in ("riskScore", "status", "reasons", "meta")}
+                except (ValueError, KeyError, TypeError):
+                    invalid += 1
+                    continue
+                meta = verdict["meta"]
+                # Cascade verdicts (rules only) carry no model version
+                stale_model = "cascade" not in meta and meta.get("modelVersion") != model_version
+                if stale_model or meta.get("error"):
+                    stale += 1
+                    continue
+                batch.append((key, verdict))
+                if len(batch) >= batch_size:
+                    loaded += self.put_many(batch, model_version)
+                    batch = []
+        loaded += self.put_many(batch, model_version)
+
+        return {"loaded": loaded, "stale": stale, "invalid": invalid}
+
+    def __len__(self) -> int:
+        try:
+            return self._connect().execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+        except sqlite3.Error:
+            # Last known size, for stats()
+            with self._lock:
+                self.errors += 1
+            return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        if time.monotonic() - self._size_at >= SIZE_REFRESH_SECONDS:
+            self._size = len(self)
+            self._size_at = time.monotonic()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "size": self._size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+            "evictions": 0,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    from core.config import VERDICT_STORE_PATH, VERDICT_STORE_TTL  # noqa: E402
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--store", default=VERDICT_STORE_PATH, help="SQLite file (SAFESURF_VERDICT_STORE_PATH)")
+
+    parser = argparse.ArgumentParser(description="Manage the persistent verdict store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    warm = sub.add_parser("warm", parents=[common], help="preload a scan_urls.py output file")
+    warm.add_argument("scan_output")
+    warm.add_argument("--model-version", help="default: the model the service would load")
+    sub.add_parser("purge", parents=[common], help="delete expired rows")
+    sub.add_parser("stats", parents=[common])
+    args = parser.parse_args()
+
+    if not args.store:
+        raise SystemExit("No store: pass --store or set SAFESURF_VERDICT_STORE_PATH")
+    store = VerdictStore(args.store, ttl=VERDICT_STORE_TTL)
+
+    if args.command == "warm":
+        version = args.model_version
+        if not version:
+            from detectors.url_ml_detector import load_model
+            version = load_model()[2]["version"]
+        started = time.perf_counter()
+        result = store.warm_start(args.scan_output, version)
+        print(json.dumps({**result, "modelVersion": version,
+                          "seconds": round(time.perf_counter() - started, 2)}))
+    elif args.command == "purge":
+        print(json.dumps({"deleted": store.purge()}))
+    else:
+        print(json.dumps(store.stats()))
@@ -0,0 +1,401 @@
+"""
+The trusted domain list and a Bloom filter of known-bad domains for the
+extension, so it can settle most navigations locally and only ask
+/analyze-url about unknown hosts. A third filter holds the hosts with
+URL-level reputation entries ("urlHosts"): a trusted host in it still
+goes to /analyze-url, since only the backend can check the full URL
+(say, one listed docs.google.com/forms/... page).
+
+The trusted list is shipped exactly, never as a Bloom filter. A false
+positive there would show a phishing host as safe, and with public,
+unkeyed hashes such hosts are cheap to generate offline. A false
+positive in the bad filter only costs a request to /analyze-url.
+
+Hashing is chosen for a few lines of browser JS (src/domainFilter.js):
+    key = normalize_host(domain) as UTF-8
+    h1  = crc32(key)            (zlib / PNG CRC-32)
+    h2  = fnv1a32(key) | 1
+    bit i of k = (h1 + i * h2) mod m      (Kirsch-Mitzenmacher double hashing)
+Bits are packed little-endian: bit p is byte p >> 3, mask 1 << (p & 7).
+
+Sizing: m and k are computed for the next power of two above the entry
+count, so a filter keeps its shape while a feed grows and deltas stay
+applicable. The false-positive rate is SAFESURF_FILTER_FP_RATE or lower.
+
+Versions are content digests. Every worker (and every restart) builds
+the same version from the same inputs. A client that sends ?since=<its
+version> gets only the 32-bit words of the bad filter that changed, as
+long as the worker still remembers that version and the shape is
+unchanged. The trusted list has its own version. With a 1M-domain
+SAFESURF_ALLOWLIST_PATH it is ~15 MB of JSON, so it is sent whole only
+to clients without a copy. A client that sends ?trusted=<its trusted
+version> gets "unchanged", or the domains added and removed since that
+version while the worker remembers it.
+
+    python backend/detectors/domain_filter.py bench --domains 1000000
+"""
+import base64
+import hashlib
+import math
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+if __name__ == "__main__":
+    import os
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from detectors.domain_index import normalize_host, sorted_unique  # noqa: E402
+
+FILTER_FORMAT = "bloom-v1"
+FILTER_HASH = "crc32+fnv1a32"
+
+# Keys are hashed in slices of this many, to bound the temporary arrays
+POSITION_CHUNK = 262144
+
+# Trusted-list diffs kept, so clients on the same old version share one
+TRUSTED_DIFF_CACHE = 16
+
+
+# ==============================
+# Keys
+# ==============================
+
+def fnv1a32(encoded: List[bytes]) -> np.ndarray:
+    """FNV-1a (32 bit) of many byte strings, one numpy step per character position."""
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    h = np.full(len(encoded), 2166136261, dtype=np.uint64)
+    if not len(encoded):
+        return h
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    for c in range(int(lengths.max())):
+        active = np.flatnonzero(lengths > c)
+        h[active] = ((h[active] ^ data[starts[active] + c]) * np.uint64(16777619)) & np.uint64(0xFFFFFFFF)
+    return h
+
+
+def filter_keys(domains: Iterable[str]) -> np.ndarray:
+    """Sorted, distinct uint64 keys (h1 << 32 | h2) of normalized domains."""
+    encoded = [d.encode("utf-8") for d in dict.fromkeys(normalize_host(d) for d in domains) if d]
+    h1 = np.fromiter((zlib.crc32(e) for e in encoded), dtype=np.uint64, count=len(encoded))
+    h2 = fnv1a32(encoded) | np.uint64(1)
+    return sorted_unique((h1 << np.uint64(32)) | h2)
+
+
+# ==============================
+# Bloom filter
+# ==============================
+
+def bloom_shape(n: int, fp_rate: float):
+    """(m bits, k hashes) for the power-of-two size class holding n entries."""
+    n_class = max(1024, 1 << max(n - 1, 0).bit_length())
+    m = math.ceil(-n_class * math.log(fp_rate) / math.log(2) ** 2)
+    m = (m + 31) // 32 * 32
+    k = max(1, round(m / n_class * math.log(2)))
+    return m, k
+
+
+class BloomFilter(NamedTuple):
+    m: int
+    k: int
+    count: int
+    bits: bytes
+
+    @classmethod
+    def build(cls, keys: np.ndarray, fp_rate: float) -> "BloomFilter":
+        m, k = bloom_shape(len(keys), fp_rate)
+        marks = np.zeros(m, dtype=bool)
+        steps = np.arange(k, dtype=np.uint64)
+        for i in range(0, len(keys), POSITION_CHUNK):
+            chunk = keys[i:i + POSITION_CHUNK]
+            h1 = chunk >> np.uint64(32)
+            h2 = chunk & np.uint64(0xFFFFFFFF)
+            marks[((h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(m)).ravel()] = True
+        return cls(m, k, int(len(keys)), np.packbits(marks, bitorder="little").tobytes())
+
+    def contains(self, domain: str) -> bool:
+        keys = filter_keys([domain])
+        if not len(keys):
+            return False
+        h1, h2 = int(keys[0]) >> 32, int(keys[0]) & 0xFFFFFFFF
+        return all(self.bits[p >> 3] >> (p & 7) & 1
+                   for p in ((h1 + i * h2) % self.m for i in range(self.k)))
+
+    @property
+    def fp_rate(self) -> float:
+        """Expected false-positive rate at the current fill."""
+        return (1 - math.exp(-self.k * self.count / self.m)) ** self.k
+
+    def describe(self) -> Dict[str, Any]:
+        return {"m": self.m, "k": self.k, "count": self.count, "fpRate": round(self.fp_rate, 8)}
+
+    def full_payload(self) -> Dict[str, Any]:
+        return {**self.describe(), "bits": base64.b64encode(self.bits).decode("ascii")}
+
+    def delta_payload(self, old: "BloomFilter") -> Optional[Dict[str, Any]]:
+        """Changed 32-bit words since `old`, or None when a full copy is smaller or required."""
+        if (old.m, old.k) != (self.m, self.k):
+            return None
+        new_words = np.frombuffer(self.bits, dtype="<u4")
+        old_words = np.frombuffer(old.bits, dtype="<u4")
+        changed = np.flatnonzero(new_words != old_words).astype("<u4")
+        if len(changed) * 8 >= len(self.bits):
+            return None
+        return {
+            **self.describe(),
+            "words": {
+                "index": base64.b64encode(changed.tobytes()).decode("ascii"),
+                "value": base64.b64encode(new_words[changed].astype("<u4").tobytes()).decode("ascii"),
+            },
+        }
+
+
+# ==============================
+# Versioned snapshots
+# ==============================
+
+class FilterSnapshot(NamedTuple):
+    version: str
+    inputs: Any
+    trusted: Tuple[str, ...]           # sorted, normalized
+    trusted_version: str
+    bad: BloomFilter
+    url_hosts: Optional[BloomFilter]   # None: unknown, so no host may skip the backend
+    built_at: float
+    build_seconds: float
+
+
+class DomainFilterService:
+    """
+    Builds the trusted list, the bad filter and the URL-host filter from its
+    inputs and rebuilds when inputs_version() changes. Keeps the last
+    `history` snapshots to answer delta requests. url_host_keys() returns
+    None when the hosts of listed URLs are unknown.
+    """
+
+    def __init__(
+        self,
+        trusted_domains: Callable[[], Iterable[str]],
+        bad_keys: Callable[[], np.ndarray],
+        inputs_version: Callable[[], Any],
+        fp_rate: float = 0.001,
+        history: int = 8,
+        url_host_keys: Optional[Callable[[], Optional[np.ndarray]]] = None,
+    ):
+        self.trusted_domains = trusted_domains
+        self.bad_keys = bad_keys
+        self.url_host_keys = url_host_keys or (lambda: np.zeros(0, dtype=np.uint64))
+        self.inputs_version = inputs_version
+        self.fp_rate = float(fp_rate)
+        self.history = max(int(history), 1)
+        self._snapshots: "OrderedDict[str, FilterSnapshot]" = OrderedDict()
+        self._current: Optional[FilterSnapshot] = None
+        self._lock = threading.Lock()
+        # (old trusted version, new trusted version) -> (added, removed)
+        self._trusted_diffs: "OrderedDict[Tuple[str, str], Tuple[List[str], List[str]]]" = OrderedDict()
+        self._diff_lock = threading.Lock()
+
+    def build(self, inputs: Any) -> FilterSnapshot:
+        started = time.perf_counter()
+        trusted = tuple(sorted({normalize_host(d) for d in self.trusted_domains()} - {""}))
+        trusted_version = hashlib.blake2b("\n".join(trusted).encode("utf-8"), digest_size=8).hexdigest()
+        if self._current is not None and self._current.trusted_version == trusted_version:
+            # Share one copy of an unchanged list between snapshots
+            trusted = self._current.trusted
+        bad = BloomFilter.build(np.asarray(self.bad_keys(), dtype=np.uint64), self.fp_rate)
+        url_host_keys = self.url_host_keys()
+        url_hosts = None
+        if url_host_keys is not None:
+            url_hosts = BloomFilter.build(np.asarray(url_host_keys, dtype=np.uint64), self.fp_rate)
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(trusted_version.encode() + b"\0")
+        for bloom in (bad, url_hosts):
+            if bloom is None:
+                digest.update(b"none:")
+            else:
+                digest.update(f"{bloom.m}:{bloom.k}:".encode())
+                digest.update(bloom.bits)
+        return FilterSnapshot(digest.hexdigest(), inputs, trusted, trusted_version, bad, url_hosts, time.time(),
+                              time.perf_counter() - started)
+
+    def current(self) -> FilterSnapshot:
+        inputs = self.inputs_version()
+        snapshot = self._current
+        if snapshot is not None and snapshot.inputs == inputs:
+            return snapshot
+        with self._lock:
+            if self._current is None or self._current.inputs != inputs:
+                snapshot = self.build(inputs)
+                if self._current is not None and snapshot.version == self._current.version:
+                    # Inputs changed, filters did not (e.g. a touched file)
+                    snapshot = self._current._replace(inputs=inputs)
+                self._snapshots[snapshot.version] = snapshot
+                self._snapshots.move_to_end(snapshot.version)
+                while len(self._snapshots) > self.history:
+                    self._snapshots.popitem(last=False)
+                self._current = snapshot
+            return self._current
+
+    def _trusted_diff(self, old: FilterSnapshot, new: FilterSnapshot) -> Tuple[List[str], List[str]]:
+        key = (old.trusted_version, new.trusted_version)
+        with self._diff_lock:
+            diff = self._trusted_diffs.get(key)
+        if diff is None:
+            old_set, new_set = set(old.trusted), set(new.trusted)
+            diff = (sorted(new_set - old_set), sorted(old_set - new_set))
+            with self._diff_lock:
+                self._trusted_diffs[key] = diff
+                while len(self._trusted_diffs) > TRUSTED_DIFF_CACHE:
+                    self._trusted_diffs.popitem(last=False)
+        return diff
+
+    def trusted_payload(self, snapshot: FilterSnapshot, since: Optional[str]) -> Dict[str, Any]:
+        """
+        The trusted list for a client holding trusted version `since`:
+        unchanged, added/removed domains (while `since` is remembered and
+        that is smaller), or the whole list.
+        """
+        head = {"version": snapshot.trusted_version, "count": len(snapshot.trusted)}
+        if since == snapshot.trusted_version:
+            return {**head, "unchanged": True}
+        remembered = list(self._snapshots.values()) if since else []
+        old = next((s for s in remembered if s.trusted_version == since), None)
+        if old is not None:
+            added, removed = self._trusted_diff(old, snapshot)
+            if len(added) + len(removed) < len(snapshot.trusted):
+                return {**head, "since": since, "added": added, "removed": removed}
+        return {**head, "domains": list(snapshot.trusted)}
+
+    def payload(self, since: Optional[str] = None, snapshot: Optional[FilterSnapshot] = None,
+                trusted_since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Full bad filter, or a delta when `since` is a remembered version
+        with the same shape. The trusted list is diffed against
+        `trusted_since` (default: the trusted version of `since`).
+        """
+        snapshot = snapshot or self.current()
+        head = {
+            "format": FILTER_FORMAT,
+            "hash": FILTER_HASH,
+            "version": snapshot.version,
+            "builtAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(snapshot.built_at)),
+        }
+        if since == snapshot.version:
+            return {**head, "since": since, "full": False, "unchanged": True}
+
+        old = self._snapshots.get(since) if since else None
+        if trusted_since is None and old is not None:
+            trusted_since = old.trusted_version
+        trusted = self.trusted_payload(snapshot, trusted_since)
+        url_hosts = None
+        if snapshot.url_hosts is not None:
+            if old is not None and old.url_hosts is not None:
+                url_hosts = snapshot.url_hosts.delta_payload(old.url_hosts)
+            url_hosts = url_hosts or snapshot.url_hosts.full_payload()
+        if old is not None:
+            bad = snapshot.bad.delta_payload(old.bad)
+            if bad is not None:
+                return {**head, "since": since, "full": False, "trusted": trusted, "bad": bad,
+                        "urlHosts": url_hosts}
+
+        return {**head, "full": True, "trusted": trusted, "bad": snapshot.bad.full_payload(),
+                "urlHosts": url_hosts}
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._current
+        if snapshot is None:
+            return {"version": None}
+        return {
+            "version": snapshot.version,
+            "buildMs": round(snapshot.build_seconds * 1000, 1),
+            "trusted": {"version": snapshot.trusted_version, "count": len(snapshot.trusted)},
+            "bad": {**snapshot.bad.describe(), "bytes": len(snapshot.bad.bits)},
+            "urlHosts": snapshot.url_hosts.describe() if snapshot.url_hosts is not None else None,
+            "history": list(self._snapshots),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import gzip
+    import json
+    import random
+
+    from detectors.domain_index import read_domain_list
+
+    parser = argparse.ArgumentParser(description="Domain filter tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="generation time and payload sizes for synthetic domains")
+    bench.add_argument("--domains", type=int, default=1000000, help="known-bad domains")
+    bench.add_argument("--trusted", type=int, default=1000000, help="synthetic trusted domains")
+    bench.add_argument("--allowlist", help="real allowlist (Tranco/Umbrella CSV or one domain per line) "
+                                           "instead of --trusted")
+    bench.add_argument("--fp-rate", type=float, default=0.001)
+    bench.add_argument("--delta", type=int, default=1000, help="domains added for the delta payloads")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+    def domain():
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(5, 14))) + \
+            rng.choice([".com", ".net", ".org", ".de", ".co.uk", ".xyz"])
+
+    domains = [domain() for _ in range(args.domains)]
+    trusted = read_domain_list(args.allowlist) if args.allowlist else [domain() for _ in range(args.trusted)]
+    added = [domain() for _ in range(args.delta)]
+    probes = [domain() for _ in range(20000)]
+    state = {"domains": domains, "trusted": trusted}
+    service = DomainFilterService(lambda: state["trusted"], lambda: filter_keys(state["domains"]),
+                                  lambda: (len(state["domains"]), len(state["trusted"])), fp_rate=args.fp_rate)
+
+    def size(payload):
+        body = json.dumps(payload).encode()
+        return {"bytes": len(body), "gzipBytes": len(gzip.compress(body))}
+
+    started = time.perf_counter()
+    keys = filter_keys(domains)
+    hash_seconds = time.perf_counter() - started
+    full = service.payload()
+    first = service.current()
+    full_size = size(full)
+
+    # New bad domains, same trusted list: the client's copy is not resent
+    state["domains"] = domains + added
+    bad_delta = size(service.payload(since=first.version))
+    second = service.current()
+    # A client outside the filter history still keeps its trusted list
+    bad_full = size(service.payload(trusted_since=first.trusted_version))
+
+    # New trusted domains
+    state["trusted"] = trusted + added
+    service.current()
+    started = time.perf_counter()
+    trusted_delta = service.payload(since=second.version)
+    trusted_delta_seconds = time.perf_counter() - started
+
+    bad = service.current().bad
+    false_positives = sum(bad.contains(p) for p in probes) / len(probes)
+    print(json.dumps({
+        "badDomains": args.domains,
+        "trustedDomains": len(first.trusted),
+        "fpRateTarget": args.fp_rate,
+        "m": bad.m,
+        "k": bad.k,
+        "hashSeconds": round(hash_seconds, 2),
+        "buildSeconds": round(first.build_seconds, 2),
+        "filterBytes": len(bad.bits),
+        "fullPayload": full_size,
+        "deltaDomains": args.delta,
+        "badDeltaPayload": bad_delta,
+        "badFullTrustedUnchangedPayload": bad_full,
+        "trustedDeltaPayload": {**size(trusted_delta), "diffSeconds": round(trusted_delta_seconds, 3)},
+        "measuredFpRate": false_positives,
+        "expectedFpRate": round(bad.fp_rate, 6),
+    }, indent=2))
@@ -1,6 +1,7 @@
-import hashlib
 from typing import List, Tuple
 
+from detectors.keyword_matcher import KeywordMatcher
+
 EMAIL_URGENCY_WORDS = ["urgent", "immediately", "asap", "action required", "suspended", "verify now"]
 EMAIL_SOCIAL_ENGINEERING = ["confirm your account", "reset your password", "payment failed", "unusual activity"]
 EMAIL_LINK_WORDS = ["click", "link", "open", "download", "attachment"]
@@ -10,14 +11,27 @@ PHISHING_KEYWORDS = [
     "click", "bank", "paypal", "security", "account"
 ]
 
-def _base(text: str) -> float:
-    t = (text or "").lower().strip()
-    if not t:
-        return 0.0
-    h = hashlib.md5(t.encode()).hexdigest()
-    return int(h[:2], 16) / 255
+# Compiled once: a single pass over sender/subject/body finds all four lists
+EMAIL_KEYWORDS = KeywordMatcher({
+    "urgency": EMAIL_URGENCY_WORDS,
+    "social": EMAIL_SOCIAL_ENGINEERING,
+    "link": EMAIL_LINK_WORDS,
+    "phishing": PHISHING_KEYWORDS,
+})
+
+def email_status(score: float) -> str:
+    if score > 0.7:
+        return "high_risk"
+    if score > 0.3:
+        return "low_risk"
+    return "safe"
 
 def analyze_email(sender: str, subject: str, body: str) -> Tuple[float, str, List[str]]:
+    """
+    Keyword rules. The score comes from the rules alone: with no email
+    model (email_ml_detector) the rules are the whole verdict, and never a
+    hash of the text standing in for one.
+    """
     reasons: List[str] = []
     s = (sender or "").lower().strip()
     sub = (subject or "").lower().strip()
@@ -27,10 +41,11 @@ def analyze_email(sender: str, subject: str, body: str) -> Tuple[float, str, Lis
     if not combined:
         return 0.0, "safe", ["Empty email content"]
 
-    urgency_hits = [w for w in EMAIL_URGENCY_WORDS if w in combined]
-    social_hits = [w for w in EMAIL_SOCIAL_ENGINEERING if w in combined]
-    link_hits = [w for w in EMAIL_LINK_WORDS if w in combined]
-    phishing_hits = [w for w in PHISHING_KEYWORDS if w in combined]
+    hits = EMAIL_KEYWORDS.scan(combined)
+    urgency_hits = hits.phrases("urgency")
+    social_hits = hits.phrases("social")
+    link_hits = hits.phrases("link")
+    phishing_hits = hits.phrases("phishing")
 
     for w in urgency_hits[:4]:
         reasons.append(f"Urgency language detected: {w}")
@@ -47,11 +62,8 @@ def analyze_email(sender: str, subject: str, body: str) -> Tuple[float, str, Lis
         if "paypal" in sub and "paypal" not in domain:
             reasons.append("Brand mention doesn't match sender domain (possible impersonation)")
 
-    base = _base(combined)
-
     # Email scoring (different weights than URL)
-    score = (base * 0.2)
-    score += len(urgency_hits) * 0.15
+    score = len(urgency_hits) * 0.15
     score += len(social_hits) * 0.12
     score += len(link_hits) * 0.08
     score += len(phishing_hits) * 0.06
@@ -59,12 +71,7 @@ def analyze_email(sender: str, subject: str, body: str) -> Tuple[float, str, Lis
     score = min(score, 0.99)
     score = round(score, 2)
 
-    if score > 0.7:
-        status = "high_risk"
-    elif score > 0.3:
-        status = "low_risk"
-    else:
-        status = "safe"
+    status = email_status(score)
 
     if not reasons:
         reasons.append("No suspicious email indicators detected")
@@ -0,0 +1,104 @@
+"""
+Links inside an email body: extraction, and folding their URL verdicts
+into the email verdict.
+
+The body is HTML or plain text of any size (content.js sends whatever
+the mail client shows). extract_links() makes one regex pass over at most
+EMAIL_MAX_BODY_CHARS characters and picks up href/src targets and bare
+http(s):// or www. URLs, in order. It stops after EMAIL_MAX_LINKS
+distinct links (by canonical URL). Scoring the links is up to the
+caller: main.py sends them through the /analyze-url pipeline.
+"""
+import html
+import re
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from core.cache import canonicalize_url
+
+LINK_PATTERN = re.compile(
+    r"""\b(?:href|src)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))"""
+    r"""|((?:https?://|www\.)[^\s<>"'`]+)""",
+    re.IGNORECASE,
+)
+
+# Sentence punctuation that follows a URL in text rather than belonging to it
+TRAILING_PUNCTUATION = ".,;:!?'\")]}>"
+
+
+class EmailLinks(NamedTuple):
+    urls: List[str]        # distinct http(s) URLs, in body order
+    found: int             # link candidates seen, duplicates included
+    truncated: bool        # body cut at max_chars, or link cap reached
+
+
+def _clean(raw: str) -> str:
+    url = html.unescape(raw).strip()
+    while url and url[-1] in TRAILING_PUNCTUATION:
+        # Keep balanced brackets: https://en.wikipedia.org/wiki/Foo_(bar)
+        if url[-1] == ")" and url.count("(") >= url.count(")"):
+            break
+        url = url[:-1]
+    if url.lower().startswith("www."):
+        url = "http://" + url
+    return url
+
+
+def extract_links(body: str, max_chars: int, max_links: int) -> EmailLinks:
+    """Distinct http(s) links from an email body, in one pass."""
+    text = body or ""
+    truncated = len(text) > max_chars
+    text = text[:max_chars]
+
+    seen = set()
+    urls: List[str] = []
+    found = 0
+    for match in LINK_PATTERN.finditer(text):
+        raw = next(group for group in match.groups() if group is not None)
+        url = _clean(raw)
+        # mailto:, tel:, cid:, javascript:, #anchors and relative paths have no host to check
+        if not url.lower().startswith(("http://", "https://")):
+            continue
+        found += 1
+        key = canonicalize_url(url)
+        if key in seen:
+            continue
+        if len(urls) >= max_links:
+            truncated = True
+            break
+        seen.add(key)
+        urls.append(url)
+
+    return EmailLinks(urls, found, truncated)
+
+
+STATUS_RANK = {"safe": 0, "low_risk": 1, "high_risk": 2}
+
+
+def worse_status(a: str, b: str) -> str:
+    return a if STATUS_RANK.get(a, 0) >= STATUS_RANK.get(b, 0) else b
+
+
+def fold_link_verdicts(
+    score: float,
+    reasons: List[str],
+    urls: List[str],
+    verdicts: List[Dict[str, Any]],
+) -> Tuple[float, List[str], Dict[str, Any]]:
+    """
+    Email score -> max(email score, worst link riskScore), plus reasons
+    for the worst link. Returns (score, reasons, worst link summary or None).
+    URL and email statuses use different thresholds (>= 0.7 vs > 0.7), so
+    callers take worse_status(own status, summary["status"]) as well.
+    """
+    if not verdicts:
+        return score, reasons, None
+
+    worst_url, worst = max(zip(urls, verdicts), key=lambda item: item[1]["riskScore"])
+    summary = {"url": worst_url, "riskScore": worst["riskScore"], "status": worst["status"]}
+    if worst["status"] == "safe":
+        return score, reasons, summary
+
+    reasons = [r for r in reasons if r != "No suspicious email indicators detected"]
+    reasons.append(f"Link to {'high-risk' if worst['status'] == 'high_risk' else 'suspicious'} URL: {worst_url}")
+    reasons.extend(f"Link: {r}" for r in worst["reasons"][:3])
+    return round(min(max(score, worst["riskScore"]), 0.99), 2), reasons, summary
@@ -1,72 +1,88 @@
-import hashlib
-from typing import List, Tuple
-
-EMAIL_URGENCY_WORDS = ["urgent", "immediately", "asap", "action required", "suspended", "verify now"]
-EMAIL_SOCIAL_ENGINEERING = ["confirm your account", "reset your password", "payment failed", "unusual activity"]
-EMAIL_LINK_WORDS = ["click", "link", "open", "download", "attachment"]
-
-PHISHING_KEYWORDS = [
-    "login", "verify", "update", "password", "suspended", "urgent",
-    "click", "bank", "paypal", "security", "account"
-]
-
-def _base(text: str) -> float:
-    t = (text or "").lower().strip()
-    if not t:
-        return 0.0
-    h = hashlib.md5(t.encode()).hexdigest()
-    return int(h[:2], 16) / 255
-
-def analyze_email(sender: str, subject: str, body: str) -> Tuple[float, str, List[str]]:
-    reasons: List[str] = []
-    s = (sender or "").lower().strip()
-    sub = (subject or "").lower().strip()
-    b = (body or "").lower().strip()
-
-    combined = f"{s} {sub} {b}".strip()
-    if not combined:
-        return 0.0, "safe", ["Empty email content"]
-
-    urgency_hits = [w for w in EMAIL_URGENCY_WORDS if w in combined]
-    social_hits = [w for w in EMAIL_SOCIAL_ENGINEERING if w in combined]
-    link_hits = [w for w in EMAIL_LINK_WORDS if w in combined]
-    phishing_hits = [w for w in PHISHING_KEYWORDS if w in combined]
-
-    for w in urgency_hits[:4]:
-        reasons.append(f"Urgency language detected: {w}")
-    for w in social_hits[:3]:
-        reasons.append(f"Social-engineering phrase detected: {w}")
-    for w in link_hits[:3]:
-        reasons.append(f"Call-to-click/download detected: {w}")
-    for w in phishing_hits[:4]:
-        reasons.append(f"Suspicious keyword in email: {w}")
-
-    # Sender vs subject simple impersonation check
-    if "@" in s:
-        domain = s.split("@")[-1]
-        if "paypal" in sub and "paypal" not in domain:
-            reasons.append("Brand mention doesn't match sender domain (possible impersonation)")
-
-    base = _base(combined)
-
-    # Email scoring (different weights than URL)
-    score = (base * 0.2)
-    score += len(urgency_hits) * 0.15
-    score += len(social_hits) * 0.12
-    score += len(link_hits) * 0.08
-    score += len(phishing_hits) * 0.06
-
-    score = min(score, 0.99)
-    score = round(score, 2)
-
-    if score > 0.7:
-        status = "high_risk"
-    elif score > 0.3:
-        status = "low_risk"
-    else:
-        status = "safe"
-
-    if not reasons:
-        reasons.append("No suspicious email indicators detected")
-
-    return score, status, reasons
+"""
+Learned email classifier: logistic regression over hashed sender,
+subject and body words (model_artifact.EmailHashingVectorizer). It is
+trained by train_email_model.py and stored as an "email_linear_hashing"
+artifact, which loads with numpy only (memory-mapped weights).
+
+analyze_batch() vectorizes a whole batch (an inbox page) and makes one
+predict_proba call for it.
+"""
+import os
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+from core.config import EMAIL_MODEL_PATH
+from core.metrics import STAGE_SECONDS
+from detectors.model_artifact import is_artifact, load_artifact
+
+ARTIFACT_PATH = EMAIL_MODEL_PATH or os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models", "email_ml_model"))
+
+EMAIL_VECTORIZE_SECONDS = STAGE_SECONDS.labels("email_vectorize")
+EMAIL_PREDICT_SECONDS = STAGE_SECONDS.labels("email_predict_proba")
+
+# (sender, subject, body)
+Email = Tuple[str, str, str]
+
+
+def load_email_model(path: str = ARTIFACT_PATH):
+    """Returns (model, vectorizer, manifest)."""
+    if not is_artifact(path):
+        raise FileNotFoundError(f"No email model at {path}. Run train_email_model.py first.")
+    model, vectorizer, manifest = load_artifact(path)
+    if manifest.get("backend") != "email_linear_hashing":
+        raise ValueError(f"{path} holds a {manifest.get('backend')!r} model, not an email model")
+    return model, vectorizer, manifest
+
+
+class EmailDetector:
+
+    def __init__(self, path: str = ARTIFACT_PATH):
+        self.model, self.vectorizer, self.manifest = load_email_model(path)
+
+    @property
+    def version(self):
+        return self.manifest.get("version", "unknown")
+
+    def analyze(self, sender: str, subject: str, body: str) -> Dict[str, Any]:
+        return self.analyze_batch([(sender, subject, body)])[0]
+
+    def analyze_batch(self, emails: Sequence[Email]) -> List[Dict[str, Any]]:
+        """
+        Results in input order. "seconds" is the message's own vectorize
+        time plus an equal share of the batch's model call.
+        """
+        if not emails:
+            return []
+
+        seconds: List[float] = []
+        started = time.perf_counter()
+        X = self.vectorizer.transform(emails, seconds)
+        EMAIL_VECTORIZE_SECONDS.observe(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        probs = self.model.predict_proba(X)[:, 1]
+        predict_seconds = time.perf_counter() - started
+        EMAIL_PREDICT_SECONDS.observe(predict_seconds)
+
+        share = predict_seconds / len(emails)
+        return [
+            {
+                "prediction": "phishing" if p >= 0.5 else "legitimate",
+                "probability": round(float(p), 4),
+                "model_version": self.version,
+                "seconds": own + share,
+            }
+            for p, own in zip(probs, seconds)
+        ]
+
+
+def merge_email_results(rule_score: float, rule_reasons: List[str],
+                        ml_result: Dict[str, Any]) -> Tuple[float, List[str]]:
+    """
+    Hybrid email score: 40% keyword rules + 60% model probability.
+    """
+    score = round(min((rule_score * 0.4) + (ml_result["probability"] * 0.6), 0.99), 2)
+
+    reasons = [r for r in rule_reasons if r != "No suspicious email indicators detected"]
+    reasons.append(f"ML model: {ml_result['prediction']} ({ml_result['probability'] * 100:.0f}%)")
+    return score, reasons
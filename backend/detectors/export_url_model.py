@@ -0,0 +1,57 @@
+"""
+Convert the pickled (GradientBoostingClassifier, TfidfVectorizer) model
+into the compact artifact loaded by URLDetector, and check that both give
+the same probabilities.
+
+    python backend/detectors/export_url_model.py [pickle] [out_dir]
+"""
+import hashlib
+import os
+import pickle
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from detectors.model_artifact import export_gb_tfidf, load_artifact  # noqa: E402
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
+PICKLE_PATH = os.path.join(MODELS_DIR, "url_ml_model.pkl")
+ARTIFACT_PATH = os.path.join(MODELS_DIR, "url_ml_model")
+
+SAMPLE_URLS = [
+    "https://www.google.com/search?q=weather",
+    "http://paypa1-login.xyz/verify?token=abc",
+    "http://192.168.0.10/@secure-bank/login.php",
+    "https://github.com/5iaal/SafeSurf",
+    "http://amaz0n-account-update.top/signin?session=YWJjZGVmZ2hpamtsbW5vcA==",
+    "https://docs.python.org/3/library/asyncio.html",
+    "http://microsoft-support.online/password/reset",
+    "",
+]
+
+
+def export(pickle_path: str = PICKLE_PATH, out_dir: str = ARTIFACT_PATH) -> dict:
+    with open(pickle_path, "rb") as f:
+        raw = f.read()
+    model, vectorizer = pickle.loads(raw)
+
+    version = "gb_tfidf-" + hashlib.sha256(raw).hexdigest()[:12]
+    manifest = export_gb_tfidf(model, vectorizer, out_dir, version=version,
+                               extra={"source": os.path.basename(pickle_path)})
+
+    # Parity check against scikit-learn
+    compact_model, compact_vectorizer, _ = load_artifact(out_dir)
+    expected = model.predict_proba(vectorizer.transform(SAMPLE_URLS))[:, 1]
+    actual = compact_model.predict_proba(compact_vectorizer.transform(SAMPLE_URLS))[:, 1]
+    if not np.allclose(expected, actual, atol=1e-9):
+        raise SystemExit(f"Parity check failed: {expected} != {actual}")
+
+    return manifest
+
+
+if __name__ == "__main__":
+    manifest = export(*sys.argv[1:3])
+    print(f"[✓] Exported {manifest['version']} ({manifest['model']['nTrees']} trees, "
+          f"{manifest['vectorizer']['usedFeatures']}/{manifest['vectorizer']['vocabularySize']} features used)")
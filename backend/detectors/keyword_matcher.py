@@ -0,0 +1,112 @@
+"""
+Single-pass multi-pattern keyword matching (Aho-Corasick).
+
+A KeywordMatcher is compiled once from {category: [phrases]} and then
+finds every occurrence of every phrase, including overlapping and nested
+ones ("verify" inside "verify now"), in one left-to-right pass over the
+text. Cost is O(len(text) + hits), independent of how many phrases are
+loaded, so keyword lists can grow to thousands of phrases per language.
+
+Matching is case-sensitive; callers pass lowercased text, as the rule
+engines already do.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+
+class KeywordHit(NamedTuple):
+    start: int
+    end: int
+    phrase: str
+    category: str
+    rank: int  # position of the phrase in its category list
+
+
+# ==============================
+# Hits
+# ==============================
+
+class KeywordHits:
+    """All hits of one scan, with helpers used by the scoring code."""
+
+    def __init__(self, hits: List[KeywordHit]):
+        self.hits = hits
+
+    def __iter__(self):
+        return iter(self.hits)
+
+    def __len__(self) -> int:
+        return len(self.hits)
+
+    def phrases(self, category: str) -> List[str]:
+        """Distinct phrases of a category, in keyword-list order."""
+        found = {(h.rank, h.phrase) for h in self.hits if h.category == category}
+        return [phrase for _, phrase in sorted(found)]
+
+    def first(self, category: str):
+        """Highest-priority (first listed) phrase of a category, or None."""
+        phrases = self.phrases(category)
+        return phrases[0] if phrases else None
+
+
+# ==============================
+# Aho-Corasick Automaton
+# ==============================
+
+class KeywordMatcher:
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Tuple[str, str, int], ...]] = [()]
+
+        for category, phrases in categories.items():
+            for rank, phrase in enumerate(phrases):
+                if phrase:
+                    self._add(phrase, category, rank)
+        self._link()
+
+    def _add(self, phrase: str, category: str, rank: int) -> None:
+        state = 0
+        for c in phrase:
+            nxt = self._goto[state].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] += ((phrase, category, rank),)
+
+    def _link(self) -> None:
+        # BFS: fail(child) = deepest proper suffix that is also a trie path;
+        # outputs are merged along the fail chain so scanning never walks it
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, child in self._goto[state].items():
+                queue.append(child)
+                f = self._fail[state]
+                while f and c not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(c, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] += self._out[self._fail[child]]
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def scan(self, text: str) -> KeywordHits:
+        goto, fail, out = self._goto, self._fail, self._out
+        hits: List[KeywordHit] = []
+        state = 0
+        for i, c in enumerate(text):
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            if out[state]:
+                for phrase, category, rank in out[state]:
+                    hits.append(KeywordHit(i + 1 - len(phrase), i + 1, phrase, category, rank))
+        return KeywordHits(hits)
@@ -0,0 +1,641 @@
+"""
+Compact, fast-loading model artifacts (URL models, and the email model).
+
+Instead of unpickling (GradientBoostingClassifier, TfidfVectorizer) -- which
+pulls in scikit-learn at import time -- a model is stored as a directory
+with a manifest.json naming its backend:
+
+"gb_tfidf" (GradientBoosting on char_wb TF-IDF):
+    vocabulary.json    TF-IDF terms in column order
+    idf.npy            idf weights
+    used_features.npy  vocabulary columns referenced by any tree split
+    tree_*.npy         stacked tree arrays (feature, threshold, left,
+                       right, value), padded to the largest tree
+
+"linear_hashing" (logistic model on hashed char_wb n-grams):
+    coef.npy           one weight per hash bucket (float32)
+
+"hgb_features" (HistGradientBoosting on url_features.py columns):
+    tree_*.npy         same layout as gb_tfidf; the manifest lists the
+                       feature names the model was trained on
+
+"email_linear_hashing" (logistic model on hashed sender/subject/body words):
+    coef.npy           one weight per hash bucket (float32)
+
+Exports never write into the directory a server may have mapped: each
+export goes to a fresh directory under "<path>.versions/", and <path> is
+then a symlink switched to it with one os.replace(). Overwriting a mapped
+.npy in place would change the live model under the server (or crash it
+with SIGBUS) before the registry's holdout check ran.
+
+Arrays are memory-mapped, and inference needs only numpy. gb_tfidf
+predictions match scikit-learn: features are compared as float32 against
+float64 thresholds, exactly like sklearn trees. linear_hashing uses its
+own crc32 feature hashing (HashingNgramVectorizer) for training and
+inference alike, so it never depends on sklearn's hashing either.
+
+This module must not import scikit-learn at module level.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+
+ARTIFACT_FORMAT = "safesurf-url-model"
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# Earlier exports kept next to the active one, for workers still loading them
+KEEP_VERSIONS = 2
+
+_WHITE_SPACES = re.compile(r"\s\s+")
+
+
+# ==============================
+# char_wb n-grams
+# ==============================
+
+def char_wb_ngrams(doc: str, min_n: int, max_n: int, lowercase: bool = True) -> List[str]:
+    # Same tokenization as sklearn's _VectorizerMixin._char_wb_ngrams
+    if lowercase:
+        doc = doc.lower()
+    doc = _WHITE_SPACES.sub(" ", doc)
+    grams = []
+    append = grams.append
+    for w in doc.split():
+        w = " " + w + " "
+        w_len = len(w)
+        for n in range(min_n, max_n + 1):
+            offset = 0
+            append(w[offset:offset + n])
+            while offset + n < w_len:
+                offset += 1
+                append(w[offset:offset + n])
+            if offset == 0:
+                break
+    return grams
+
+
+# ==============================
+# TF-IDF (char_wb) Vectorizer
+# ==============================
+
+class CompactTfidfVectorizer:
+    """
+    Numpy re-implementation of TfidfVectorizer(analyzer="char_wb",
+    norm="l2", sublinear_tf=False).transform. Only the columns used by the
+    model are materialized (dense float32, already normalized over the
+    full vocabulary).
+    """
+
+    def __init__(self, vocabulary: List[str], idf: np.ndarray, used_features: np.ndarray,
+                 ngram_range=(1, 2), lowercase: bool = True):
+        self.vocabulary_ = {term: i for i, term in enumerate(vocabulary)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.min_n, self.max_n = int(ngram_range[0]), int(ngram_range[1])
+        self.lowercase = lowercase
+
+        # vocabulary column -> output column (or -1 when no tree uses it)
+        self.n_used = len(used_features)
+        self._out_col = np.full(len(vocabulary), -1, dtype=np.int64)
+        self._out_col[np.asarray(used_features, dtype=np.int64)] = np.arange(self.n_used)
+
+    def ngrams(self, doc: str) -> List[str]:
+        return char_wb_ngrams(doc, self.min_n, self.max_n, self.lowercase)
+
+    def transform(self, docs: Iterable[str]) -> np.ndarray:
+        docs = list(docs)
+        vocab = self.vocabulary_
+        out = np.zeros((len(docs), self.n_used), dtype=np.float64)
+
+        for i, doc in enumerate(docs):
+            counts = Counter(vocab[g] for g in self.ngrams(doc) if g in vocab)
+            if not counts:
+                continue
+            cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self.idf[cols]
+            norm = math.sqrt(float(values @ values))
+            out_cols = self._out_col[cols]
+            keep = out_cols >= 0
+            out[i, out_cols[keep]] = values[keep] / norm
+
+        return out.astype(np.float32)
+
+
+# ==============================
+# Hashed n-gram Vectorizer
+# ==============================
+
+class SparseRows(NamedTuple):
+    """CSR rows without a scipy dependency (to_scipy() for training)."""
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    n_features: int
+
+    @property
+    def shape(self):
+        return (len(self.indptr) - 1, self.n_features)
+
+    def to_scipy(self):
+        from scipy.sparse import csr_matrix
+        return csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+
+class HashingNgramVectorizer:
+    """
+    Stateless char_wb n-gram featurizer: crc32(ngram) % n_features buckets,
+    raw term counts, l2-normalized rows. No vocabulary to fit or store, so
+    it suits streaming training and needs nothing but the parameters.
+    """
+
+    def __init__(self, n_features: int = 2 ** 20, ngram_range=(1, 3), lowercase: bool = True):
+        self.n_features = int(n_features)
+        self.min_n, self.max_n = int(ngram_range[0]), int(ngram_range[1])
+        self.lowercase = lowercase
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            "nFeatures": self.n_features,
+            "ngramRange": [self.min_n, self.max_n],
+            "lowercase": self.lowercase,
+            "hash": "crc32",
+        }
+
+    def transform(self, docs: Iterable[str]) -> SparseRows:
+        n_features = self.n_features
+        indptr = [0]
+        indices: List[np.ndarray] = []
+        data: List[np.ndarray] = []
+
+        for doc in docs:
+            counts = Counter(
+                zlib.crc32(g.encode("utf-8")) % n_features
+                for g in char_wb_ngrams(doc, self.min_n, self.max_n, self.lowercase)
+            )
+            cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            if len(values):
+                values /= math.sqrt(float(values @ values))
+            order = np.argsort(cols)
+            indices.append(cols[order])
+            data.append(values[order])
+            indptr.append(indptr[-1] + len(counts))
+
+        return SparseRows(
+            np.asarray(indptr, dtype=np.int64),
+            np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+            np.concatenate(data) if data else np.zeros(0, dtype=np.float64),
+            n_features,
+        )
+
+
+# ==============================
+# Hashed email-token Vectorizer
+# ==============================
+
+_WORDS = re.compile(r"[^\W_]+")
+
+
+class EmailHashingVectorizer:
+    """
+    Stateless featurizer for (sender, subject, body) triples. Words are
+    hashed per field (crc32 of "f:word", "s:word", "b:word", plus body
+    bigrams) into n_features buckets, with log(1 + count) weights and
+    l2-normalized rows. Only the first max_body_chars of the body count,
+    so the cost per message is bounded.
+    """
+
+    def __init__(self, n_features: int = 2 ** 20, max_body_chars: int = 20000, bigrams: bool = True):
+        self.n_features = int(n_features)
+        self.max_body_chars = int(max_body_chars)
+        self.bigrams = bool(bigrams)
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            "nFeatures": self.n_features,
+            "maxBodyChars": self.max_body_chars,
+            "bigrams": self.bigrams,
+            "hash": "crc32",
+        }
+
+    def tokens(self, sender: str, subject: str, body: str) -> List[str]:
+        words = _WORDS.findall
+        out = ["f:" + w for w in words((sender or "").lower())]
+        out += ["s:" + w for w in words((subject or "").lower())]
+        body_words = words((body or "")[:self.max_body_chars].lower())
+        out += ["b:" + w for w in body_words]
+        if self.bigrams:
+            out += [f"b:{a} {b}" for a, b in zip(body_words, body_words[1:])]
+        return out
+
+    def transform(self, emails: Iterable, seconds: Optional[List[float]] = None) -> SparseRows:
+        """emails: (sender, subject, body) tuples. seconds, if given, gets the time per message."""
+        n_features = self.n_features
+        indptr = [0]
+        indices: List[np.ndarray] = []
+        data: List[np.ndarray] = []
+
+        for sender, subject, body in emails:
+            started = time.perf_counter()
+            counts = Counter(
+                zlib.crc32(t.encode("utf-8")) % n_features for t in self.tokens(sender, subject, body)
+            )
+            cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            values = np.log1p(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+            if len(values):
+                values /= math.sqrt(float(values @ values))
+            order = np.argsort(cols)
+            indices.append(cols[order])
+            data.append(values[order])
+            indptr.append(indptr[-1] + len(counts))
+            if seconds is not None:
+                seconds.append(time.perf_counter() - started)
+
+        return SparseRows(
+            np.asarray(indptr, dtype=np.int64),
+            np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+            np.concatenate(data) if data else np.zeros(0, dtype=np.float64),
+            n_features,
+        )
+
+
+# ==============================
+# Linear (logistic) Model
+# ==============================
+
+class CompactLinearModel:
+    """predict_proba = sigmoid(coef . x + intercept) over SparseRows."""
+
+    def __init__(self, coef: np.ndarray, intercept: float):
+        self.coef = coef
+        self.intercept = float(intercept)
+
+    def decision_function(self, X: SparseRows) -> np.ndarray:
+        n = len(X.indptr) - 1
+        rows = np.repeat(np.arange(n), np.diff(X.indptr))
+        contrib = self.coef[X.indices].astype(np.float64) * X.data
+        return np.bincount(rows, weights=contrib, minlength=n) + self.intercept
+
+    def predict_proba(self, X: SparseRows) -> np.ndarray:
+        p = np.exp(-np.logaddexp(0.0, -self.decision_function(X)))
+        return np.column_stack([1.0 - p, p])
+
+
+# ==============================
+# Gradient Boosting (binary)
+# ==============================
+
+class CompactGradientBoosting:
+    """
+    predict_proba for a binary log-loss GradientBoostingClassifier:
+    raw = init + sum(learning_rate * leaf_value), proba = sigmoid(raw).
+    All trees are traversed at once, one depth level per step.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, init_raw: float, depth: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value  # already scaled by learning_rate
+        self.init_raw = float(init_raw)
+        self.depth = int(depth)
+        self.n_trees = feature.shape[0]
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        n = X.shape[0]
+        rows = np.arange(n)[:, None]
+        trees = np.arange(self.n_trees)[None, :]
+        node = np.zeros((n, self.n_trees), dtype=np.int64)
+
+        for _ in range(self.depth):
+            feat = self.feature[trees, node]
+            leaf = feat < 0
+            x = X[rows, np.where(leaf, 0, feat)]
+            go_left = x <= self.threshold[trees, node]
+            nxt = np.where(go_left, self.left[trees, node], self.right[trees, node])
+            node = np.where(leaf, node, nxt)
+
+        return self.init_raw + self.value[trees, node].sum(axis=1)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        # sigmoid without overflow for large |raw|
+        p = np.exp(-np.logaddexp(0.0, -self.decision_function(X)))
+        return np.column_stack([1.0 - p, p])
+
+
+# ==============================
+# Load / Export
+# ==============================
+
+def is_artifact(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST_NAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+    if manifest.get("formatVersion", 0) > ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {manifest.get('formatVersion')}")
+    return manifest
+
+
+def load_artifact(path: str, mmap: bool = True):
+    """Returns (model, vectorizer, manifest) for any supported backend."""
+    # Resolved once, so an export switching the symlink mid-load can't mix versions
+    path = os.path.realpath(path)
+    manifest = read_manifest(path)
+    mode = "r" if mmap else None
+
+    def array(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, name), mmap_mode=mode)
+
+    backend = manifest.get("backend")
+    vec = manifest["vectorizer"]
+    params = manifest["model"]
+
+    if backend == "linear_hashing":
+        vectorizer = HashingNgramVectorizer(
+            n_features=vec["nFeatures"],
+            ngram_range=vec["ngramRange"],
+            lowercase=vec["lowercase"],
+        )
+        model = CompactLinearModel(array("coef.npy"), params["intercept"])
+        return model, vectorizer, manifest
+
+    if backend == "email_linear_hashing":
+        vectorizer = EmailHashingVectorizer(
+            n_features=vec["nFeatures"],
+            max_body_chars=vec["maxBodyChars"],
+            bigrams=vec["bigrams"],
+        )
+        model = CompactLinearModel(array("coef.npy"), params["intercept"])
+        return model, vectorizer, manifest
+
+    if backend == "hgb_features":
+        # Imported here: url_features pulls in tldextract and the domain indexes
+        from detectors.url_features import URLFeatureVectorizer
+        vectorizer = URLFeatureVectorizer(vec["features"])
+        model = CompactGradientBoosting(
+            array("tree_feature.npy"),
+            array("tree_threshold.npy"),
+            array("tree_left.npy"),
+            array("tree_right.npy"),
+            array("tree_value.npy"),
+            init_raw=params["initRaw"],
+            depth=params["depth"],
+        )
+        return model, vectorizer, manifest
+
+    if backend != "gb_tfidf":
+        raise ValueError(f"Unknown model backend {backend!r} in {path}")
+
+    with open(os.path.join(path, "vocabulary.json"), encoding="utf-8") as f:
+        vocabulary = json.load(f)
+    vectorizer = CompactTfidfVectorizer(
+        vocabulary,
+        array("idf.npy"),
+        array("used_features.npy"),
+        ngram_range=vec["ngramRange"],
+        lowercase=vec["lowercase"],
+    )
+    model = CompactGradientBoosting(
+        array("tree_feature.npy"),
+        array("tree_threshold.npy"),
+        array("tree_left.npy"),
+        array("tree_right.npy"),
+        array("tree_value.npy"),
+        init_raw=params["initRaw"],
+        depth=params["depth"],
+    )
+    return model, vectorizer, manifest
+
+
+def _switch(path: str, target: str) -> None:
+    """Point the symlink `path` at `target` atomically."""
+    parent = os.path.dirname(path)
+    link = os.path.join(parent, f".{os.path.basename(path)}.{os.getpid()}.link")
+    if os.path.lexists(link):
+        os.unlink(link)
+    os.symlink(os.path.relpath(target, parent), link)
+    if os.path.isdir(path) and not os.path.islink(path):
+        # First export over a plain directory (as shipped): move it aside.
+        # Renaming keeps it valid for a server that has it mapped.
+        os.rename(path, os.path.join(os.path.dirname(target), "initial-" + time.strftime("%Y%m%d-%H%M%S")))
+    os.replace(link, path)
+
+
+def _prune(path: str, versions: str) -> None:
+    active = os.path.realpath(path)
+    old = sorted((os.path.join(versions, name) for name in os.listdir(versions)), key=os.path.getmtime)
+    old = [d for d in old if os.path.realpath(d) != active]
+    for d in old[:-KEEP_VERSIONS] if KEEP_VERSIONS else old:
+        shutil.rmtree(d, ignore_errors=True)
+
+
+@contextmanager
+def _publishing(path: str):
+    """
+    Yields a new, empty directory to write an artifact into. When the block
+    succeeds, `path` is switched to it; when it fails, it is removed and
+    `path` is left alone.
+    """
+    path = os.path.abspath(path.rstrip(os.sep))
+    versions = path + ".versions"
+    os.makedirs(versions, exist_ok=True)
+    out = tempfile.mkdtemp(prefix=time.strftime("%Y%m%d-%H%M%S-"), dir=versions)
+    try:
+        yield out
+    except BaseException:
+        shutil.rmtree(out, ignore_errors=True)
+        raise
+    os.chmod(out, 0o755)
+    _switch(path, out)
+    _prune(path, versions)
+
+
+def _write_manifest(path: str, backend: str, version: Optional[str], vectorizer: Dict[str, Any],
+                    model: Dict[str, Any], extra: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    import sklearn
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "formatVersion": ARTIFACT_FORMAT_VERSION,
+        "backend": backend,
+        "version": version or time.strftime(backend + "-%Y%m%d%H%M%S"),
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "sklearnVersion": sklearn.__version__,
+        "vectorizer": vectorizer,
+        "model": model,
+    }
+    manifest.update(extra or {})
+    # Manifest last: its presence marks the artifact as complete
+    with open(os.path.join(path, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def export_gb_tfidf(model, vectorizer, path: str, version: Optional[str] = None,
+                    extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Write a fitted (GradientBoostingClassifier, TfidfVectorizer) pair as a
+    compact artifact. Only char_wb / l2 / raw-tf vectorizers and binary
+    log-loss models are supported.
+    """
+    if vectorizer.analyzer != "char_wb" or vectorizer.norm != "l2" or vectorizer.sublinear_tf \
+            or not vectorizer.use_idf or vectorizer.strip_accents or vectorizer.preprocessor:
+        raise ValueError("Only char_wb / l2 / raw-tf TF-IDF vectorizers can be exported")
+    if model.estimators_.shape[1] != 1:
+        raise ValueError("Only binary GradientBoostingClassifier models can be exported")
+
+    trees = [est.tree_ for est in model.estimators_[:, 0]]
+    n_nodes = max(t.node_count for t in trees)
+    shape = (len(trees), n_nodes)
+
+    used = np.unique(np.concatenate([t.feature[t.children_left != -1] for t in trees]))
+    used_pos = {int(f): i for i, f in enumerate(used)}
+
+    feature = np.full(shape, -1, dtype=np.int32)
+    threshold = np.zeros(shape, dtype=np.float64)
+    left = np.zeros(shape, dtype=np.int32)
+    right = np.zeros(shape, dtype=np.int32)
+    value = np.zeros(shape, dtype=np.float64)
+    for i, t in enumerate(trees):
+        n = t.node_count
+        split = t.children_left != -1
+        feature[i, :n] = np.where(split, [used_pos.get(int(f), -1) for f in t.feature], -1)
+        threshold[i, :n] = t.threshold
+        left[i, :n] = np.where(split, t.children_left, 0)
+        right[i, :n] = np.where(split, t.children_right, 0)
+        value[i, :n] = t.value[:, 0, 0] * model.learning_rate
+
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, col in vectorizer.vocabulary_.items():
+        terms[col] = term
+
+    init_raw = float(np.ravel(model._raw_predict_init(np.zeros((1, model.n_features_in_))))[0])
+
+    with _publishing(path) as out:
+        np.save(os.path.join(out, "idf.npy"), vectorizer.idf_.astype(np.float64))
+        np.save(os.path.join(out, "used_features.npy"), used.astype(np.int32))
+        np.save(os.path.join(out, "tree_feature.npy"), feature)
+        np.save(os.path.join(out, "tree_threshold.npy"), threshold)
+        np.save(os.path.join(out, "tree_left.npy"), left)
+        np.save(os.path.join(out, "tree_right.npy"), right)
+        np.save(os.path.join(out, "tree_value.npy"), value)
+        with open(os.path.join(out, "vocabulary.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+
+        manifest = _write_manifest(
+            out, "gb_tfidf", version,
+            vectorizer={
+                "analyzer": "char_wb",
+                "ngramRange": list(vectorizer.ngram_range),
+                "lowercase": bool(vectorizer.lowercase),
+                "vocabularySize": len(terms),
+                "usedFeatures": int(len(used)),
+            },
+            model={
+                "nTrees": len(trees),
+                "depth": int(max(t.max_depth for t in trees)),
+                "learningRate": float(model.learning_rate),
+                "initRaw": init_raw,
+            },
+            extra=extra,
+        )
+    return manifest
+
+
+def export_linear_hashing(model, vectorizer, path: str,
+                          version: Optional[str] = None,
+                          extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Write a fitted binary linear classifier (coef_ / intercept_, e.g.
+    SGDClassifier(loss="log_loss")) trained on HashingNgramVectorizer
+    output ("linear_hashing") or EmailHashingVectorizer output
+    ("email_linear_hashing").
+    """
+    backend = "email_linear_hashing" if isinstance(vectorizer, EmailHashingVectorizer) else "linear_hashing"
+    coef = np.asarray(model.coef_, dtype=np.float32).ravel()
+    if coef.shape[0] != vectorizer.n_features:
+        raise ValueError("Model was not trained on this vectorizer's feature space")
+
+    with _publishing(path) as out:
+        np.save(os.path.join(out, "coef.npy"), coef)
+
+        manifest = _write_manifest(
+            out, backend, version,
+            vectorizer=vectorizer.params(),
+            model={
+                "intercept": float(np.ravel(model.intercept_)[0]),
+                "nonZero": int(np.count_nonzero(coef)),
+            },
+            extra=extra,
+        )
+    return manifest
+
+
+def export_hgb_features(model, vectorizer, path: str, version: Optional[str] = None,
+                        extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Write a fitted binary HistGradientBoostingClassifier trained on
+    URLFeatureVectorizer output. Leaf values already include the learning
+    rate. Missing-value routing is not exported: url_features() never
+    produces NaN.
+    """
+    if len(model._predictors[0]) != 1:
+        raise ValueError("Only binary HistGradientBoostingClassifier models can be exported")
+    if model.is_categorical_ is not None and np.any(model.is_categorical_):
+        raise ValueError("Categorical splits can't be exported")
+    if model.n_features_in_ != len(vectorizer.feature_names):
+        raise ValueError("Model was not trained on this vectorizer's features")
+
+    trees = [predictors[0].nodes for predictors in model._predictors]
+    shape = (len(trees), max(len(t) for t in trees))
+
+    feature = np.full(shape, -1, dtype=np.int32)
+    threshold = np.zeros(shape, dtype=np.float64)
+    left = np.zeros(shape, dtype=np.int32)
+    right = np.zeros(shape, dtype=np.int32)
+    value = np.zeros(shape, dtype=np.float64)
+    for i, t in enumerate(trees):
+        n = len(t)
+        split = t["is_leaf"] == 0
+        feature[i, :n] = np.where(split, t["feature_idx"], -1)
+        threshold[i, :n] = t["num_threshold"]
+        left[i, :n] = np.where(split, t["left"], 0)
+        right[i, :n] = np.where(split, t["right"], 0)
+        value[i, :n] = t["value"]
+
+    with _publishing(path) as out:
+        np.save(os.path.join(out, "tree_feature.npy"), feature)
+        np.save(os.path.join(out, "tree_threshold.npy"), threshold)
+        np.save(os.path.join(out, "tree_left.npy"), left)
+        np.save(os.path.join(out, "tree_right.npy"), right)
+        np.save(os.path.join(out, "tree_value.npy"), value)
+
+        manifest = _write_manifest(
+            out, "hgb_features", version,
+            vectorizer=vectorizer.params(),
+            model={
+                "nTrees": len(trees),
+                "depth": int(max(t["depth"].max() for t in trees)),
+                "learningRate": float(model.learning_rate),
+                "initRaw": float(np.ravel(model._baseline_prediction)[0]),
+            },
+            extra=extra,
+        )
+    return manifest
@@ -0,0 +1,139 @@
+"""
+Page signals from content.js (title, text sample, forms, links) for
+/analyze-page: which links to score first, and how the page's forms and
+link verdicts change the page verdict.
+
+The link list can be thousands of entries on a portal or a search page,
+and main.py scores only as many as fit in SAFESURF_PAGE_LINK_BUDGET_MS.
+prioritize_links() therefore orders them by how much they say about the
+page:
+    "form"      targets of forms with a password field
+    "offsite"   links to another registrable domain
+    "same_site" links within the page's own site
+Document order is kept within a class.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from core.cache import canonicalize_url
+from detectors import suffix_list
+from detectors.domain_index import normalize_host
+from detectors.email_detector import EMAIL_KEYWORDS
+
+PRIORITIES = ("form", "offsite", "same_site")
+
+# Wording on a credential page, per phrase, up to CREDENTIAL_WORDING_MAX
+CREDENTIAL_WORDING_WEIGHT = 0.1
+CREDENTIAL_WORDING_MAX = 0.3
+
+
+class PageLinks(NamedTuple):
+    urls: List[str]              # distinct http(s) URLs, highest priority first
+    priority: Dict[str, str]     # url -> "form" | "offsite" | "same_site"
+    received: int                # links + form targets sent by the client
+    truncated: bool              # distinct links over max_links were dropped
+
+
+def site_of(url: str) -> str:
+    """Registrable domain of a URL ("a.b.example.co.uk" -> "example.co.uk"), or its host."""
+    try:
+        host = normalize_host(urlsplit(url).hostname or "")
+    except ValueError:
+        return ""
+    ext = suffix_list.extract(host)
+    return f"{ext.domain}.{ext.suffix}" if ext.domain and ext.suffix else host
+
+
+def _http(url: Any) -> Optional[str]:
+    url = str(url or "").strip()
+    return url if url.lower().startswith(("http://", "https://")) else None
+
+
+def prioritize_links(page_url: str, links: List[Any], forms: List[Dict[str, Any]], max_links: int) -> PageLinks:
+    """Distinct http(s) links and credential-form targets, by priority."""
+    page_site = site_of(page_url)
+    page_key = canonicalize_url(page_url) if page_url else ""
+
+    classes: Dict[str, List[str]] = {name: [] for name in PRIORITIES}
+    seen = {page_key}
+    received = 0
+
+    def add(url: Optional[str], credential: bool = False) -> None:
+        if url is None:
+            return
+        key = canonicalize_url(url)
+        if key in seen:
+            return
+        seen.add(key)
+        if credential:
+            classes["form"].append(url)
+        else:
+            classes["offsite" if site_of(url) != page_site else "same_site"].append(url)
+
+    for form in forms:
+        received += 1
+        action = _http(form.get("action"))
+        add(action, credential=bool(form.get("hasPassword")))
+    for link in links:
+        received += 1
+        add(_http(link))
+
+    ordered = [(url, name) for name in PRIORITIES for url in classes[name]]
+    kept = ordered[:max_links]
+    return PageLinks([url for url, _ in kept], dict(kept), received, len(ordered) > len(kept))
+
+
+def page_signal_reasons(page_url: str, title: str, text: str,
+                        forms: List[Dict[str, Any]], has_password_form: bool) -> Tuple[float, List[str]]:
+    """Score added by the page's own signals (credential forms and their wording), with reasons."""
+    if not has_password_form and not any(f.get("hasPassword") for f in forms):
+        return 0.0, []
+
+    score, reasons = 0.0, []
+    if page_url.lower().startswith("http://"):
+        score += 0.2
+        reasons.append("Password form on a page without HTTPS")
+
+    page_site = site_of(page_url)
+    for form in forms:
+        action = _http(form.get("action"))
+        if form.get("hasPassword") and action and site_of(action) != page_site:
+            score += 0.25
+            reasons.append(f"Password form submits to another site: {site_of(action)}")
+            break
+
+    hits = EMAIL_KEYWORDS.scan(f"{title} {text}".lower())
+    phrases = hits.phrases("urgency") + hits.phrases("social")
+    if phrases:
+        score += min(len(phrases) * CREDENTIAL_WORDING_WEIGHT, CREDENTIAL_WORDING_MAX)
+        reasons.extend(f"Credential page wording: {p}" for p in phrases[:3])
+    return score, reasons
+
+
+def fold_form_verdicts(
+    score: float,
+    reasons: List[str],
+    urls: List[str],
+    verdicts: List[Dict[str, Any]],
+) -> Tuple[float, List[str], Optional[Dict[str, Any]]]:
+    """
+    Page score -> max(page score, worst credential-form target riskScore).
+    Returns (score, reasons, worst target summary or None), like
+    email_links.fold_link_verdicts().
+    """
+    if not verdicts:
+        return score, reasons, None
+    worst_url, worst = max(zip(urls, verdicts), key=lambda item: item[1]["riskScore"])
+    summary = {"url": worst_url, "riskScore": worst["riskScore"], "status": worst["status"]}
+    if worst["status"] == "safe":
+        return score, reasons, summary
+    label = "high-risk" if worst["status"] == "high_risk" else "suspicious"
+    reasons = reasons + [f"Password form submits to {label} URL: {worst_url}"]
+    reasons.extend(f"Form target: {r}" for r in worst["reasons"][:3])
+    return round(min(max(score, worst["riskScore"]), 0.99), 2), reasons, summary
+
+
+def worst_summary(*summaries: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The highest-scoring of the fold summaries (the first on ties), or None."""
+    present = [s for s in summaries if s is not None]
+    return max(present, key=lambda s: s["riskScore"]) if present else None
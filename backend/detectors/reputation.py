@@ -0,0 +1,585 @@
+"""
+Threat-intel reputation store: known phishing hosts and URLs, compiled to
+sorted 64-bit hash arrays on disk and memory-mapped by every worker.
+
+Layout of a store directory (SAFESURF_REPUTATION_PATH):
+
+    manifest.json          sources -> ordered segment chains, store version
+    <segment>.add.npy      sorted uint64 hashes listed by this segment
+    <segment>.del.npy      sorted uint64 hashes delisted by this segment
+    <segment>.hosts.*.npy  the same for host entries, as domain_filter keys
+                           (the bad-domain filter served to the extension)
+    <segment>.urlhosts.add.npy
+                           domain_filter keys of the hosts of URL entries,
+                           so the extension knows which trusted hosts still
+                           need /analyze-url. Only ever added to: delisting
+                           one URL doesn't clear a host that may list more
+
+A hash is domain_index.domain_hash() of a normalized host ("evil.com") or
+of a canonical URL (core.cache.canonicalize_url) with https:// keyed as
+http://, so a feed entry matches either scheme. Only the hashes are
+kept: 8 bytes per entry, 80 MB for 10M entries. The arrays are
+memory-mapped, so every worker on the node shares one copy in the page
+cache. A Python set of the same strings takes about 1 GB per worker.
+
+Each feed (source) is a chain of segments: a base plus deltas. `add` and
+`remove` write a small delta segment; nothing else is rewritten. A
+host/URL is listed by a source when its newest segment that mentions the
+hash adds it. Once a source has more than MAX_DELTAS deltas, its chain is
+compacted into a single base (a linear merge of the sorted arrays). New files are written first and manifest.json is replaced
+atomically. Running workers notice the new manifest within
+REPUTATION_CHECK_SECONDS and switch to it.
+
+Lookup for a URL checks the canonical URL (as sent and scheme-normalized)
+and the host with every parent
+domain ("a.b.evil.com" -> "b.evil.com" -> "evil.com"), as in DomainIndex.
+That is one np.searchsorted per segment for the whole batch: O(log n)
+probes into the mapped array.
+
+    python backend/detectors/reputation.py add openphish.txt --source openphish
+    python backend/detectors/reputation.py remove delisted.txt --source openphish
+    python backend/detectors/reputation.py replace phishtank-full.txt.gz --source phishtank
+    python backend/detectors/reputation.py check http://login.evil.example/x
+"""
+import gzip
+import ipaddress
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.cache import canonicalize_url  # noqa: E402
+from core.config import REPUTATION_CHECK_SECONDS, REPUTATION_PATH  # noqa: E402
+from detectors.domain_filter import filter_keys  # noqa: E402
+from detectors.domain_index import domain_hash, normalize_host, parent_domains, sorted_unique  # noqa: E402
+
+STORE_FORMAT = "safesurf-reputation"
+STORE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# Deltas a source may collect before `add` / `remove` compact it
+MAX_DELTAS = 8
+
+# Feed lines hashed per step by compile_entries()
+COMPILE_CHUNK = 1000000
+
+# Per segment: lookup hashes, and domain_filter keys of the listed hosts
+SEGMENT_SUFFIXES = (".add.npy", ".del.npy", ".hosts.add.npy", ".hosts.del.npy", ".urlhosts.add.npy")
+
+_SOURCE_NAME = re.compile(r"^[a-z0-9][a-z0-9_.-]{0,63}$")
+
+
+class ReputationMatch(NamedTuple):
+    kind: str      # "url" or "host"
+    value: str     # the listed URL or (parent) domain that matched
+    source: str    # feed name
+
+
+# ==============================
+# Feed files
+# ==============================
+
+def read_feed(path: str) -> Iterator[str]:
+    """
+    Entries of a feed file (plain or .gz): one host or URL per line, '#'
+    comments. Hosts-file lines ("0.0.0.0 evil.com") and CSV rows
+    ("rank,domain") use their last field.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(("#", "!")):
+                continue
+            entry = line.split()[-1].rsplit(",", 1)[-1] if "://" not in line else line.split()[-1]
+            if entry:
+                yield entry
+
+
+def url_key(key: str) -> str:
+    """Canonical URL as stored: https:// is keyed as http://, the rest unchanged."""
+    if key.startswith("https://"):
+        return "http://" + key[len("https://"):]
+    return key
+
+
+def entry_hash(entry: str) -> int:
+    """Hash of a feed entry: canonical URL when it has a path or scheme, else the host."""
+    entry = entry.strip()
+    if is_url_entry(entry):
+        return domain_hash(url_key(canonicalize_url(entry)))
+    return domain_hash(normalize_host(entry))
+
+
+def is_url_entry(entry: str) -> bool:
+    return "://" in entry or "/" in entry
+
+
+def url_entry_host(entry: str) -> str:
+    try:
+        return urlsplit(canonicalize_url(entry)).hostname or ""
+    except ValueError:
+        return ""
+
+
+def compile_entries(entries: Iterable[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (lookup hashes of all entries, domain_filter keys of the host entries,
+    domain_filter keys of the URL entries' hosts), each sorted and
+    distinct. Reads `entries` in chunks, so a feed is never held as a
+    list of strings.
+    """
+    hashes, keys, url_hosts = [], [], []
+    entries = iter(entries)
+    while True:
+        raw = list(islice(entries, COMPILE_CHUNK))
+        if not raw:
+            break
+        chunk = [e.strip() for e in raw if e.strip()]
+        if not chunk:
+            continue
+        hashes.append(np.fromiter((entry_hash(e) for e in chunk), dtype=np.uint64, count=len(chunk)))
+        keys.append(filter_keys(e for e in chunk if not is_url_entry(e)))
+        url_hosts.append(filter_keys(url_entry_host(e) for e in chunk if is_url_entry(e)))
+    if not hashes:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64)
+    return tuple(sorted_unique(np.concatenate(arrays)) for arrays in (hashes, keys, url_hosts))
+
+
+def url_candidates(key: str) -> List[Tuple[str, str]]:
+    """
+    (kind, value) pairs a canonical URL is checked against, URL first. The
+    URL is checked as given too, so https:// entries compiled before
+    url_key() still match.
+    """
+    candidates = [("url", key)]
+    if url_key(key) != key:
+        candidates.append(("url", url_key(key)))
+    try:
+        host = normalize_host(urlsplit(key).hostname or "")
+    except ValueError:
+        return candidates
+    if not host:
+        return candidates
+    try:
+        ipaddress.ip_address(host)
+        return candidates + [("host", host)]
+    except ValueError:
+        pass
+    # Bare TLDs are never listed
+    return candidates + [("host", d) for d in parent_domains(host)[:-1] or [host]]
+
+
+# ==============================
+# Snapshot (what a reader has mapped)
+# ==============================
+
+class _Segment(NamedTuple):
+    name: str
+    added: np.ndarray
+    removed: np.ndarray
+
+
+class _Snapshot(NamedTuple):
+    version: int
+    # source -> segments, newest first
+    sources: Dict[str, List[_Segment]]
+    mtime_ns: int
+
+
+EMPTY_SNAPSHOT = _Snapshot(0, {}, 0)
+
+
+def _contains(sorted_hashes: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    if not len(sorted_hashes):
+        return np.zeros(len(keys), dtype=bool)
+    pos = np.searchsorted(sorted_hashes, keys)
+    pos[pos == len(sorted_hashes)] = 0
+    return sorted_hashes[pos] == keys
+
+
+def _listed(segments: List[_Segment], keys: np.ndarray) -> np.ndarray:
+    """Per key: does this source's chain (newest first) list it?"""
+    listed = np.zeros(len(keys), dtype=bool)
+    open_ = np.ones(len(keys), dtype=bool)
+    for segment in segments:
+        if not open_.any():
+            break
+        removed = open_ & _contains(segment.removed, keys)
+        open_ &= ~removed
+        added = open_ & _contains(segment.added, keys)
+        listed |= added
+        open_ &= ~added
+    return listed
+
+
+# ==============================
+# Store
+# ==============================
+
+class ReputationStore:
+    """
+    Read side (lookups) and write side (add / remove / replace / compact)
+    of a store directory. Readers reload the manifest when it changes;
+    writers serialize on a lock file.
+    """
+
+    def __init__(self, path: str, check_seconds: float = 5.0):
+        self.path = path
+        self.check_seconds = float(check_seconds)
+        self._snapshot = EMPTY_SNAPSHOT
+        self._checked_at = float("-inf")
+        self._reload_lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.reloads = 0
+        self.reload_errors = 0
+
+        if path:
+            self.refresh(force=True)
+
+    # ---------- read side ----------
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST_NAME)
+
+    def read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {"format": STORE_FORMAT, "formatVersion": STORE_FORMAT_VERSION, "version": 0, "sources": {}}
+        if manifest.get("format") != STORE_FORMAT:
+            raise ValueError(f"{self.path} is not a {STORE_FORMAT} store")
+        if manifest.get("formatVersion", 0) > STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported reputation store format version {manifest.get('formatVersion')}")
+        return manifest
+
+    def _load(self, manifest: Dict[str, Any], mtime_ns: int) -> _Snapshot:
+        def array(name: str) -> np.ndarray:
+            return np.load(os.path.join(self.path, name), mmap_mode="r")
+
+        sources = {}
+        for source, chain in manifest["sources"].items():
+            sources[source] = [
+                _Segment(seg["name"], array(seg["name"] + ".add.npy"), array(seg["name"] + ".del.npy"))
+                for seg in reversed(chain)
+            ]
+        return _Snapshot(int(manifest["version"]), sources, mtime_ns)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Map the current manifest if it changed. True when a new snapshot was loaded."""
+        if not self.path:
+            return False
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_seconds:
+            return False
+        with self._reload_lock:
+            self._checked_at = now
+            try:
+                mtime_ns = os.stat(self._manifest_path()).st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = 0
+            if not force and mtime_ns == self._snapshot.mtime_ns:
+                return False
+            try:
+                snapshot = self._load(self.read_manifest(), mtime_ns)
+            except (OSError, ValueError, KeyError):
+                # A compaction may have removed files between reading the
+                # manifest and mapping them: keep the old snapshot, retry later
+                self.reload_errors += 1
+                return False
+            self._snapshot = snapshot
+            self.reloads += 1
+            return True
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def lookup_many(self, keys: List[str]) -> List[Optional[ReputationMatch]]:
+        """Canonical URLs -> first match (URL, then host, then parents), or None."""
+        self.refresh()
+        snapshot = self._snapshot
+        if not snapshot.sources or not keys:
+            return [None] * len(keys)
+
+        owners, candidates = [], []
+        for i, key in enumerate(keys):
+            for candidate in url_candidates(key):
+                owners.append(i)
+                candidates.append(candidate)
+        hashes = np.fromiter((domain_hash(value) for _, value in candidates), dtype=np.uint64,
+                             count=len(candidates))
+
+        # Which source (if any) lists each candidate
+        listed_by: List[Optional[str]] = [None] * len(candidates)
+        for source, segments in snapshot.sources.items():
+            for j in np.flatnonzero(_listed(segments, hashes)):
+                if listed_by[j] is None:
+                    listed_by[j] = source
+
+        # Candidates are in priority order per key: the first listed one wins
+        results: List[Optional[ReputationMatch]] = [None] * len(keys)
+        for j, source in enumerate(listed_by):
+            if source is not None and results[owners[j]] is None:
+                kind, value = candidates[j]
+                # Name URL matches as sent, not in their stored http:// form
+                if kind == "url":
+                    value = keys[owners[j]]
+                results[owners[j]] = ReputationMatch(kind, value, source)
+
+        self.lookups += len(keys)
+        self.hits += sum(r is not None for r in results)
+        return results
+
+    def lookup(self, url: str) -> Optional[ReputationMatch]:
+        return self.lookup_many([canonicalize_url(url)])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "path": self.path,
+            "version": snapshot.version,
+            "sources": {
+                source: {
+                    "segments": len(segments),
+                    "added": int(sum(len(s.added) for s in segments)),
+                    "removed": int(sum(len(s.removed) for s in segments)),
+                }
+                for source, segments in snapshot.sources.items()
+            },
+            "bytes": int(sum(s.added.nbytes + s.removed.nbytes
+                             for segments in snapshot.sources.values() for s in segments)),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "reloadErrors": self.reload_errors,
+        }
+
+    def _resolve(self, resolve: Callable[[], Any]) -> Any:
+        for _ in range(2):
+            try:
+                return resolve()
+            except FileNotFoundError:
+                # Compacted away between reading the manifest and loading: retry
+                pass
+        return resolve()
+
+    def host_filter_keys(self) -> np.ndarray:
+        """domain_filter keys of every listed host, across sources (for domain_filter.py)."""
+        if not self.path:
+            return np.zeros(0, dtype=np.uint64)
+
+        def resolve() -> np.ndarray:
+            keys = [self._live(chain, ".hosts") for chain in self.read_manifest()["sources"].values()]
+            return sorted_unique(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.uint64)
+
+        return self._resolve(resolve)
+
+    def url_host_filter_keys(self) -> Optional[np.ndarray]:
+        """
+        domain_filter keys of the hosts with listed URLs, across sources, or
+        None when a segment predates these keys (the hosts are unknown).
+        """
+        if not self.path:
+            return np.zeros(0, dtype=np.uint64)
+
+        def resolve() -> Optional[np.ndarray]:
+            keys = []
+            for chain in self.read_manifest()["sources"].values():
+                if any("urlHostKeys" not in seg for seg in chain):
+                    return None
+                keys += [np.load(os.path.join(self.path, seg["name"] + ".urlhosts.add.npy")) for seg in chain]
+            return sorted_unique(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.uint64)
+
+        return self._resolve(resolve)
+
+    # ---------- write side ----------
+
+    @contextmanager
+    def _writer(self):
+        import fcntl
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield self.read_manifest()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_segment(self, manifest: Dict[str, Any], source: str, added: np.ndarray, removed: np.ndarray,
+                       hosts_added: np.ndarray, hosts_removed: np.ndarray,
+                       url_hosts: Optional[np.ndarray]) -> Dict[str, Any]:
+        # Segment names never repeat, even within one commit
+        sequence = int(manifest.get("segmentSequence", 0)) + 1
+        manifest["segmentSequence"] = sequence
+        name = f"{source}-{sequence:08d}"
+        arrays = (added, removed, hosts_added, hosts_removed, url_hosts)
+        for suffix, array in zip(SEGMENT_SUFFIXES, arrays):
+            if array is not None:
+                np.save(os.path.join(self.path, name + suffix), np.asarray(array, dtype=np.uint64))
+        segment = {"name": name, "added": int(len(added)), "removed": int(len(removed)),
+                   "hostKeys": int(len(hosts_added)),
+                   "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        if url_hosts is not None:
+            segment["urlHostKeys"] = int(len(url_hosts))
+        return segment
+
+    def _commit(self, manifest: Dict[str, Any], drop: Iterable[str] = ()) -> None:
+        manifest["version"] = int(manifest["version"]) + 1
+        manifest["updatedAt"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        tmp = self._manifest_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self._manifest_path())
+        # Readers that still map these files keep their (unlinked) pages
+        for name in drop:
+            for suffix in SEGMENT_SUFFIXES:
+                try:
+                    os.remove(os.path.join(self.path, name + suffix))
+                except FileNotFoundError:
+                    pass
+        self.refresh(force=True)
+
+    def _live(self, chain: List[Dict[str, Any]], prefix: str = "") -> np.ndarray:
+        """Resolved hash set of one source chain, oldest segment first. prefix=".hosts" for filter keys."""
+        live = np.zeros(0, dtype=np.uint64)
+        for seg in chain:
+            if prefix and "hostKeys" not in seg:
+                # Written before segments carried filter keys: nothing to add
+                continue
+            removed = np.load(os.path.join(self.path, seg["name"] + prefix + ".del.npy"))
+            added = np.load(os.path.join(self.path, seg["name"] + prefix + ".add.npy"))
+            # Both sides are sorted: the stable sort just merges two runs
+            live = sorted_unique(np.concatenate([live[~_contains(removed, live)], added]))
+        return live
+
+    def _compact_locked(self, manifest: Dict[str, Any], source: str) -> List[str]:
+        chain = manifest["sources"].get(source, [])
+        if len(chain) <= 1:
+            return []
+        empty = np.zeros(0, dtype=np.uint64)
+        url_hosts = None
+        if all("urlHostKeys" in seg for seg in chain):
+            url_hosts = sorted_unique(np.concatenate(
+                [np.load(os.path.join(self.path, seg["name"] + ".urlhosts.add.npy")) for seg in chain]))
+        base = self._write_segment(manifest, source, self._live(chain), empty, self._live(chain, ".hosts"), empty,
+                                   url_hosts)
+        manifest["sources"][source] = [base]
+        return [seg["name"] for seg in chain]
+
+    def update(self, source: str, added: Iterable[str] = (), removed: Iterable[str] = ()) -> Dict[str, Any]:
+        """Append a delta segment to a source; compacts it past MAX_DELTAS."""
+        if not _SOURCE_NAME.match(source):
+            raise ValueError(f"Invalid source name {source!r}")
+        added_hashes, added_keys, url_hosts = compile_entries(added)
+        removed_hashes, removed_keys, _ = compile_entries(removed)
+        removed_hashes = removed_hashes[~_contains(added_hashes, removed_hashes)]
+        removed_keys = removed_keys[~_contains(added_keys, removed_keys)]
+
+        with self._writer() as manifest:
+            chain = manifest["sources"].setdefault(source, [])
+            chain.append(self._write_segment(manifest, source, added_hashes, removed_hashes,
+                                             added_keys, removed_keys, url_hosts))
+            drop = self._compact_locked(manifest, source) if len(chain) > MAX_DELTAS + 1 else []
+            self._commit(manifest, drop)
+        return {"source": source, "added": int(len(added_hashes)), "removed": int(len(removed_hashes)),
+                "compacted": bool(drop), "version": self.version}
+
+    def replace(self, source: str, entries: Iterable[str]) -> Dict[str, Any]:
+        """Make `entries` the whole content of a source (full feed snapshot)."""
+        if not _SOURCE_NAME.match(source):
+            raise ValueError(f"Invalid source name {source!r}")
+        hashes, keys, url_hosts = compile_entries(entries)
+        empty = np.zeros(0, dtype=np.uint64)
+        with self._writer() as manifest:
+            drop = [seg["name"] for seg in manifest["sources"].get(source, [])]
+            manifest["sources"][source] = [self._write_segment(manifest, source, hashes, empty, keys, empty,
+                                                               url_hosts)]
+            self._commit(manifest, drop)
+        return {"source": source, "entries": int(len(hashes)), "version": self.version}
+
+    def compact(self, source: Optional[str] = None) -> Dict[str, Any]:
+        with self._writer() as manifest:
+            drop: List[str] = []
+            for name in ([source] if source else list(manifest["sources"])):
+                drop += self._compact_locked(manifest, name)
+            if drop:
+                self._commit(manifest, drop)
+        return {"compactedSegments": len(drop), "version": self.version}
+
+    def drop_source(self, source: str) -> Dict[str, Any]:
+        with self._writer() as manifest:
+            chain = manifest["sources"].pop(source, [])
+            self._commit(manifest, [seg["name"] for seg in chain])
+        return {"source": source, "droppedSegments": len(chain), "version": self.version}
+
+
+# Shared by /analyze-url, the email link pass and scan_urls.py; empty when
+# SAFESURF_REPUTATION_PATH is not set
+REPUTATION = ReputationStore(REPUTATION_PATH, check_seconds=REPUTATION_CHECK_SECONDS)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--store", default=REPUTATION_PATH, help="store directory (SAFESURF_REPUTATION_PATH)")
+
+    parser = argparse.ArgumentParser(description="Manage the threat-intel reputation store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in (("add", "list the feed's entries (delta segment)"),
+                               ("remove", "delist the feed's entries (delta segment)"),
+                               ("replace", "make the feed the source's full content")):
+        p = sub.add_parser(command, parents=[common], help=help_text)
+        p.add_argument("feeds", nargs="+", help="text files, one host or URL per line (.gz ok)")
+        p.add_argument("--source", required=True, help="feed name, e.g. openphish")
+    p = sub.add_parser("compact", parents=[common], help="merge each source's deltas into one base")
+    p.add_argument("--source")
+    p = sub.add_parser("drop", parents=[common], help="delete a source")
+    p.add_argument("--source", required=True)
+    p = sub.add_parser("check", parents=[common], help="look URLs or hosts up")
+    p.add_argument("urls", nargs="+")
+    sub.add_parser("stats", parents=[common])
+    args = parser.parse_args()
+
+    if not args.store:
+        raise SystemExit("No store: pass --store or set SAFESURF_REPUTATION_PATH")
+    store = ReputationStore(args.store, check_seconds=0)
+
+    def entries():
+        for feed in args.feeds:
+            yield from read_feed(feed)
+
+    started = time.perf_counter()
+    if args.command == "add":
+        result = store.update(args.source, added=entries())
+    elif args.command == "remove":
+        result = store.update(args.source, removed=entries())
+    elif args.command == "replace":
+        result = store.replace(args.source, entries())
+    elif args.command == "compact":
+        result = store.compact(args.source)
+    elif args.command == "drop":
+        result = store.drop_source(args.source)
+    elif args.command == "check":
+        result = {url: (match._asdict() if (match := store.lookup(url)) else None) for url in args.urls}
+    else:
+        result = store.stats()
+    result = dict(result)
+    result.setdefault("seconds", round(time.perf_counter() - started, 3))
+    print(json.dumps(result))
@@ -0,0 +1,45 @@
+"""
+Offline public-suffix handling for tldextract.
+
+The default tldextract.extract() fetches the public suffix list over the
+network on first use (and hangs in air-gapped pods). This module uses a
+snapshot bundled in backend/data/public_suffix_list.dat instead; the
+network is never touched. Update the snapshot by replacing that file
+with https://publicsuffix.org/list/public_suffix_list.dat.
+"""
+import os
+import pathlib
+import re
+
+import tldextract
+
+
+PSL_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "public_suffix_list.dat"))
+
+
+def read_psl_version(path: str = PSL_PATH) -> str:
+    """'// VERSION: 2025-04-07_15-51-09_UTC' header of the snapshot."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            for _, line in zip(range(50), f):
+                match = re.match(r"//\s*VERSION:\s*(\S+)", line)
+                if match:
+                    return match.group(1)
+    except OSError:
+        pass
+    return "unknown"
+
+
+PSL_VERSION = read_psl_version()
+
+# No disk cache, no remote URLs: the suffix list only comes from the file
+extract = tldextract.TLDExtract(
+    cache_dir=None,
+    suffix_list_urls=(pathlib.Path(PSL_PATH).as_uri(),),
+    fallback_to_snapshot=True,
+)
+
+
+def warm_up() -> None:
+    """Parse the suffix list now instead of on the first request."""
+    extract("http://warm-up.example.co.uk")
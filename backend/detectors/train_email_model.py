@@ -0,0 +1,137 @@
+"""
+Train the email phishing model (email_ml_detector.py).
+
+    python backend/detectors/train_email_model.py --dataset emails.csv
+
+The dataset is a CSV with one message per row: sender, subject, body and
+label columns. "from" / "text" are accepted for sender / body (the layout
+of the public CEAS / Nazario / Enron phishing corpora). Labels are
+phishing / spam / 1 or legitimate / ham / 0.
+
+Features come from EmailHashingVectorizer (hashed words per field plus
+body bigrams): nothing to fit and no vocabulary to store. The classifier
+is SGDClassifier(loss="log_loss"), exported as a compact
+"email_linear_hashing" artifact. Rows are split into train and holdout
+by a hash of the message, so a duplicate never lands on both sides.
+"""
+import argparse
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from detectors.model_artifact import EmailHashingVectorizer, export_linear_hashing, load_artifact  # noqa: E402
+
+DATASET_PATH = "backend/datasets/email_dataset.csv"
+ARTIFACT_PATH = "backend/models/email_ml_model"
+
+HOLDOUT_PERCENT = 20
+LATENCY_SAMPLE = 500
+LATENCY_BATCH = 50
+
+COLUMN_ALIASES = {"sender": ("sender", "from"), "subject": ("subject",), "body": ("body", "text")}
+LABELS = {
+    "phishing": 1, "spam": 1, "1": 1, "malicious": 1,
+    "legitimate": 0, "ham": 0, "0": 0, "benign": 0,
+}
+
+
+def load_dataset(path):
+    df = pd.read_csv(path)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+
+    columns = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        found = next((a for a in aliases if a in df.columns), None)
+        if found is None and name != "sender":
+            raise SystemExit(f"{path} has no {name} column (columns: {', '.join(df.columns)})")
+        columns[name] = found
+
+    out = pd.DataFrame({
+        name: df[column].fillna("").astype(str) if column else ""
+        for name, column in columns.items()
+    })
+    out["label"] = df["label"].astype(str).str.strip().str.lower().map(LABELS)
+    return out.dropna(subset=["label"]).astype({"label": int})
+
+
+def is_holdout(sender, subject, body):
+    key = f"{sender}\n{subject}\n{body}".encode("utf-8", "replace")
+    return zlib.crc32(key) % 100 < HOLDOUT_PERCENT
+
+
+def measure_latency(model, vectorizer, emails):
+    sample = emails[:LATENCY_SAMPLE]
+    started = time.perf_counter()
+    for email in sample:
+        model.predict_proba(vectorizer.transform([email]))
+    single_us = (time.perf_counter() - started) / len(sample) * 1e6
+
+    started = time.perf_counter()
+    for i in range(0, len(sample), LATENCY_BATCH):
+        model.predict_proba(vectorizer.transform(sample[i:i + LATENCY_BATCH]))
+    batch_us = (time.perf_counter() - started) / len(sample) * 1e6
+    return single_us, batch_us
+
+
+def train(dataset=DATASET_PATH, output=ARTIFACT_PATH, n_features=2 ** 20, epochs=5):
+
+    print("[+] Loading dataset...")
+    df = load_dataset(dataset)
+    emails = list(zip(df["sender"], df["subject"], df["body"]))
+    labels = df["label"].to_numpy()
+    holdout = np.fromiter((is_holdout(*e) for e in emails), dtype=bool, count=len(emails))
+    print(f"    {len(emails)} messages, {int(labels.sum())} phishing, {int(holdout.sum())} held out")
+
+    vectorizer = EmailHashingVectorizer(n_features=n_features)
+
+    print("[+] Hashing sender/subject/body words...")
+    started = time.perf_counter()
+    X = vectorizer.transform(emails).to_scipy()
+    featurize_seconds = time.perf_counter() - started
+
+    print("[+] Training model...")
+    started = time.perf_counter()
+    model = SGDClassifier(loss="log_loss", alpha=1e-6, max_iter=epochs, tol=None, random_state=42)
+    model.fit(X[~holdout], labels[~holdout])
+    train_seconds = time.perf_counter() - started
+
+    manifest = export_linear_hashing(model, vectorizer, output)
+
+    print("[+] Evaluating...")
+    # Score with the exported artifact: what the service will load
+    compact, compact_vectorizer, _ = load_artifact(output)
+    test_emails = [e for e, h in zip(emails, holdout) if h]
+    y_test = labels[holdout]
+    probs = compact.predict_proba(compact_vectorizer.transform(test_emails))[:, 1]
+    preds = (probs >= 0.5).astype(int)
+    print(classification_report(y_test, preds))
+
+    single_us, batch_us = measure_latency(compact, compact_vectorizer, test_emails or emails)
+
+    print(f"[=] backend={manifest['backend']} version={manifest['version']}")
+    print(f"    accuracy        {accuracy_score(y_test, preds):.4f}")
+    if len(set(y_test)) == 2:
+        print(f"    ROC AUC         {roc_auc_score(y_test, probs):.4f}")
+    print(f"    featurize time  {featurize_seconds:.1f} s    train time {train_seconds:.1f} s")
+    print(f"    latency/email   {single_us:.1f} us (one email per call)")
+    print(f"    latency/email   {batch_us:.1f} us (batches of {LATENCY_BATCH})")
+    print(f"[✓] Model saved successfully! ({manifest['version']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the email phishing model")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--output", default=ARTIFACT_PATH, help="artifact directory")
+    parser.add_argument("--n-features", type=int, default=2 ** 20, help="hash buckets")
+    parser.add_argument("--epochs", type=int, default=5)
+    args = parser.parse_args()
+
+    train(args.dataset, args.output, args.n_features, args.epochs)
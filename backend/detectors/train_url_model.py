@@ -1,36 +1,66 @@
+import argparse
+import numpy as np
 import pandas as pd
 import pickle
 import os
+import resource
+import sys
+import time
+import zlib
+from collections import deque
+from multiprocessing import Pool
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics import classification_report
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score, classification_report
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from detectors.model_artifact import (  # noqa: E402
+    HashingNgramVectorizer,
+    export_gb_tfidf,
+    export_hgb_features,
+    export_linear_hashing,
+    load_artifact,
+)
+from detectors.url_features import URLFeatureVectorizer, features_frame  # noqa: E402
 
 DATASET_PATH = "backend/datasets/phishing_dataset.csv"
 MODEL_PATH = "backend/models/url_ml_model.pkl"
+ARTIFACT_PATH = "backend/models/url_ml_model"
 
-def train():
+# gb:     GradientBoosting on 15k char_wb TF-IDF features (most accurate, slowest)
+# linear: logistic regression on hashed char_wb 1-3 grams (fast train + inference)
+# hgb:    HistGradientBoosting on the handcrafted url_features.py columns
+BACKENDS = ("gb", "linear", "hgb")
+
+LATENCY_SAMPLE = 500
+LATENCY_BATCH = 256
+
+# Streaming mode (--stream): rows per chunk, % of URLs held out for evaluation
+STREAM_CHUNK_ROWS = 50000
+STREAM_HOLDOUT_PERCENT = 20
 
-    print("[+] Loading dataset...")
-    df = pd.read_csv(DATASET_PATH)
 
+def clean_labels(df):
     df = df.dropna()
     df['url'] = df['url'].astype(str)
-    df['label'] = df['label'].str.lower()
+    df['label'] = df['label'].astype(str).str.lower()
 
     # تحويل النصوص لأرقام داخليًا
     df['label'] = df['label'].map({
         "legitimate": 0,
         "phishing": 1
     })
+    return df.dropna()
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        df['url'],
-        df['label'],
-        test_size=0.2,
-        random_state=42
-    )
 
+def load_dataset(path):
+    return clean_labels(pd.read_csv(path))
+
+
+def train_gb(X_train, y_train):
     print("[+] Vectorizing URLs...")
     vectorizer = TfidfVectorizer(
         max_features=15000,
@@ -39,22 +69,245 @@ def train():
     )
 
     X_train_vec = vectorizer.fit_transform(X_train)
-    X_test_vec = vectorizer.transform(X_test)
 
     print("[+] Training model...")
     model = GradientBoostingClassifier()
     model.fit(X_train_vec, y_train)
 
+    # Legacy pickle, still readable by URLDetector as a fallback
+    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+    with open(MODEL_PATH, "wb") as f:
+        pickle.dump((model, vectorizer), f)
+
+    return model, vectorizer
+
+
+def train_linear(X_train, y_train):
+    print("[+] Hashing URL n-grams...")
+    vectorizer = HashingNgramVectorizer()
+    X_train_vec = vectorizer.transform(X_train).to_scipy()
+
+    print("[+] Training model...")
+    model = SGDClassifier(loss="log_loss", alpha=1e-6, max_iter=20, tol=None, random_state=42)
+    model.fit(X_train_vec, y_train)
+
+    return model, vectorizer
+
+
+def train_hgb(X_train, y_train):
+    print("[+] Extracting URL features...")
+    started = time.perf_counter()
+    # The same url_features() URLDetector runs on every request batch
+    features = features_frame(X_train)
+    print(f"    {len(features)} URLs in {time.perf_counter() - started:.1f} s")
+
+    print("[+] Training model...")
+    model = HistGradientBoostingClassifier(random_state=42)
+    model.fit(features.to_numpy(), y_train)
+
+    return model, URLFeatureVectorizer(list(features.columns))
+
+
+def measure_latency(model, vectorizer, urls):
+    """(us per URL one at a time, us per URL in batches of LATENCY_BATCH)"""
+    urls = list(urls)[:LATENCY_SAMPLE]
+    if not urls:
+        return 0.0, 0.0
+
+    started = time.perf_counter()
+    for url in urls:
+        model.predict_proba(vectorizer.transform([url]))
+    single = (time.perf_counter() - started) / len(urls)
+
+    started = time.perf_counter()
+    for i in range(0, len(urls), LATENCY_BATCH):
+        model.predict_proba(vectorizer.transform(urls[i:i + LATENCY_BATCH]))
+    batched = (time.perf_counter() - started) / len(urls)
+
+    return single * 1e6, batched * 1e6
+
+
+def train(backend="gb", dataset=DATASET_PATH, output=ARTIFACT_PATH):
+
+    print("[+] Loading dataset...")
+    df = load_dataset(dataset)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        df['url'],
+        df['label'],
+        test_size=0.2,
+        random_state=42
+    )
+
+    started = time.perf_counter()
+    if backend == "linear":
+        model, vectorizer = train_linear(X_train, y_train)
+        manifest = export_linear_hashing(model, vectorizer, output)
+    elif backend == "hgb":
+        model, vectorizer = train_hgb(X_train, y_train)
+        manifest = export_hgb_features(model, vectorizer, output)
+    else:
+        model, vectorizer = train_gb(X_train, y_train)
+        # Compact artifact: what URLDetector actually loads (no sklearn needed)
+        manifest = export_gb_tfidf(model, vectorizer, output)
+    train_seconds = time.perf_counter() - started
+
+    # Evaluate the exported artifact: exactly what the service will run
     print("[+] Evaluating...")
-    preds = model.predict(X_test_vec)
+    served_model, served_vectorizer, _ = load_artifact(output)
+    probs = served_model.predict_proba(served_vectorizer.transform(X_test))[:, 1]
+    preds = (probs >= 0.5).astype(int)
     print(classification_report(y_test, preds))
 
-    os.makedirs("backend/models", exist_ok=True)
+    single_us, batch_us = measure_latency(served_model, served_vectorizer, X_test)
+
+    print(f"[=] backend={manifest['backend']} version={manifest['version']}")
+    print(f"    accuracy        {accuracy_score(y_test, preds):.4f}")
+    print(f"    train time      {train_seconds:.1f} s")
+    print(f"    latency/URL     {single_us:.1f} us (one URL per call)")
+    print(f"    latency/URL     {batch_us:.1f} us (batches of {LATENCY_BATCH})")
+
+    print(f"[✓] Model saved successfully! ({manifest['version']})")
+    return manifest
+
+
+# ==============================
+# Streaming (out-of-core) training
+# ==============================
+
+def is_holdout(url):
+    # Deterministic split by URL: the same URL is always on the same side,
+    # whatever the chunking, so the holdout can be re-read in a second pass
+    return zlib.crc32(url.encode("utf-8")) % 100 < STREAM_HOLDOUT_PERCENT
 
-    with open(MODEL_PATH, "wb") as f:
-        pickle.dump((model, vectorizer), f)
 
-    print("[✓] Model saved successfully!")
+def featurize_chunk(urls, labels, holdout, vectorizer_params):
+    """Pool worker: hash one chunk's URLs from one side of the split."""
+    started = time.perf_counter()
+    keep = [is_holdout(u) == holdout for u in urls]
+    urls = [u for u, k in zip(urls, keep) if k]
+    y = np.asarray([l for l, k in zip(labels, keep) if k], dtype=np.int64)
+
+    vectorizer = HashingNgramVectorizer(
+        n_features=vectorizer_params["nFeatures"],
+        ngram_range=vectorizer_params["ngramRange"],
+        lowercase=vectorizer_params["lowercase"],
+    )
+    X = vectorizer.transform(urls).to_scipy()
+    return X, y, time.perf_counter() - started
+
+
+def stream_chunks(path, chunk_rows, timings):
+    reader = pd.read_csv(path, chunksize=chunk_rows, usecols=["url", "label"])
+    while True:
+        started = time.perf_counter()
+        try:
+            chunk = next(reader)
+        except StopIteration:
+            return
+        chunk = clean_labels(chunk)
+        timings["read"] += time.perf_counter() - started
+        yield chunk['url'].tolist(), chunk['label'].astype(int).tolist()
+
+
+def stream_featurized(pool, path, holdout, vectorizer_params, chunk_rows, workers, timings):
+    """
+    Featurize chunks on the pool in file order with at most 2 * workers
+    chunks in flight, so memory stays bounded however large the file is.
+    """
+    pending = deque()
+    for urls, labels in stream_chunks(path, chunk_rows, timings):
+        pending.append(pool.apply_async(featurize_chunk, (urls, labels, holdout, vectorizer_params)))
+        if len(pending) >= 2 * workers:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def train_stream(dataset=DATASET_PATH, output=ARTIFACT_PATH, chunk_rows=STREAM_CHUNK_ROWS,
+                 workers=None, epochs=1):
+    """
+    Out-of-core training for datasets that don't fit in memory: chunked CSV
+    reads, stateless hashed features computed on a process pool, and
+    SGDClassifier.partial_fit. A second pass evaluates the streamed holdout.
+    Always produces a linear_hashing artifact.
+    """
+    workers = workers or os.cpu_count() or 1
+    vectorizer = HashingNgramVectorizer()
+    params = vectorizer.params()
+    model = SGDClassifier(loss="log_loss", alpha=1e-6, random_state=42)
+
+    timings = {"read": 0.0, "featurize_cpu": 0.0, "partial_fit": 0.0}
+    wall = {}
+    rows = 0
+
+    with Pool(workers) as pool:
+        started = time.perf_counter()
+        for epoch in range(epochs):
+            print(f"[+] Training pass {epoch + 1}/{epochs}...")
+            for X, y, cpu in stream_featurized(pool, dataset, False, params, chunk_rows, workers, timings):
+                timings["featurize_cpu"] += cpu
+                if not len(y):
+                    continue
+                fit_started = time.perf_counter()
+                model.partial_fit(X, y, classes=np.array([0, 1]))
+                timings["partial_fit"] += time.perf_counter() - fit_started
+                rows += len(y)
+                print(f"    {rows} rows", end="\r")
+        wall["train"] = time.perf_counter() - started
+        print()
+
+        print("[+] Evaluating streamed holdout...")
+        started = time.perf_counter()
+        tp = fp = tn = fn = 0
+        for X, y, cpu in stream_featurized(pool, dataset, True, params, chunk_rows, workers, timings):
+            timings["featurize_cpu"] += cpu
+            if not len(y):
+                continue
+            preds = model.predict(X)
+            tp += int(np.sum((preds == 1) & (y == 1)))
+            fp += int(np.sum((preds == 1) & (y == 0)))
+            tn += int(np.sum((preds == 0) & (y == 0)))
+            fn += int(np.sum((preds == 0) & (y == 1)))
+        wall["evaluate"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    manifest = export_linear_hashing(model, vectorizer, output, extra={"trainedRows": rows})
+    wall["export"] = time.perf_counter() - started
+
+    total = tp + fp + tn + fn
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"[=] backend={manifest['backend']} version={manifest['version']}")
+    print(f"    train rows      {rows}    holdout rows {total}")
+    print(f"    accuracy        {(tp + tn) / total if total else 0.0:.4f}")
+    print(f"    precision       {precision:.4f}    recall {recall:.4f}    f1 {f1:.4f}")
+    print(f"    wall time       train {wall['train']:.1f} s, evaluate {wall['evaluate']:.1f} s, "
+          f"export {wall['export']:.2f} s")
+    print(f"    stage time      read {timings['read']:.1f} s, featurize {timings['featurize_cpu']:.1f} s "
+          f"(CPU over {workers} workers), partial_fit {timings['partial_fit']:.1f} s")
+    print(f"    peak RSS        {peak_mb:.0f} MB (main process)")
+
+    print(f"[✓] Model saved successfully! ({manifest['version']})")
+    return manifest
+
 
 if __name__ == "__main__":
-    train()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the URL phishing model")
+    parser.add_argument("--backend", choices=BACKENDS, default="gb")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--output", default=ARTIFACT_PATH, help="artifact directory")
+    parser.add_argument("--stream", action="store_true",
+                        help="out-of-core training (linear backend): chunked reads, partial_fit")
+    parser.add_argument("--chunk-rows", type=int, default=STREAM_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=None, help="feature extraction processes")
+    parser.add_argument("--epochs", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.stream:
+        train_stream(args.dataset, args.output, args.chunk_rows, args.workers, args.epochs)
+    else:
+        train(args.backend, args.dataset, args.output)
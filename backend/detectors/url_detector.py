@@ -2,13 +2,22 @@ import re
 import math
 import ipaddress
 from urllib.parse import urlparse
-from typing import List, Tuple
+from typing import List, NamedTuple, Optional, Tuple
+
+from core.cache import TTLCache
+from core.config import HOST_CACHE_SIZE, HOST_CACHE_TTL
+from detectors.domain_index import BRAND_INDEX, TRUSTED_INDEX
+from detectors.keyword_matcher import KeywordMatcher
+from detectors.similarity_index import BRAND_SIMILARITY
 
 
 # ==============================
 # Configuration
 # ==============================
 
+# Seed list, mirrored in backend/data/trusted_domains.txt and brands.txt.
+# Lookups go through TRUSTED_INDEX / BRAND_INDEX / BRAND_SIMILARITY, which
+# also load SAFESURF_ALLOWLIST_PATH / SAFESURF_BRANDS_PATH
 TRUSTED_DOMAINS = [
     "google.com",
     "facebook.com",
@@ -30,6 +39,12 @@ SUSPICIOUS_KEYWORDS = [
     "test", "demo", "trial", "example"
 ]
 
+# Compiled once: one pass over the URL finds every keyword of both lists
+URL_KEYWORDS = KeywordMatcher({
+    "phishing": PHISHING_KEYWORDS,
+    "suspicious": SUSPICIOUS_KEYWORDS,
+})
+
 
 # ==============================
 # Utility Functions
@@ -68,6 +83,53 @@ def is_ip(domain: str) -> bool:
         return False
 
 
+# ==============================
+# Host Signals (cached per host)
+# ==============================
+
+class HostSignals(NamedTuple):
+    trusted: bool
+    ip: bool
+    many_subdomains: bool
+    hyphen: bool
+    high_entropy: bool
+    brand: Optional[str]
+    typosquat: Optional[str]
+
+
+TRUSTED_HOST = HostSignals(True, False, False, False, False, None, None)
+
+# Keyed by host: a phishing kit's thousands of paths share one entry
+HOST_SIGNALS = TTLCache(maxsize=HOST_CACHE_SIZE, ttl=HOST_CACHE_TTL)
+
+
+def host_signals(main_domain: str) -> HostSignals:
+    """Everything analyze_url derives from the host alone."""
+    signals = HOST_SIGNALS.get(main_domain)
+    if signals is not None:
+        return signals
+
+    # Host or a parent domain is listed (whole labels: evilpaypal.com != paypal.com)
+    if TRUSTED_INDEX.contains(main_domain):
+        signals = TRUSTED_HOST
+    else:
+        # First listed brand within distance 1-2, as the original loop over the list
+        typo = BRAND_SIMILARITY.first(main_domain.split(".")[0], max_distance=2)
+        signals = HostSignals(
+            trusted=False,
+            ip=is_ip(main_domain),
+            many_subdomains=main_domain.count(".") > 3,
+            hyphen="-" in main_domain,
+            high_entropy=shannon_entropy(main_domain.replace(".", "")) > 4,
+            # Trusted hosts are excluded above, so any brand name here is off-domain
+            brand=BRAND_INDEX.find(main_domain),
+            typosquat=typo[0] if typo else None,
+        )
+
+    HOST_SIGNALS.set(main_domain, signals)
+    return signals
+
+
 # ==============================
 # Main Detection Engine
 # ==============================
@@ -93,17 +155,19 @@ def analyze_url(url: str) -> Tuple[float, str, List[str]]:
         domain = domain[4:]
 
     main_domain = domain.split(":")[0]
+    # Host-only checks come from the host cache; the rest is per URL
+    host = host_signals(main_domain)
 
     # ==============================
     # 1️⃣ Whitelist Check
     # ==============================
-    if any(main_domain.endswith(td) for td in TRUSTED_DOMAINS):
+    if host.trusted:
         return 0.0, "safe", ["Trusted domain"]
 
     # ==============================
     # 2️⃣ IP Address Usage
     # ==============================
-    if is_ip(main_domain):
+    if host.ip:
         risk_score += 0.35
         reasons.append("Uses IP address instead of domain")
 
@@ -124,7 +188,7 @@ def analyze_url(url: str) -> Tuple[float, str, List[str]]:
     # ==============================
     # 5️⃣ Excessive Subdomains
     # ==============================
-    if main_domain.count(".") > 3:
+    if host.many_subdomains:
         risk_score += 0.12
         reasons.append("Too many subdomains")
 
@@ -138,54 +202,45 @@ def analyze_url(url: str) -> Tuple[float, str, List[str]]:
     # ==============================
     # 7️⃣ Hyphen Abuse
     # ==============================
-    if "-" in main_domain:
+    if host.hyphen:
         risk_score += 0.08
         reasons.append("Hyphen in domain name")
 
     # ==============================
     # 8️⃣ Suspicious Keywords
     # ==============================
-    for word in PHISHING_KEYWORDS:
-        if word in url:
-            risk_score += 0.07
-            reasons.append(f"Contains phishing keyword: {word}")
-            break
+    keyword_hits = URL_KEYWORDS.scan(url)
 
-    for word in SUSPICIOUS_KEYWORDS:
-        if word in url:
-            risk_score += 0.04
-            reasons.append(f"Contains suspicious keyword: {word}")
-            break
+    word = keyword_hits.first("phishing")
+    if word:
+        risk_score += 0.07
+        reasons.append(f"Contains phishing keyword: {word}")
+
+    word = keyword_hits.first("suspicious")
+    if word:
+        risk_score += 0.04
+        reasons.append(f"Contains suspicious keyword: {word}")
 
     # ==============================
     # 9️⃣ High Entropy Detection
     # ==============================
-    entropy = shannon_entropy(main_domain.replace(".", ""))
-    if entropy > 4:
+    if host.high_entropy:
         risk_score += 0.15
         reasons.append("Domain appears random (high entropy)")
 
     # ==============================
     # 🔟 Brand Impersonation
     # ==============================
-    for brand in TRUSTED_DOMAINS:
-        brand_name = brand.split(".")[0]
-        if brand_name in main_domain and not main_domain.endswith(brand):
-            risk_score += 0.25
-            reasons.append(f"Possible brand impersonation of '{brand_name}'")
-            break
+    if host.brand:
+        risk_score += 0.25
+        reasons.append(f"Possible brand impersonation of '{host.brand}'")
 
     # ==============================
     # 1️⃣1️⃣ Typosquatting Detection
     # ==============================
-    base_domain = main_domain.split(".")[0]
-    for trusted in TRUSTED_DOMAINS:
-        trusted_base = trusted.split(".")[0]
-        distance = levenshtein(base_domain, trusted_base)
-        if 0 < distance <= 2:
-            risk_score += 0.30
-            reasons.append(f"Possible typosquatting of '{trusted_base}'")
-            break
+    if host.typosquat:
+        risk_score += 0.30
+        reasons.append(f"Possible typosquatting of '{host.typosquat}'")
 
     # ==============================
     # Normalize Score
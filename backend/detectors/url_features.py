@@ -0,0 +1,265 @@
+"""
+Handcrafted URL features, computed for a whole batch of URLs at once.
+
+One function, url_features(), feeds both ends:
+- URLDetector scores each request batch with rule_risk() over it.
+- train_url_model.py --backend hgb trains on it over the whole dataset,
+  and the "hgb_features" artifact runs the same code at inference.
+Training and serving therefore compute the same numbers by construction.
+
+Batching:
+- Host-level work is done once per distinct host and kept in
+  HOST_FEATURE_CACHE across batches: tldextract, allowlist, brand
+  substrings, and typosquatting candidates via SimilarityIndex.
+- Shannon entropy is computed in numpy over the concatenated code points
+  of all hosts.
+- Scoring is one weighted sum over the feature matrix.
+- Parsing a URL still costs one urlsplit. A query string is parsed only
+  when the URL contains '?'.
+
+Keep FEATURE_NAMES append-only: hgb_features artifacts store the list
+they were trained on, and load_artifact refuses a mismatch.
+"""
+import base64
+import time
+from difflib import SequenceMatcher
+from typing import Iterable, List
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from tldextract.remote import lenient_netloc
+
+from core.cache import TTLCache
+from core.config import HOST_CACHE_SIZE, HOST_CACHE_TTL
+from core.metrics import STAGE_SECONDS
+from detectors.domain_index import BRAND_INDEX, TRUSTED_INDEX
+from detectors.keyword_matcher import KeywordMatcher
+from detectors.similarity_index import BRAND_SIMILARITY
+from detectors.suffix_list import extract as tld_extract
+
+
+SUSPICIOUS_TLDS = {"xyz","top","club","online","site","info","tk"}
+
+SUSPICIOUS_WORDS = {
+    "login","verify","secure","update",
+    "account","bank","paypal","confirm",
+    "password","auth","token","session",
+    "redirect","signin","wallet"
+}
+
+# Compiled once: one pass per URL instead of one `in` per word
+URL_WORDS = KeywordMatcher({"suspicious": sorted(SUSPICIOUS_WORDS)})
+
+FEATURE_NAMES = [
+    "https",              # scheme is https
+    "length",             # characters in the URL
+    "at_sign",            # '@' anywhere in the URL
+    "suspicious_tld",     # public suffix in SUSPICIOUS_TLDS
+    "trusted",            # host or a parent domain is allowlisted
+    "brand_hits",         # brand names inside the host
+    "brand_typos",        # brands 0.8 < similarity < 1 to the domain label
+    "suspicious_words",   # SUSPICIOUS_WORDS found in the URL
+    "query_params",       # distinct query parameters
+    "suspicious_params",  # parameter names in SUSPICIOUS_WORDS
+    "long_param_values",  # parameter values longer than 50 characters
+    "base64_params",      # parameter values that decode as base64
+    "host_entropy",       # Shannon entropy of the host, dots removed
+    "subdomains",         # labels in front of the registrable domain
+    "ip_host",            # host is an IPv4/IPv6 literal
+]
+COLUMN = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# URLDetector's rule score: sum(weight * feature), plus the two
+# non-linear terms in rule_risk()
+RULE_WEIGHTS = np.zeros(len(FEATURE_NAMES))
+for _name, _weight in {
+    "at_sign": 10,
+    "suspicious_tld": 5,
+    "brand_typos": 15,
+    "suspicious_words": 3,
+    "suspicious_params": 5,
+    "long_param_values": 3,
+    "base64_params": 5,
+}.items():
+    RULE_WEIGHTS[COLUMN[_name]] = _weight
+
+HOST_FEATURES = ["suspicious_tld", "trusted", "brand_hits", "brand_typos",
+                 "host_entropy", "subdomains", "ip_host"]
+
+TLDEXTRACT_SECONDS = STAGE_SECONDS.labels("tldextract")
+
+# HOST_FEATURES rows keyed by host (as tldextract reads it from the URL);
+# only path/query features are computed per URL
+HOST_FEATURE_CACHE = TTLCache(maxsize=HOST_CACHE_SIZE, ttl=HOST_CACHE_TTL)
+
+
+# ==============================
+# Column helpers
+# ==============================
+
+def shannon_entropy(strings: List[str]) -> np.ndarray:
+    """Per-string Shannon entropy (bits per character), for all strings at once."""
+    lengths = np.fromiter((len(s) for s in strings), dtype=np.int64, count=len(strings))
+    result = np.zeros(len(strings))
+    if not lengths.any():
+        return result
+
+    codes = np.frombuffer("".join(strings).encode("utf-32-le"), dtype=np.uint32)
+    rows = np.repeat(np.arange(len(strings)), lengths)
+    # One key per (string, character): counts of each character per string
+    keys, counts = np.unique(rows.astype(np.uint64) << np.uint64(21) | codes, return_counts=True)
+    owner = (keys >> np.uint64(21)).astype(np.int64)
+    p = counts / lengths[owner]
+    np.subtract.at(result, owner, p * np.log2(p))
+    return result
+
+
+def _is_base64(value: str) -> bool:
+    try:
+        base64.b64decode(value)
+        return True
+    except Exception:
+        return False
+
+
+def _query_features(query: str):
+    """(params, suspicious names, long values, base64 values)"""
+    params = parse_qs(query)
+    suspicious = long_values = encoded = 0
+    for name, values in params.items():
+        if name.lower() in SUSPICIOUS_WORDS:
+            suspicious += 1
+        if len(values[0]) > 50:
+            long_values += 1
+        if _is_base64(values[0]):
+            encoded += 1
+    return len(params), suspicious, long_values, encoded
+
+
+def _host_features(urls: List[str]) -> np.ndarray:
+    """HOST_FEATURES for one representative URL per distinct host."""
+    out = np.zeros((len(urls), len(HOST_FEATURES)))
+    entropy_input = []
+    extract_seconds = 0.0
+
+    for i, url in enumerate(urls):
+        started = time.perf_counter()
+        ext = tld_extract(url)
+        extract_seconds += time.perf_counter() - started
+        domain = ext.domain.lower()
+        fqdn = ext.fqdn.lower()
+
+        trusted = TRUSTED_INDEX.contains(fqdn)
+        # Lossless pre-filter: every brand with ratio > 0.8 is a candidate
+        typos = sum(
+            1 for brand in BRAND_SIMILARITY.ratio_candidates(domain, 0.8)
+            if 0.8 < SequenceMatcher(None, domain, brand).ratio() < 1
+        )
+        subdomain = ext.subdomain.lower()
+        out[i] = (
+            ext.suffix in SUSPICIOUS_TLDS,
+            trusted,
+            len(BRAND_INDEX.find_all(fqdn)),
+            typos,
+            0.0,
+            len(subdomain.split(".")) if subdomain else 0,
+            bool(ext.ipv4 or ext.ipv6),
+        )
+        bare = fqdn[4:] if fqdn.startswith("www.") else fqdn
+        entropy_input.append(bare.replace(".", ""))
+
+    out[:, HOST_FEATURES.index("host_entropy")] = shannon_entropy(entropy_input)
+    TLDEXTRACT_SECONDS.observe(extract_seconds)
+    return out
+
+
+# ==============================
+# Public API
+# ==============================
+
+def url_features(urls: Iterable[str]) -> np.ndarray:
+    """
+    Feature matrix of shape (len(urls), len(FEATURE_NAMES)), float64.
+    Accepts any iterable of strings: a list, a pandas Series, ...
+    """
+    urls = [str(u) for u in urls]
+    n = len(urls)
+    X = np.zeros((n, len(FEATURE_NAMES)))
+    if not n:
+        return X
+
+    parts = [urlsplit(u) for u in urls]
+    X[:, COLUMN["https"]] = [p.scheme == "https" for p in parts]
+    X[:, COLUMN["length"]] = [len(u) for u in urls]
+    X[:, COLUMN["at_sign"]] = ["@" in u for u in urls]
+    X[:, COLUMN["suspicious_words"]] = [
+        len(URL_WORDS.scan(u.lower()).phrases("suspicious")) for u in urls
+    ]
+
+    # Only URLs with a query string get parsed further
+    query_cols = [COLUMN[c] for c in ("query_params", "suspicious_params",
+                                      "long_param_values", "base64_params")]
+    for i, p in enumerate(parts):
+        if p.query:
+            X[i, query_cols] = _query_features(p.query)
+
+    # Host-level features once per distinct host (tldextract's own notion
+    # of the host), from the host cache when possible, broadcast to rows
+    first_url = {}
+    codes = np.empty(n, dtype=np.intp)
+    for i, u in enumerate(urls):
+        host = lenient_netloc(u)
+        if host not in first_url:
+            first_url[host] = (len(first_url), u)
+        codes[i] = first_url[host][0]
+
+    host_rows = np.empty((len(first_url), len(HOST_FEATURES)))
+    misses = []
+    for host, (j, u) in first_url.items():
+        row = HOST_FEATURE_CACHE.get(host)
+        if row is None:
+            misses.append((host, j, u))
+        else:
+            host_rows[j] = row
+    if misses:
+        computed = _host_features([u for _, _, u in misses])
+        for (host, j, _), row in zip(misses, computed):
+            host_rows[j] = row
+            HOST_FEATURE_CACHE.set(host, row.copy())
+
+    X[:, [COLUMN[c] for c in HOST_FEATURES]] = host_rows[codes]
+
+    return X
+
+
+def features_frame(urls: Iterable[str]):
+    """url_features() as a pandas DataFrame (training, notebooks)."""
+    import pandas as pd
+    return pd.DataFrame(url_features(urls), columns=FEATURE_NAMES)
+
+
+def rule_risk(X: np.ndarray) -> np.ndarray:
+    """URLDetector's rule-based risk for each row of a url_features() matrix."""
+    risk = X @ RULE_WEIGHTS
+    risk += 5 * (X[:, COLUMN["https"]] == 0)
+    risk += 5 * (X[:, COLUMN["length"]] > 75)
+    # Brand names only count on hosts that are not allowlisted. The original
+    # URLDetector added them unconditionally; see README "Allowlist and brands"
+    risk += 5 * X[:, COLUMN["brand_hits"]] * (X[:, COLUMN["trusted"]] == 0)
+    return risk
+
+
+class URLFeatureVectorizer:
+    """Vectorizer interface (transform) over url_features(), for hgb_features models."""
+
+    def __init__(self, feature_names: List[str] = None):
+        feature_names = list(feature_names or FEATURE_NAMES)
+        if feature_names != FEATURE_NAMES:
+            raise ValueError("Model was trained on a different URL feature set")
+        self.feature_names = feature_names
+
+    def transform(self, urls: Iterable[str]) -> np.ndarray:
+        return url_features(urls)
+
+    def params(self):
+        return {"features": list(self.feature_names)}
@@ -1,109 +1,119 @@
-import re
 import math
-import tldextract
 import pickle
 import os
-import base64
 import hashlib
-from urllib.parse import urlparse, parse_qs
-from difflib import SequenceMatcher
+import time
+
+from core.cache import TTLCache
+from core.config import ML_CACHE_SIZE, ML_CACHE_TTL, URL_MODEL_PATH
+from core.metrics import STAGE_SECONDS
+from detectors.model_artifact import is_artifact, load_artifact
+# Re-exported: these lists used to live here
+from detectors.url_features import (  # noqa: F401
+    SUSPICIOUS_TLDS,
+    SUSPICIOUS_WORDS,
+    URL_WORDS,
+    URLFeatureVectorizer,
+    rule_risk,
+    url_features,
+)
 
 MODEL_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models", "url_ml_model.pkl"))
-SUSPICIOUS_TLDS = {"xyz","top","club","online","site","info","tk"}
+# Compact artifact (see model_artifact.py / export_url_model.py), preferred when present.
+# Any backend train_url_model.py produces (gb_tfidf, linear_hashing, hgb_features) loads from here.
+ARTIFACT_PATH = URL_MODEL_PATH or os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models", "url_ml_model"))
 
-SUSPICIOUS_WORDS = {
-    "login","verify","secure","update",
-    "account","bank","paypal","confirm",
-    "password","auth","token","session",
-    "redirect","signin","wallet"
-}
-
-TOP_BRANDS = {
-    "google","paypal","facebook","amazon",
-    "apple","microsoft","instagram"
-}
-
-CACHE = {}
+# Per-batch stage timings, exported on /metrics
+FEATURES_SECONDS = STAGE_SECONDS.labels("features")
+VECTORIZE_SECONDS = STAGE_SECONDS.labels("vectorize")
+PREDICT_SECONDS = STAGE_SECONDS.labels("predict_proba")
 
 def load_model():
+    """
+    Returns (model, vectorizer, manifest). The compact artifact loads with
+    numpy only; the pickle fallback imports scikit-learn.
+    """
+    if is_artifact(ARTIFACT_PATH):
+        return load_artifact(ARTIFACT_PATH)
     if not os.path.exists(MODEL_PATH):
         raise Exception("Model not trained. Run train_url_model.py first.")
     with open(MODEL_PATH,"rb") as f:
-        return pickle.load(f)
+        raw = f.read()
+    model, vectorizer = pickle.loads(raw)
+    version = "gb_tfidf-" + hashlib.sha256(raw).hexdigest()[:12]
+    return model, vectorizer, {"backend": "gb_tfidf", "version": version, "format": "pickle"}
 
 class URLDetector:
 
     def __init__(self):
-        self.model, self.vectorizer = load_model()
+        self.model, self.vectorizer, self.manifest = load_model()
+        # Bounded LRU/TTL cache keyed on the URL string itself (no hashing);
+        # per instance, so a reloaded model never serves the old one's results
+        self.cache = TTLCache(maxsize=ML_CACHE_SIZE, ttl=ML_CACHE_TTL)
 
-    def analyze(self,url):
+    @property
+    def version(self):
+        return self.manifest.get("version", "unknown")
 
-        url_hash = hashlib.md5(url.encode()).hexdigest()
-        if url_hash in CACHE:
-            return CACHE[url_hash]
-
-        parsed = urlparse(url)
-        ext = tldextract.extract(url)
-        domain = ext.domain.lower()
-        full_domain = ext.fqdn.lower()
-
-        risk = 0
-
-        # ===== STRUCTURE =====
-        if parsed.scheme != "https":
-            risk += 5
-
-        if len(url) > 75:
-            risk += 5
-
-        if "@" in url:
-            risk += 10
-
-        if ext.suffix in SUSPICIOUS_TLDS:
-            risk += 5
-
-        # ===== BRAND =====
-        for brand in TOP_BRANDS:
-            if brand in full_domain:
-                risk += 5
-            similarity = SequenceMatcher(None, domain, brand).ratio()
-            if 0.8 < similarity < 1:
-                risk += 15
-
-        for word in SUSPICIOUS_WORDS:
-            if word in url.lower():
-                risk += 3
-
-        # ===== QUERY =====
-        params = parse_qs(parsed.query)
-        for p in params:
-            if p.lower() in SUSPICIOUS_WORDS:
-                risk += 5
-            val = params[p][0]
-            if len(val) > 50:
-                risk += 3
-            try:
-                base64.b64decode(val)
-                risk += 5
-            except:
-                pass
+    def _result(self,url,risk,ml_prob):
 
         # ===== ML =====
-        X = self.vectorizer.transform([url])
-        ml_prob = self.model.predict_proba(X)[0][1]
-        risk += ml_prob * 20
+        risk += float(ml_prob) * 20
 
         confidence = 1 / (1 + math.exp(-risk/15))
         is_phishing = risk > 25
 
         final_label = "phishing" if is_phishing else "legitimate"
 
-        result = {
+        return {
             "url": url,
             "prediction": final_label,
             "risk_score": round(risk,2),
-            "confidence": round(confidence*100,2)
+            "confidence": round(confidence*100,2),
+            "model_version": self.version
         }
 
-        CACHE[url_hash] = result
-        return result
\ No newline at end of file
+    def analyze(self,url):
+        return self.analyze_batch([url])[0]
+
+    def analyze_batch(self,urls):
+        """
+        Analyze many URLs with a single vectorizer/model call.
+        Duplicates are analyzed once; results come back in input order.
+        """
+
+        results = {}
+        misses = []
+
+        for url in dict.fromkeys(urls):
+            cached = self.cache.get(url)
+            if cached is not None:
+                results[url] = cached
+            else:
+                misses.append(url)
+
+        if misses:
+            # Handcrafted features once for the whole batch (url_features.py);
+            # hgb_features models read the very same matrix
+            started = time.perf_counter()
+            features = url_features(misses)
+            FEATURES_SECONDS.observe(time.perf_counter() - started)
+
+            if isinstance(self.vectorizer, URLFeatureVectorizer):
+                X = features
+            else:
+                started = time.perf_counter()
+                X = self.vectorizer.transform(misses)
+                VECTORIZE_SECONDS.observe(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            ml_probs = self.model.predict_proba(X)[:, 1]
+            PREDICT_SECONDS.observe(time.perf_counter() - started)
+            risks = rule_risk(features).tolist()
+
+            for url, risk, ml_prob in zip(misses, risks, ml_probs):
+                result = self._result(url, risk, ml_prob)
+                self.cache.set(url, result)
+                results[url] = result
+
+        return [results[url] for url in urls]
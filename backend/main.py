@@ -1,15 +1,173 @@
-from fastapi import FastAPI
+import time
+
+_import_started = time.perf_counter()
+
+import hmac
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+
+from detectors.url_detector import HOST_SIGNALS, analyze_url
+from detectors.url_features import HOST_FEATURE_CACHE
+from detectors.reputation import REPUTATION
+from detectors.domain_filter import DomainFilterService
+from detectors.domain_index import TRUSTED_DOMAINS_PATH, read_domain_list
+from detectors.email_detector import analyze_email, email_status
+from detectors.email_links import extract_links, fold_link_verdicts, worse_status
+from detectors.email_ml_detector import EmailDetector, merge_email_results
+from detectors.page_links import fold_form_verdicts, page_signal_reasons, prioritize_links, worst_summary
+from detectors.url_ml_detector import ARTIFACT_PATH, MODEL_PATH, URLDetector
+from detectors import suffix_list
+from core.cache import TTLCache, canonicalize_url
+from core.config import (
+    ADMIN_TOKEN,
+    ALLOWLIST_PATH,
+    BATCH_MAX_SIZE,
+    BATCH_MAX_WAIT_MS,
+    EMAIL_LINK_BUDGET_MS,
+    EMAIL_MAX_BATCH,
+    EMAIL_MAX_BODY_CHARS,
+    EMAIL_MAX_LINKS,
+    FILTER_FP_RATE,
+    FILTER_HISTORY,
+    MODEL_HOLDOUT_PATH,
+    MODEL_MIN_ACCURACY,
+    MODEL_WATCH_SECONDS,
+    PAGE_LINK_BUDGET_MS,
+    PAGE_MAX_LINKS,
+    POOL_QUEUE_DEPTH,
+    POOL_WORKERS,
+    STREAM_CHUNK_BYTES,
+    STREAM_CHUNK_RECORDS,
+    STREAM_MAX_IN_FLIGHT,
+    STREAM_MAX_RECORD_BYTES,
+    VERDICT_CACHE_SIZE,
+    VERDICT_CACHE_TTL,
+    VERDICT_STORE_PATH,
+    VERDICT_STORE_TTL,
+)
+from core.batching import MicroBatcher
+from core.executor import DetectorPool, PoolSaturated
+from core.metrics import METRICS
+from core.pipeline import build_url_verdict, hybrid_status, merge_url_results, reputation_verdicts, score_urls  # noqa: F401
+from core.streaming import DuplexStreamingResponse, stream_verdicts
+from core.verdict_store import VerdictStore
+from core.model_registry import ModelRegistry, read_holdout
+
+logger = logging.getLogger("uvicorn.error")
+
+# Detector work runs here, never on the event loop
+detector_pool = DetectorPool(workers=POOL_WORKERS, queue_depth=POOL_QUEUE_DEPTH)
+if os.environ.get("SAFESURF_POOL_KIND", "thread") != "thread":
+    logger.warning("SAFESURF_POOL_KIND is ignored: the detector pool is threads only, use serve.py --workers")
+
+# Final /analyze-url verdicts (rules + ML + merge), keyed on the canonical URL
+verdict_cache = TTLCache(maxsize=VERDICT_CACHE_SIZE, ttl=VERDICT_CACHE_TTL)
 
-from detectors.url_detector import analyze_url
-from detectors.email_detector import analyze_email
-from detectors.url_ml_detector import URLDetector
+# Second level behind verdict_cache: on disk, shared by all workers, survives restarts
+verdict_store = VerdictStore(VERDICT_STORE_PATH, ttl=VERDICT_STORE_TTL) if VERDICT_STORE_PATH else None
+
+
+
+def reputation_version() -> int:
+    REPUTATION.refresh()
+    return REPUTATION.version
+
+
+# Trusted list and known-bad Bloom filter for the extension (GET /domain-filter).
+# Trusted = the lists analyze_url trusts, sent exactly; bad = hosts in the
+# reputation store. Rebuilt when the store changes.
+domain_filters = DomainFilterService(
+    trusted_domains=lambda: [d for path in (TRUSTED_DOMAINS_PATH, ALLOWLIST_PATH) if path
+                             for d in read_domain_list(path)],
+    bad_keys=REPUTATION.host_filter_keys,
+    url_host_keys=REPUTATION.url_host_filter_keys,
+    inputs_version=reputation_version,
+    fp_rate=FILTER_FP_RATE,
+    history=FILTER_HISTORY,
+)
+
+
+def invalidate_model_verdicts(old_version: str, new_version: str) -> None:
+    # Only verdicts the old model contributed to are stale
+    dropped = verdict_cache.invalidate(lambda key, verdict: verdict["meta"].get("modelVersion") == old_version)
+    logger.info("Model %s -> %s: dropped %d cached verdicts", old_version, new_version, dropped)
+    if verdict_store is not None:
+        # Lookups already ignore other versions; this just reclaims the space
+        verdict_store.purge(keep_version=new_version)
+
+
+# Create ML detector once (better performance); the registry can hot-swap it
+_model_started = time.perf_counter()
+model_registry = ModelRegistry(
+    URLDetector,
+    holdout=read_holdout(MODEL_HOLDOUT_PATH),
+    min_accuracy=MODEL_MIN_ACCURACY,
+    on_swap=invalidate_model_verdicts,
+)
+
+# Learned email model, when one has been trained (train_email_model.py)
+try:
+    email_detector: Optional[EmailDetector] = EmailDetector()
+except FileNotFoundError:
+    email_detector = None
+    logger.info("No email model: /analyze-email uses the keyword rules only")
+
+# Cold-start timings, reported on /ready
+STARTUP: Dict[str, Any] = {
+    "importMs": round((_model_started - _import_started) * 1000, 1),
+    "modelLoadMs": round((time.perf_counter() - _model_started) * 1000, 1),
+    "warmupMs": None,
+    "modelVersion": model_registry.version,
+    "modelFormat": model_registry.current.manifest.get("format", "pickle"),
+    "emailModelVersion": email_detector.version if email_detector is not None else None,
+    "pslVersion": suffix_list.PSL_VERSION,
+    "ready": False,
+}
+
+WARMUP_URLS = [
+    "https://www.google.com/",
+    "http://paypa1-login.xyz/verify?token=abc",
+    "http://192.168.0.10/@secure-bank/login.php",
+]
+
+
+def warm_up() -> None:
+    """
+    Touch every lazy path once (suffix list parse, numpy/model kernels,
+    keyword automata) so the first real request is not the slow one.
+    """
+    suffix_list.warm_up()
+    for url in WARMUP_URLS:
+        analyze_url(url)
+    model_registry.current.analyze_batch(WARMUP_URLS)
+    analyze_emails([("warm-up@example.com", "warm-up", "warm-up body")])
 
-app = FastAPI()
 
-# Create ML detector once (better performance)
-url_ml = URLDetector()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await detector_pool.run(warm_up)
+    STARTUP["warmupMs"] = round((time.perf_counter() - started) * 1000, 1)
+    STARTUP["ready"] = True
+    if MODEL_WATCH_SECONDS > 0:
+        model_registry.watch([os.path.join(ARTIFACT_PATH, "manifest.json"), MODEL_PATH], MODEL_WATCH_SECONDS)
+    logger.info(
+        "SafeSurf ready: import %.1f ms, model load %.1f ms, warm-up %.1f ms (model %s, PSL %s)",
+        STARTUP["importMs"], STARTUP["modelLoadMs"], STARTUP["warmupMs"],
+        STARTUP["modelVersion"], STARTUP["pslVersion"],
+    )
+    yield
+    model_registry.stop_watch()
+    detector_pool.shutdown(wait=False)
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,62 +178,139 @@ app.add_middleware(
 )
 
 
-def merge_url_results(
-    rule_score: float,
-    rule_status: str,
-    rule_reasons: List[str],
-    ml_pred: str,
-    ml_confidence: float,
-) -> Dict[str, Any]:
+# ==============================
+# Metrics (GET /metrics)
+# ==============================
+
+REQUEST_SECONDS = METRICS.histogram(
+    "safesurf_request_seconds", "Handler time per analysis endpoint", ("endpoint",),
+)
+VERDICTS = METRICS.counter(
+    "safesurf_verdicts_total", "Verdicts returned, by endpoint and status", ("endpoint", "status"),
+)
+ERRORS = METRICS.counter(
+    "safesurf_errors_total", "Pipeline failures answered with a fallback verdict", ("endpoint", "error"),
+)
+EMAIL_MESSAGE_SECONDS = METRICS.histogram(
+    "safesurf_email_message_seconds", "Analysis time per email, batched stages shared out", (),
+).labels()
+EMAIL_LINKS = METRICS.counter(
+    "safesurf_email_links_total", "Distinct email links, scored or left out (time budget)", ("outcome",),
+)
+PAGE_LINKS = METRICS.counter(
+    "safesurf_page_links_total", "Distinct page links by priority, scored or left out (deadline)",
+    ("priority", "outcome"),
+)
+PAGE_PARTIAL = METRICS.counter(
+    "safesurf_page_partial_total", "/analyze-page verdicts cut short by the deadline", (),
+).labels()
+
+
+def error_verdict(endpoint: str, e: Exception) -> Dict[str, Any]:
     """
-    Merge Rule-based + ML into one final result for the frontend.
-    - riskScore: 0..0.99
-    - status: safe | low_risk | high_risk
-    - reasons: combined explainable list
+    Fallback verdict for a failed analysis. Keeps the shape clients
+    already handle, but the failure is logged, counted and flagged in
+    meta.error instead of passing for a real "safe" result.
+    Call from inside the except block (the log carries the traceback).
     """
+    ERRORS.labels(endpoint, type(e).__name__).inc()
+    logger.exception("%s failed", endpoint)
+    return {
+        "riskScore": 0.0,
+        "status": "safe",
+        "reasons": [f"Server error: {str(e)}"],
+        "meta": {"error": type(e).__name__},
+    }
 
-    # Convert ML confidence (0..100) to 0..0.99 scale
-    ml_score = round(min(max(ml_confidence, 0.0) / 100.0, 0.99), 2)
 
-    # Hybrid score (adjust weights as you like)
-    # rules more explainable -> 60%, ML -> 40%
-    final_score = round(min((rule_score * 0.6) + (ml_score * 0.4), 0.99), 2)
+def pool_busy() -> HTTPException:
+    # Fast rejection: clients retry instead of piling onto a saturated pool
+    return HTTPException(
+        status_code=503,
+        detail="Detector pool is saturated, retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
-    # Decide status using final_score
-    if final_score >= 0.7:
-        final_status = "high_risk"
-    elif final_score >= 0.4:
-        final_status = "low_risk"
-    else:
-        final_status = "safe"
 
-    # Build reasons (keep it clean, not too long)
-    reasons: List[str] = []
+MAX_BATCH_URLS = 500
 
-    # Add rule reasons first (most explainable)
-    if rule_reasons:
-        reasons.extend(rule_reasons[:6])
 
-    # Add ML summary
-    pred_label = "phishing" if str(ml_pred).lower() in ["phishing", "malicious", "1", "true"] else "legitimate"
-    reasons.append(f"ML prediction: {pred_label}")
-    reasons.append(f"ML confidence: {round(ml_confidence, 1)}%")
+def compute_url_verdicts(keys: List[str], urls: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Score canonical URLs that missed the verdict cache (and are not in
+    the reputation store: callers check that first). The persistent store
+    (if enabled) answers first; the rest take one batched ML call, then
+    rules + merge per URL. Fills the cache and the store.
+    urls are what the clients sent: keys are the cache/store keys, urls
+    are what gets scored (default: the keys).
+    """
+    detector = model_registry.current
 
-    # Add final explanation
-    reasons.append(f"Hybrid score = 60% rules + 40% ML")
+    sent: Dict[str, str] = {}
+    for key, url in zip(keys, keys if urls is None else urls):
+        sent.setdefault(key, url)
 
-    return {
-        "riskScore": final_score,
-        "status": final_status,
-        "reasons": reasons,
-        "meta": {  # optional: extra info (frontend can ignore)
-            "ruleScore": rule_score,
-            "ruleStatus": rule_status,
-            "mlScore": ml_score,
-            "mlPrediction": pred_label,
-            "mlConfidence": ml_confidence,
-        },
-    }
+    verdicts: Dict[str, Dict[str, Any]] = {}
+    if verdict_store is not None:
+        verdicts = verdict_store.get_many(keys, detector.version)
+
+    misses = [key for key in sent if key not in verdicts]
+    if misses:
+        computed = score_urls(detector, misses, check_reputation=False, urls=[sent[key] for key in misses])
+        verdicts.update(zip(misses, computed))
+        if verdict_store is not None:
+            verdict_store.put_many(zip(misses, computed), detector.version)
+
+    # A reload may have happened mid-batch: don't cache the old model's verdicts
+    if detector is model_registry.current:
+        for key, verdict in verdicts.items():
+            verdict_cache.set(key, verdict)
+    return [verdicts[key] for key in keys]
+
+
+def analyze_urls_cached(urls: List[str]) -> List[Dict[str, Any]]:
+    """
+    Full /analyze-url pipeline for many URLs, through the verdict cache.
+    The canonical URL is the cache key, so "HTTP://X.com/" and
+    "http://x.com" share one entry; the rules and the model score the URL
+    as sent (the first spelling of a key in the batch). All cache misses
+    go through one batched ML call. The reputation store comes before the
+    cache, so a newly listed URL is flagged at once.
+    """
+    urls = [(url or "").strip() for url in urls]
+    keys = [canonicalize_url(url) for url in urls]
+
+    verdicts = reputation_verdicts(list(dict.fromkeys(keys)))
+    misses: List[str] = []
+    for key in dict.fromkeys(keys):
+        if key in verdicts:
+            continue
+        cached = verdict_cache.get(key)
+        if cached is not None:
+            verdicts[key] = cached
+        else:
+            misses.append(key)
+
+    if misses:
+        sent = dict(zip(reversed(keys), reversed(urls)))
+        verdicts.update(zip(misses, compute_url_verdicts(misses, [sent[key] for key in misses])))
+
+    return [verdicts[key] for key in keys]
+
+
+def compute_url_requests(requests: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Micro-batch of (canonical key, URL as sent) pairs."""
+    return compute_url_verdicts([key for key, _ in requests], [url for _, url in requests])
+
+
+# Concurrent single-URL requests share one model call; in-flight URLs
+# with the same canonical key share one computation
+url_batcher = MicroBatcher(
+    compute_url_requests,
+    runner=detector_pool.run,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+)
 
 
 @app.post("/analyze-url")
@@ -84,43 +319,590 @@ async def analyze_url_endpoint(data: Dict[str, Any]):
     payload:
     { "url": "https://..." }
     """
+    started = time.perf_counter()
     try:
         url = (data.get("url") or "").strip()
+        key = canonicalize_url(url)
 
-        # 1) Rule-based analysis (your current engine)
-        rule_score, rule_status, rule_reasons = analyze_url(url)
+        # Threat feeds first: a listed URL needs no cache, rules or model
+        verdict = reputation_verdicts([key]).get(key) or verdict_cache.get(key)
+        if verdict is None:
+            # Single-flight on the canonical key: "HTTP://A.com/" and "http://a.com" share one computation
+            verdict = await url_batcher.submit(key, (key, url))
 
-        # 2) ML analysis (from url_ml_model.pkl)
-        ml_result = url_ml.analyze(url)  # expected keys: prediction, confidence, risk_score (varies)
-        ml_pred = ml_result.get("prediction", "legitimate")
+        VERDICTS.labels("/analyze-url", verdict["status"]).inc()
+        return verdict
 
-        # confidence might be missing -> fallback to 50
-        try:
-            ml_confidence = float(ml_result.get("confidence", 50.0))
-        except Exception:
-            ml_confidence = 50.0
+    except PoolSaturated:
+        raise pool_busy()
+    except Exception as e:
+        return error_verdict("/analyze-url", e)
+    finally:
+        REQUEST_SECONDS.labels("/analyze-url").observe(time.perf_counter() - started)
+
+
+@app.post("/analyze-urls")
+async def analyze_urls_endpoint(data: Dict[str, Any]):
+    """
+    payload:
+    { "urls": ["https://...", "https://..."] }
 
-        # 3) Merge both results
-        merged = merge_url_results(rule_score, rule_status, rule_reasons, ml_pred, ml_confidence)
-        return merged
+    response:
+    { "results": [ <same shape as /analyze-url>, ... ] }  (input order)
+    """
+    urls = data.get("urls") or []
+    if not isinstance(urls, list):
+        raise HTTPException(status_code=422, detail="'urls' must be a list")
+    if len(urls) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_URLS} URLs per request")
 
+    started = time.perf_counter()
+    try:
+        urls = [str(u or "").strip() for u in urls]
+
+        # One vectorizer/model call for every cache miss in the batch
+        results = await detector_pool.run(analyze_urls_cached, urls)
+        for verdict in results:
+            VERDICTS.labels("/analyze-urls", verdict["status"]).inc()
+        return {"results": results}
+
+    except PoolSaturated:
+        raise pool_busy()
     except Exception as e:
-        return {"riskScore": 0.0, "status": "safe", "reasons": [f"Server error: {str(e)}"]}
+        error = error_verdict("/analyze-urls", e)
+        return {"results": [error for _ in urls]}
+    finally:
+        REQUEST_SECONDS.labels("/analyze-urls").observe(time.perf_counter() - started)
+
+
+def cache_samples(field: str):
+    def collect():
+        return [
+            (("verdicts",), verdict_cache.stats()[field]),
+            (("ml",), model_registry.current.cache.stats()[field]),
+            (("hosts",), HOST_SIGNALS.stats()[field]),
+            (("host_features",), HOST_FEATURE_CACHE.stats()[field]),
+        ] + ([(("store",), verdict_store.stats()[field])] if verdict_store is not None else [])
+    return collect
+
+
+def pool_sample(field: str):
+    return lambda: [((), detector_pool.stats()[field])]
+
+
+METRICS.gauge("safesurf_cache_hits_total", "Cache hits", ("cache",), cache_samples("hits"), kind="counter")
+METRICS.gauge("safesurf_cache_misses_total", "Cache misses", ("cache",), cache_samples("misses"), kind="counter")
+METRICS.gauge("safesurf_cache_evictions_total", "LRU evictions", ("cache",), cache_samples("evictions"), kind="counter")
+METRICS.gauge("safesurf_cache_hit_ratio", "Hits / lookups since start (or model load)", ("cache",), cache_samples("hitRatio"))
+METRICS.gauge("safesurf_cache_entries", "Entries currently cached", ("cache",), cache_samples("size"))
+METRICS.gauge("safesurf_pool_in_flight", "Detector pool tasks running or queued", (), pool_sample("inFlight"))
+METRICS.gauge("safesurf_pool_completed_total", "Detector pool tasks completed", (), pool_sample("completed"), kind="counter")
+METRICS.gauge("safesurf_pool_failed_total", "Detector pool tasks that raised", (), pool_sample("failed"), kind="counter")
+METRICS.gauge("safesurf_pool_rejected_total", "Requests rejected with 503 (pool saturated)", (), pool_sample("rejected"), kind="counter")
+METRICS.external_histograms(
+    "safesurf_batch_size", "URLs per micro-batch model call", (), lambda: [((), url_batcher.batch_sizes)],
+)
+METRICS.external_histograms(
+    "safesurf_batch_wait_ms", "Milliseconds a URL waited for its micro-batch", (), lambda: [((), url_batcher.wait_ms)],
+)
+METRICS.gauge(
+    "safesurf_model_info", "Active URL model (value is always 1)", ("version", "backend", "format"),
+    lambda: [((model_registry.version,
+               str(model_registry.current.manifest.get("backend")),
+               str(model_registry.current.manifest.get("format", "pickle"))), 1)],
+)
+METRICS.gauge(
+    "safesurf_reputation_entries", "Hashes in the reputation store (added, across segments)", ("source",),
+    lambda: [((source,), info["added"]) for source, info in REPUTATION.stats()["sources"].items()],
+)
+METRICS.gauge("safesurf_reputation_version", "Reputation store version", (), lambda: [((), REPUTATION.version)])
+METRICS.gauge("safesurf_ready", "1 once warm-up finished", (), lambda: [((), int(STARTUP["ready"]))])
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus text format: per-stage latency histograms, verdicts by
+    status, errors, cache hit ratios, pool/batcher state, model version.
+    """
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/health")
+async def health_endpoint():
+    """
+    Liveness: the process is up (may still be warming up).
+    """
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready_endpoint():
+    """
+    Readiness: 200 only after the model is loaded and warmed up.
+    """
+    return JSONResponse(status_code=200 if STARTUP["ready"] else 503, content=STARTUP)
+
+
+@app.get("/cache-stats")
+async def cache_stats_endpoint():
+    """
+    Hit/miss/eviction counters for the verdict, ML and per-host caches.
+    """
+    return {
+        "verdicts": verdict_cache.stats(),
+        "ml": model_registry.current.cache.stats(),
+        "hosts": HOST_SIGNALS.stats(),
+        "hostFeatures": HOST_FEATURE_CACHE.stats(),
+        "store": verdict_store.stats() if verdict_store is not None else None,
+    }
+
+
+@app.get("/reputation-stats")
+async def reputation_stats_endpoint():
+    """
+    Threat-intel store: version, entries per feed, lookups and hits, and
+    the domain filter built from it.
+    """
+    return {**REPUTATION.stats(), "domainFilter": domain_filters.stats()}
+
+
+def domain_filter_body(since: Optional[str], snapshot: Any, trusted: Optional[str]) -> bytes:
+    return json.dumps(domain_filters.payload(since, snapshot, trusted_since=trusted)).encode("utf-8")
+
+
+@app.get("/domain-filter")
+async def domain_filter_endpoint(since: Optional[str] = None, trusted: Optional[str] = None,
+                                 if_none_match: Optional[str] = Header(default=None)):
+    """
+    Trusted domains (exact) and a Bloom filter of known-bad domains, for deciding locally.
+
+    query:  ?since=<version the client holds>           (optional)
+            &trusted=<trusted version the client holds>  (optional; default: that of `since`)
+
+    response:
+    { "version", "full": true,  "trusted": <trusted>, "bad": {m, k, count, fpRate, bits}, "urlHosts": <bloom> }
+    { "version", "full": false, "since", "trusted": <trusted>, "bad": {m, k, count, fpRate, words: {index, value}},
+      "urlHosts": <bloom> }
+    { "version", "full": false, "since", "unchanged": true }
+
+    <trusted>: {version, count, domains} | {version, count, unchanged: true}
+             | {version, count, since, added, removed}
+    <bloom>:   hosts with listed URLs, like "bad" (bits or words), or null when unknown
+
+    bits / words are base64 (little-endian). 304 when If-None-Match is the current version.
+    """
+    try:
+        # A rebuild hashes every listed domain: keep it off the event loop
+        snapshot = await detector_pool.run(domain_filters.current)
+        etag = f'"{snapshot.version}"'
+        if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+            return Response(status_code=304, headers={"ETag": etag})
+        # So is the body: a full 1M-domain allowlist is ~15 MB of JSON
+        body = await detector_pool.run(domain_filter_body, since, snapshot, trusted)
+    except PoolSaturated:
+        raise pool_busy()
+    return Response(content=body, media_type="application/json",
+                    headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+@app.get("/pool-stats")
+async def pool_stats_endpoint():
+    """
+    Detector worker pool occupancy and rejection counters.
+    """
+    return detector_pool.stats()
+
+
+@app.get("/batch-stats")
+async def batch_stats_endpoint():
+    """
+    Micro-batcher batch-size and wait-time histograms (tune the window).
+    """
+    return url_batcher.stats()
+
+
+def check_admin(token: Optional[str]) -> None:
+    # Fail closed: with CORS open to every origin, an unset token would let any page reload models
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: set SAFESURF_ADMIN_TOKEN")
+    if not hmac.compare_digest((token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/admin/model")
+async def model_status_endpoint(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Active model version, last reload error and reload history.
+    """
+    check_admin(x_admin_token)
+    return model_registry.status()
+
+
+@app.post("/admin/reload-model")
+async def reload_model_endpoint(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Load the model files again in the background, validate on the holdout
+    sample, then swap atomically. Poll GET /admin/model for the outcome.
+    """
+    check_admin(x_admin_token)
+    started = model_registry.reload_in_background()
+    return JSONResponse(
+        status_code=202 if started else 409,
+        content={"started": started, **model_registry.status()},
+    )
+
+
+# Links per URL-pipeline call (email and page links); the time budget is checked between chunks
+LINK_CHUNK = 16
+
+
+def analyze_emails(emails: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+    """
+    Verdicts for (sender, subject, body) messages, in order:
+    1. keyword rules and link extraction, per message;
+    2. the email model (if trained) on the whole batch, one call;
+    3. the distinct links of the whole batch through the /analyze-url
+       pipeline (verdict cache, store, batched model calls), within
+       EMAIL_LINK_BUDGET_MS;
+    4. per message, the worst link is folded into its score.
+    meta.latencyMs is the message's own work plus its share of the
+    batched stages.
+    """
+    deadline = time.perf_counter() + EMAIL_LINK_BUDGET_MS / 1000
+    detector = email_detector
+
+    own_seconds: List[float] = []
+    rules, links = [], []
+    for sender, subject, body in emails:
+        started = time.perf_counter()
+        rules.append(analyze_email(sender, subject, body[:EMAIL_MAX_BODY_CHARS]))
+        links.append(extract_links(body, EMAIL_MAX_BODY_CHARS, EMAIL_MAX_LINKS))
+        own_seconds.append(time.perf_counter() - started)
+
+    # Empty messages keep their "Empty email content" verdict
+    scored = [i for i, (_, _, reasons) in enumerate(rules) if reasons != ["Empty email content"]]
+    ml_results: Dict[int, Dict[str, Any]] = {}
+    if detector is not None and scored:
+        ml_results = dict(zip(scored, detector.analyze_batch([emails[i] for i in scored])))
+
+    # Each distinct link is scored once for the whole batch
+    distinct = list(dict.fromkeys(url for email_links in links for url in email_links.urls))
+    link_verdicts: Dict[str, Dict[str, Any]] = {}
+    started = time.perf_counter()
+    for i in range(0, len(distinct), LINK_CHUNK):
+        if time.perf_counter() >= deadline:
+            break
+        chunk = distinct[i:i + LINK_CHUNK]
+        link_verdicts.update(zip(chunk, analyze_urls_cached(chunk)))
+    link_seconds = time.perf_counter() - started
+    EMAIL_LINKS.labels("scored").inc(len(link_verdicts))
+    EMAIL_LINKS.labels("skipped").inc(len(distinct) - len(link_verdicts))
+
+    results = []
+    total_links = sum(len(email_links.urls) for email_links in links) or 1
+    for i, ((score, status, reasons), email_links) in enumerate(zip(rules, links)):
+        seconds = own_seconds[i] + link_seconds * len(email_links.urls) / total_links
+        ml = ml_results.get(i)
+        if ml is not None:
+            score, reasons = merge_email_results(score, reasons, ml)
+            seconds += ml["seconds"]
+
+        urls = [url for url in email_links.urls if url in link_verdicts]
+        score, reasons, worst = fold_link_verdicts(score, reasons, urls, [link_verdicts[url] for url in urls])
+        status = email_status(score) if (ml is not None or urls) else status
+        if worst is not None:
+            # A high_risk link at exactly 0.7 is only "suspicious" by email_status
+            status = worse_status(status, worst["status"])
+
+        EMAIL_MESSAGE_SECONDS.observe(seconds)
+        results.append({
+            "riskScore": score,
+            "status": status,
+            "reasons": reasons,
+            "meta": {
+                "mlScore": ml["probability"] if ml is not None else None,
+                "mlPrediction": ml["prediction"] if ml is not None else None,
+                "modelVersion": ml["model_version"] if ml is not None else None,
+                "links": {
+                    "found": email_links.found,
+                    "distinct": len(email_links.urls),
+                    "scored": len(urls),
+                    "truncated": email_links.truncated,
+                    "timedOut": len(urls) < len(email_links.urls),
+                    "worst": worst,
+                },
+                "latencyMs": round(seconds * 1000, 3),
+            },
+        })
+    return results
+
+
+def read_email(data: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (str(data.get("sender") or ""), str(data.get("subject") or ""), str(data.get("body") or ""))
 
 
 @app.post("/analyze-email")
 async def analyze_email_endpoint(data: Dict[str, Any]):
     """
     payload:
-    { "sender": "...", "subject": "...", "body": "..." }
+    { "sender": "...", "subject": "...", "body": "..." }  (body: text or HTML)
+
+    response: { "riskScore", "status", "reasons",
+                "meta": { "mlScore", "mlPrediction", "modelVersion", "latencyMs",
+                          "links": { "found", "distinct", "scored", "truncated", "timedOut", "worst" } } }
     """
+    started = time.perf_counter()
     try:
-        sender = data.get("sender", "")
-        subject = data.get("subject", "")
-        body = data.get("body", "")
+        # Keywords + email model, then the body's links through the URL pipeline
+        verdict = (await detector_pool.run(analyze_emails, [read_email(data)]))[0]
+        VERDICTS.labels("/analyze-email", verdict["status"]).inc()
+        return verdict
 
-        riskScore, status, reasons = analyze_email(sender, subject, body)
-        return {"riskScore": riskScore, "status": status, "reasons": reasons}
+    except PoolSaturated:
+        raise pool_busy()
+    except Exception as e:
+        return error_verdict("/analyze-email", e)
+    finally:
+        REQUEST_SECONDS.labels("/analyze-email").observe(time.perf_counter() - started)
+
+
+@app.post("/analyze-emails")
+async def analyze_emails_endpoint(data: Dict[str, Any]):
+    """
+    payload:
+    { "emails": [ { "sender", "subject", "body" }, ... ] }  (e.g. an inbox page)
 
+    response:
+    { "results": [ <same shape as /analyze-email>, ... ], "meta": { "count", "totalMs" } }  (input order)
+    """
+    emails = data.get("emails") or []
+    if not isinstance(emails, list) or not all(isinstance(e, dict) for e in emails):
+        raise HTTPException(status_code=422, detail="'emails' must be a list of objects")
+    if len(emails) > EMAIL_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {EMAIL_MAX_BATCH} emails per request")
+
+    started = time.perf_counter()
+    try:
+        # One email-model call and one link pass for the whole batch
+        results = await detector_pool.run(analyze_emails, [read_email(e) for e in emails])
+        for verdict in results:
+            VERDICTS.labels("/analyze-emails", verdict["status"]).inc()
+        return {
+            "results": results,
+            "meta": {"count": len(results), "totalMs": round((time.perf_counter() - started) * 1000, 3)},
+        }
+
+    except PoolSaturated:
+        raise pool_busy()
+    except Exception as e:
+        error = error_verdict("/analyze-emails", e)
+        return {"results": [error for _ in emails]}
+    finally:
+        REQUEST_SECONDS.labels("/analyze-emails").observe(time.perf_counter() - started)
+
+
+MAX_PAGE_LINK_INPUT = 5000
+
+
+def score_links_until(urls: List[str], deadline: float) -> Dict[str, Dict[str, Any]]:
+    """
+    Verdicts for urls in order until the deadline. Chunks shrink to what
+    the remaining time allows at the pace measured so far, so the last
+    one does not run far past the deadline.
+    """
+    verdicts: Dict[str, Dict[str, Any]] = {}
+    started = time.perf_counter()
+    i = 0
+    while i < len(urls):
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        size = LINK_CHUNK
+        if verdicts:
+            per_url = (now - started) / len(verdicts)
+            size = max(1, min(LINK_CHUNK, int((deadline - now) / per_url) if per_url > 0 else LINK_CHUNK))
+        chunk = urls[i:i + size]
+        verdicts.update(zip(chunk, analyze_urls_cached(chunk)))
+        i += len(chunk)
+    return verdicts
+
+
+def analyze_page(page: Dict[str, Any], deadline: float) -> Dict[str, Any]:
+    """
+    Whole-page verdict:
+    1. the page URL through the /analyze-url pipeline (always);
+    2. the page's own signals (password forms, their targets and wording);
+    3. links by priority (credential-form targets, then off-site, then
+       same-site) through the same pipeline until `deadline`;
+    4. the worst form target and the worst link are folded in.
+    meta.partial is true when the deadline left links unscored.
+    """
+    started = time.perf_counter()
+    page_url = page["url"]
+    forms = page["forms"]
+
+    page_verdict = analyze_urls_cached([page_url])[0] if page_url else None
+    score = page_verdict["riskScore"] if page_verdict else 0.0
+    reasons = list(page_verdict["reasons"]) if page_verdict else []
+    # Allowlisted sites keep their verdict: links and wording there are the site's own business
+    trusted = "Trusted domain" in reasons
+
+    if not trusted:
+        bump, signal_reasons = page_signal_reasons(page_url, page["title"], page["textSample"], forms,
+                                                   page["hasPasswordForm"])
+        score = round(min(score + bump, 0.99), 2)
+        reasons += signal_reasons
+
+    links = prioritize_links(page_url, page["links"], forms, PAGE_MAX_LINKS)
+    link_verdicts = score_links_until(links.urls, deadline)
+
+    scored = [url for url in links.urls if url in link_verdicts]
+    form_urls = [url for url in scored if links.priority[url] == "form"]
+    other_urls = [url for url in scored if links.priority[url] != "form"]
+    folded_score, folded_reasons, worst_form = fold_form_verdicts(score, reasons, form_urls,
+                                                                  [link_verdicts[u] for u in form_urls])
+    folded_score, folded_reasons, worst_link = fold_link_verdicts(folded_score, folded_reasons, other_urls,
+                                                                  [link_verdicts[u] for u in other_urls])
+    # meta.links.worst covers form targets as well as links
+    worst = worst_summary(worst_form, worst_link)
+    if not trusted:
+        score, reasons = folded_score, folded_reasons
+
+    for url in links.urls:
+        PAGE_LINKS.labels(links.priority[url], "scored" if url in link_verdicts else "skipped").inc()
+    partial = len(scored) < len(links.urls)
+    if partial:
+        PAGE_PARTIAL.inc()
+
+    return {
+        "riskScore": score,
+        "status": hybrid_status(score),
+        "reasons": reasons or ["No suspicious page indicators detected"],
+        "meta": {
+            "page": ({"riskScore": page_verdict["riskScore"], "status": page_verdict["status"]}
+                     if page_verdict else None),
+            "partial": partial,
+            "links": {
+                "received": links.received,
+                "distinct": len(links.urls),
+                "scored": len(scored),
+                "truncated": links.truncated,
+                "timedOut": partial,
+                "worst": worst,
+                "results": [
+                    {"url": url, "priority": links.priority[url],
+                     "riskScore": link_verdicts[url]["riskScore"], "status": link_verdicts[url]["status"]}
+                    for url in scored
+                ],
+            },
+            "latencyMs": round((time.perf_counter() - started) * 1000, 3),
+        },
+    }
+
+
+def read_page(data: Dict[str, Any]) -> Dict[str, Any]:
+    links = data.get("links") or []
+    forms = data.get("forms") or []
+    if not isinstance(links, list) or not isinstance(forms, list) or not all(isinstance(f, dict) for f in forms):
+        raise HTTPException(status_code=422, detail="'links' must be a list and 'forms' a list of objects")
+    if len(links) + len(forms) > MAX_PAGE_LINK_INPUT:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PAGE_LINK_INPUT} links and forms per page")
+    return {
+        "url": str(data.get("url") or "").strip(),
+        "title": str(data.get("title") or ""),
+        "textSample": str(data.get("textSample") or "")[:EMAIL_MAX_BODY_CHARS],
+        "hasPasswordForm": bool(data.get("hasPasswordForm")),
+        "links": links,
+        "forms": forms,
+    }
+
+
+@app.post("/analyze-page")
+async def analyze_page_endpoint(data: Dict[str, Any]):
+    """
+    payload (content.js collectPageSignals()):
+    { "url", "title", "textSample", "hasPasswordForm",
+      "links": ["https://...", ...], "forms": [ { "action", "hasPassword" }, ... ] }
+
+    response: { "riskScore", "status", "reasons",
+                "meta": { "page", "partial", "latencyMs",
+                          "links": { "received", "distinct", "scored", "truncated", "timedOut",
+                                     "worst", "results": [ { "url", "priority", "riskScore", "status" } ] } } }
+    """
+    # The budget starts now: time spent queued for the pool counts against it
+    started = time.perf_counter()
+    deadline = started + PAGE_LINK_BUDGET_MS / 1000
+    page = read_page(data)
+    try:
+        verdict = await detector_pool.run(analyze_page, page, deadline)
+        VERDICTS.labels("/analyze-page", verdict["status"]).inc()
+        return verdict
+
+    except PoolSaturated:
+        raise pool_busy()
     except Exception as e:
-        return {"riskScore": 0.0, "status": "safe", "reasons": [f"Server error: {str(e)}"]}
\ No newline at end of file
+        return error_verdict("/analyze-page", e)
+    finally:
+        REQUEST_SECONDS.labels("/analyze-page").observe(time.perf_counter() - started)
+
+
+def classify_stream_record(value: Any) -> Tuple[Optional[str], Any]:
+    """An /analyze-stream record -> ("url", url) / ("email", (sender, subject, body)) / (None, error)."""
+    if isinstance(value, str):
+        return "url", value.strip()
+    if isinstance(value, dict):
+        if "url" in value:
+            return "url", str(value.get("url") or "").strip()
+        if any(k in value for k in ("sender", "subject", "body")):
+            return "email", read_email(value)
+    return None, "Record needs a 'url' or 'sender' / 'subject' / 'body'"
+
+
+# Same pipelines as /analyze-urls and /analyze-emails, one pool job per chunk
+STREAM_RUNNERS = {"url": analyze_urls_cached, "email": analyze_emails}
+
+
+def count_stream_verdicts(lines: List[Dict[str, Any]]) -> None:
+    for line in lines:
+        if "status" in line:
+            VERDICTS.labels("/analyze-stream", line["status"]).inc()
+
+
+def stream_failed(e: Exception) -> None:
+    ERRORS.labels("/analyze-stream", type(e).__name__).inc()
+    logger.exception("/analyze-stream chunk failed")
+
+
+@app.post("/analyze-stream")
+async def analyze_stream_endpoint(request: Request):
+    """
+    payload (Content-Type: application/x-ndjson), one record per line:
+    { "url": "https://...", "id": ... }
+    { "sender": "...", "subject": "...", "body": "...", "id": ... }
+    https://...                                         (bare URL line)
+
+    response (application/x-ndjson), one line per record, input order:
+    { "index", "id", "kind": "url" | "email", "riskScore", "status", "reasons", "meta" }
+    { "index", "id", "error": "..." }
+    and a last line { "summary": { "records", "urls", "emails", "errors", "chunks", ... } }
+
+    Verdicts are written while the body is still being read. Clients must
+    read the response as they send, or a large upload stalls once both
+    directions' buffers are full.
+    """
+    return DuplexStreamingResponse(
+        stream_verdicts(
+            request.stream(),
+            classify_stream_record,
+            STREAM_RUNNERS,
+            detector_pool.run,
+            chunk_records=STREAM_CHUNK_RECORDS,
+            chunk_bytes=STREAM_CHUNK_BYTES,
+            max_in_flight=STREAM_MAX_IN_FLIGHT,
+            max_record_bytes=STREAM_MAX_RECORD_BYTES,
+            on_chunk=count_stream_verdicts,
+            on_error=stream_failed,
+        ),
+        media_type="application/x-ndjson",
+    )
@@ -0,0 +1,322 @@
+"""
+Offline bulk scanner: the /analyze-url pipeline over URL log files,
+without HTTP.
+
+    python backend/scan_urls.py proxy-2025-06-01.log.gz -o verdicts.jsonl
+    python backend/scan_urls.py gateway.csv --column link -o out.jsonl --workers 8
+    python backend/scan_urls.py events.jsonl.gz --field request.url -o out.jsonl --resume
+
+Input is read as a stream: plain text (one URL per line), CSV or JSONL,
+optionally gzip-compressed (.gz). URLs are deduplicated by canonical URL;
+each distinct URL is scored once. Uses core.pipeline, the same code
+/analyze-url runs: rules + URLDetector + merge_url_results. Scoring fans
+out over a process pool, and each worker loads the model once.
+
+Output is JSONL, one line per distinct URL, in input order:
+    {"url": <as seen first>, "key": <canonical>, "line": <record no.>, **verdict}
+
+Every few seconds the scanner flushes the output and writes
+<output>.offset (records consumed, output bytes). --resume truncates the
+output to that point, skips the consumed records, and rebuilds the dedupe
+set from the output, so an interrupted scan continues where it stopped.
+--skip N starts at record N by hand.
+
+Dedupe keeps an 8-byte blake2b digest per distinct URL: about 60 MB of
+Python ints for 1M distinct URLs.
+"""
+import argparse
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from core.cache import canonicalize_url  # noqa: E402
+from core.pipeline import DEFAULT_POLICY, FULL_PIPELINE, score_urls  # noqa: E402
+
+FORMATS = ("text", "csv", "jsonl")
+CHUNK_SIZE = 256
+CHECKPOINT_SECONDS = 5.0
+PROGRESS_SECONDS = 2.0
+
+
+# ==============================
+# Input
+# ==============================
+
+def open_text(path: str):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, encoding="utf-8", errors="replace", newline="")
+
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "text"
+
+
+def get_field(record: Dict[str, Any], field: str) -> Any:
+    """Dotted path into a JSON object: "request.url"."""
+    value: Any = record
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def read_urls(f, fmt: str, column: str, field: str) -> Iterator[Optional[str]]:
+    """One item per input record; None for records without a usable URL."""
+    if fmt == "text":
+        for line in f:
+            line = line.strip()
+            yield line if line and not line.startswith("#") else None
+
+    elif fmt == "csv":
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        if column.isdigit():
+            index = int(column)
+            # No header row when the first cell already is a URL, with or
+            # without a scheme ("evil.example/login"); a header name has no dot
+            first = header[index].strip() if len(header) > index else ""
+            if "://" in first or ("." in first.strip(".") and not any(c.isspace() for c in first)):
+                yield first
+        elif column in header:
+            index = header.index(column)
+        else:
+            raise SystemExit(f"CSV has no column {column!r} (columns: {', '.join(header)})")
+        for row in reader:
+            yield row[index].strip() if len(row) > index and row[index].strip() else None
+
+    else:
+        for line in f:
+            try:
+                value = get_field(json.loads(line), field)
+            except ValueError:
+                yield None
+                continue
+            yield str(value).strip() if isinstance(value, str) and value.strip() else None
+
+
+def url_digest(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# ==============================
+# Workers
+# ==============================
+
+_detector = None
+_policy = DEFAULT_POLICY
+
+
+def init_worker(cascade: bool = True) -> None:
+    """Load the model once per worker process (not once per chunk)."""
+    global _detector, _policy
+    from detectors import suffix_list
+    from detectors.url_ml_detector import URLDetector
+
+    suffix_list.warm_up()
+    _detector = URLDetector()
+    _policy = DEFAULT_POLICY if cascade else FULL_PIPELINE
+
+
+def scan_chunk(keys: List[str], urls: List[str]) -> List[Dict[str, Any]]:
+    # Keyed by canonical URL, scored as logged (like the API)
+    return score_urls(_detector, keys, _policy, urls=urls)
+
+
+# ==============================
+# Checkpoints
+# ==============================
+
+def checkpoint_path(output: str) -> str:
+    return output + ".offset"
+
+
+def read_checkpoint(output: str) -> Dict[str, Any]:
+    try:
+        with open(checkpoint_path(output), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"records": 0, "outputBytes": 0}
+
+
+def write_checkpoint(output: str, state: Dict[str, Any]) -> None:
+    tmp = checkpoint_path(output) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, checkpoint_path(output))
+
+
+def load_seen(output: str, size: int) -> set:
+    """Digests of every URL already written in the first `size` bytes."""
+    seen = set()
+    with open(output, "rb") as f:
+        for line in f.read(size).splitlines():
+            try:
+                seen.add(url_digest(json.loads(line)["key"]))
+            except (ValueError, KeyError):
+                continue
+    return seen
+
+
+# ==============================
+# Scan
+# ==============================
+
+class Progress:
+
+    def __init__(self, quiet: bool):
+        self.quiet = quiet
+        self.started = time.perf_counter()
+        self.last = 0.0
+        self.records = 0
+        self.unique = 0
+        self.scored = 0
+        self.statuses: Dict[str, int] = {}
+
+    def report(self, force: bool = False) -> None:
+        now = time.perf_counter()
+        if self.quiet or (not force and now - self.last < PROGRESS_SECONDS):
+            return
+        self.last = now
+        elapsed = max(now - self.started, 1e-9)
+        statuses = " ".join(f"{k}={v}" for k, v in sorted(self.statuses.items()))
+        print(
+            f"[scan] {self.records} records, {self.unique} unique, {self.scored} scored "
+            f"| {self.records / elapsed:.0f} records/s, {self.scored / elapsed:.0f} URLs/s | {statuses}",
+            file=sys.stderr,
+        )
+
+
+def chunks(urls: Iterator[Optional[str]], seen: set, skip: int, size: int,
+           progress: Progress) -> Iterator[Tuple[int, List[Tuple[int, str, str]]]]:
+    """(records consumed so far, [(record no., raw url, canonical key)])"""
+    chunk: List[Tuple[int, str, str]] = []
+    for record, url in enumerate(urls):
+        if record < skip:
+            continue
+        progress.records = record + 1
+        if url is None:
+            continue
+        key = canonicalize_url(url)
+        digest = url_digest(key)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        progress.unique += 1
+        chunk.append((record, url, key))
+        if len(chunk) >= size:
+            yield record + 1, chunk
+            chunk = []
+    if chunk:
+        yield progress.records, chunk
+
+
+def scan(args) -> Dict[str, Any]:
+    fmt = args.format or detect_format(args.input)
+    to_stdout = args.output == "-"
+
+    skip = args.skip
+    seen: set = set()
+    if args.resume and not to_stdout and os.path.exists(args.output):
+        state = read_checkpoint(args.output)
+        if state.get("input") not in (None, args.input):
+            raise SystemExit(f"{checkpoint_path(args.output)} belongs to a scan of {state['input']}, not {args.input}")
+        skip = max(skip, state["records"])
+        with open(args.output, "r+b") as f:
+            f.truncate(state["outputBytes"])
+        seen = load_seen(args.output, state["outputBytes"])
+        print(f"[scan] resuming at record {skip} ({len(seen)} URLs already written)", file=sys.stderr)
+
+    out = sys.stdout if to_stdout else open(args.output, "a" if args.resume else "w", encoding="utf-8")
+    progress = Progress(args.quiet)
+    last_checkpoint = time.perf_counter()
+
+    def write(consumed: int, chunk: List[Tuple[int, str, str]], verdicts: List[Dict[str, Any]]) -> None:
+        nonlocal last_checkpoint
+        for (record, url, key), verdict in zip(chunk, verdicts):
+            out.write(json.dumps({"url": url, "key": key, "line": record, **verdict}, ensure_ascii=False) + "\n")
+            progress.statuses[verdict["status"]] = progress.statuses.get(verdict["status"], 0) + 1
+        progress.scored += len(chunk)
+        progress.report()
+        if not to_stdout and time.perf_counter() - last_checkpoint >= CHECKPOINT_SECONDS:
+            out.flush()
+            write_checkpoint(args.output, {"input": args.input, "records": consumed, "outputBytes": out.tell()})
+            last_checkpoint = time.perf_counter()
+
+    with open_text(args.input) as f:
+        stream = chunks(read_urls(f, fmt, args.column, args.field), seen, skip, args.chunk_size, progress)
+
+        if args.workers == 0:
+            init_worker(not args.no_cascade)
+            for done, chunk in stream:
+                write(done, chunk, scan_chunk([key for _, _, key in chunk], [url for _, url, _ in chunk]))
+        else:
+            # Ordered results with at most 2 * workers chunks in flight,
+            # so memory stays flat however large the input is
+            with Pool(args.workers, initializer=init_worker, initargs=(not args.no_cascade,)) as pool:
+                pending: deque = deque()
+                for done, chunk in stream:
+                    pending.append((done, chunk, pool.apply_async(
+                        scan_chunk, ([key for _, _, key in chunk], [url for _, url, _ in chunk]))))
+                    if len(pending) >= 2 * args.workers:
+                        done, done_chunk, result = pending.popleft()
+                        write(done, done_chunk, result.get())
+                while pending:
+                    done, done_chunk, result = pending.popleft()
+                    write(done, done_chunk, result.get())
+
+    out.flush()
+    if not to_stdout:
+        write_checkpoint(args.output, {"input": args.input, "records": max(skip, progress.records),
+                                       "outputBytes": out.tell(), "complete": True})
+        out.close()
+
+    progress.report(force=True)
+    elapsed = time.perf_counter() - progress.started
+    return {
+        "records": progress.records,
+        "unique": progress.unique,
+        "scored": progress.scored,
+        "seconds": round(elapsed, 2),
+        "urlsPerSecond": round(progress.scored / elapsed, 1) if elapsed else 0.0,
+        "statuses": progress.statuses,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score URL log files with the /analyze-url pipeline")
+    parser.add_argument("input", help="text/CSV/JSONL file, optionally .gz ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL verdicts ('-' for stdout)")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--column", default="url", help="CSV column name or 0-based index")
+    parser.add_argument("--field", default="url", help="JSONL field, dotted for nested objects")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="0 = score in this process")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="URLs per model call")
+    parser.add_argument("--no-cascade", action="store_true", help="run the model on every URL (SAFESURF_CASCADE)")
+    parser.add_argument("--resume", action="store_true", help="continue from <output>.offset")
+    parser.add_argument("--skip", type=int, default=0, help="skip the first N input records")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    summary = scan(args)
+    print(json.dumps(summary), file=sys.stderr)
@@ -0,0 +1,158 @@
+"""
+Multi-worker launcher that loads everything once and forks (Linux/macOS).
+
+    python serve.py --workers 4 --port 8000
+
+`uvicorn main:app --workers N` starts N fresh interpreters. Each one
+imports main.py and builds its own model, TF-IDF vocabulary, domain
+indexes, similarity index, keyword automata and suffix list.
+
+This launcher does that work once, in the parent:
+1. Import main (model + indexes), run warm_up() (suffix list, kernels).
+2. gc.freeze(): move every object that exists now into the permanent
+   generation. The cyclic GC then never writes to their headers, and
+   those writes are what un-share copy-on-write pages after a fork.
+3. Bind the listening socket, then os.fork() N workers. Each worker runs
+   its own uvicorn.Server on the shared socket, with its own lifespan
+   (detector thread pool, model watcher).
+4. The parent supervises: it restarts workers that die and forwards
+   SIGINT/SIGTERM for a graceful shutdown.
+
+Model arrays from the compact artifact are memory-mapped files, so the
+page cache shares them in any mode. Forking also shares everything that
+lives on the Python heap.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+logger = logging.getLogger("safesurf.serve")
+
+RESPAWN_DELAY_SECONDS = 1.0
+
+STOP_SIGNALS = {signal.SIGINT, signal.SIGTERM}
+
+
+def preload():
+    """Import and warm the app in the parent, then freeze the heap."""
+    gc.disable()  # no collections while the shared heap is being built
+    started = time.perf_counter()
+
+    import main
+
+    main.warm_up()
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        "Preloaded model %s in %.0f ms; %d objects frozen",
+        main.model_registry.version, (time.perf_counter() - started) * 1000, gc.get_freeze_count(),
+    )
+    return main.app
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, args) -> None:
+    """Child process: serve on the inherited socket until told to stop."""
+    import uvicorn
+
+    # Objects created from here on are this worker's own
+    gc.enable()
+    for signum in STOP_SIGNALS:
+        signal.signal(signum, signal.SIG_DFL)
+    # Blocked by spawn(): a stop signal sent during the fork is delivered now
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    os._exit(0)
+
+
+def spawn(app, sock: socket.socket, args, workers: Dict[int, float]) -> int:
+    # Until the child has reset the handlers and the parent has recorded its
+    # pid, a stop signal would run the parent's stop() in the child, or miss it
+    signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, sock, args)
+            finally:
+                os._exit(1)
+        workers[pid] = time.monotonic()
+    finally:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, STOP_SIGNALS)
+    return pid
+
+
+def supervise(app, sock: socket.socket, args) -> None:
+    workers: Dict[int, float] = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for signum in STOP_SIGNALS:
+        signal.signal(signum, stop)
+
+    for _ in range(args.workers):
+        spawn(app, sock, args, workers)
+    logger.info("Serving on %s:%d with %d forked workers: %s",
+                args.host, args.port, args.workers, " ".join(map(str, workers)))
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.pop(pid, None)
+        if stopping:
+            continue
+        logger.warning("Worker %d exited (status %d); starting a new one", pid, status)
+        time.sleep(RESPAWN_DELAY_SECONDS)
+        if not stopping:
+            spawn(app, sock, args, workers)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preload the SafeSurf app once, then fork workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SAFESURF_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--keep-alive", type=int, default=5, help="HTTP keep-alive timeout (seconds)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        raise SystemExit("serve.py needs os.fork(); use `uvicorn main:app --workers N` on this platform")
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s:     %(message)s")
+    app = preload()
+    supervise(app, bind(args.host, args.port), args)
@@ -0,0 +1,23 @@
+"""
+pytest setup for the backend tests. Modules import as in the service
+(`from core.x import ...`), so backend/ goes on sys.path.
+
+    python -m pytest -q backend
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app, its lifespan entered once: leaving it shuts the detector pool down for good."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
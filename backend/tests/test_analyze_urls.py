@@ -0,0 +1,30 @@
+import main
+
+URLS = ["https://google.com/", "http://paypa1-login.xyz/verify", "HTTP://PAYPA1-LOGIN.xyz/verify",
+        "secure-bank-update.top/login.php", "", "https://en.wikipedia.org/wiki/Phishing"]
+
+
+def test_analyze_batch_matches_single_url_analysis():
+    detector = main.model_registry.current
+    batch = detector.analyze_batch(URLS)
+    assert [r["risk_score"] for r in batch] == [detector.analyze(u)["risk_score"] for u in URLS]
+
+
+def test_batch_endpoint_answers_in_input_order_like_the_single_endpoint(client):
+    main.verdict_cache.clear()
+    batch = client.post("/analyze-urls", json={"urls": URLS}).json()["results"]
+    main.verdict_cache.clear()
+    single = [client.post("/analyze-url", json={"url": url}).json() for url in URLS]
+
+    def comparable(verdict):
+        return verdict["riskScore"], verdict["status"], verdict["reasons"]
+
+    assert [comparable(v) for v in batch] == [comparable(v) for v in single]
+    # One canonical key: the second spelling shares the first one's verdict
+    assert batch[1] == batch[2]
+
+
+def test_batch_endpoint_rejects_bad_and_oversized_input(client):
+    assert client.post("/analyze-urls", json={"urls": "https://a.com"}).status_code == 422
+    assert client.post("/analyze-urls", json={"urls": ["https://a.com"] * (main.MAX_BATCH_URLS + 1)}).status_code == 413
+    assert client.post("/analyze-urls", json={}).json() == {"results": []}
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from core.batching import MicroBatcher
+
+
+async def inline(fn, *args):
+    return fn(*args)
+
+
+def test_concurrent_keys_share_one_batch_call():
+    calls = []
+
+    def batch(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(batch, runner=inline, max_batch_size=32, max_wait_ms=5)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(10))), batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [i * 2 for i in range(10)]
+    assert calls == [list(range(10))]
+    assert stats["inFlight"] == 0 and stats["queued"] == 0
+
+
+def test_a_full_batch_is_sent_without_waiting():
+    calls = []
+
+    def batch(items):
+        calls.append(len(items))
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(batch, runner=inline, max_batch_size=4, max_wait_ms=10000)
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(8))), 1)
+
+    assert asyncio.run(scenario()) == list(range(8))
+    assert calls == [4, 4]
+
+
+def test_single_flight_is_keyed_on_the_key_not_the_item():
+    calls = []
+
+    def batch(items):
+        calls.append(list(items))
+        return [url for _, url in items]
+
+    async def scenario():
+        batcher = MicroBatcher(batch, runner=inline, max_wait_ms=5)
+        results = await asyncio.gather(
+            batcher.submit("http://a.com", ("http://a.com", "HTTP://A.com/")),
+            batcher.submit("http://a.com", ("http://a.com", "http://a.com#top")),
+            batcher.submit("http://b.com", ("http://b.com", "http://b.com")),
+        )
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    # One computation per key, with the first caller's URL
+    assert calls == [[("http://a.com", "HTTP://A.com/"), ("http://b.com", "http://b.com")]]
+    assert results == ["HTTP://A.com/", "HTTP://A.com/", "http://b.com"]
+    assert stats["coalesced"] == 1
+
+
+def test_a_failed_batch_fails_its_callers_and_frees_the_keys():
+    def failing(items):
+        raise ValueError("model down")
+
+    async def scenario():
+        batcher = MicroBatcher(failing, runner=inline, max_wait_ms=1)
+        with pytest.raises(ValueError):
+            await asyncio.gather(batcher.submit("a"), batcher.submit("a"))
+        batcher.batch_fn = lambda items: ["ok" for _ in items]
+        return await batcher.submit("a")
+
+    assert asyncio.run(scenario()) == "ok"
+
+
+def test_a_short_result_list_fails_the_unanswered_keys():
+    async def scenario():
+        batcher = MicroBatcher(lambda items: items[:1], runner=inline, max_wait_ms=1)
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    first, second = asyncio.run(scenario())
+    assert first == "a"
+    assert isinstance(second, RuntimeError)
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from benchmarks import micro, replay
+from benchmarks.common import percentile, read_results, summarize, write_results
+from benchmarks.compare import compare
+from benchmarks.corpus import TRAFFIC_MIX, Corpus, read_traffic
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 100)) == (50, 95, 100)
+    assert percentile([], 50) == 0.0
+    assert summarize([0.001, 0.003])["p50Us"] == 1000.0
+
+
+def test_the_corpus_is_reproducible():
+    assert Corpus(seed=3).urls(50) == Corpus(seed=3).urls(50)
+    assert Corpus(seed=3).urls(50) != Corpus(seed=4).urls(50)
+    assert Corpus(seed=3).traffic(20) == Corpus(seed=3).traffic(20)
+
+
+def test_traffic_round_trips_through_a_file(tmp_path):
+    records = Corpus().traffic(200)
+    assert {r["path"] for r in records} == set(TRAFFIC_MIX)
+
+    path = tmp_path / "traffic.jsonl"
+    path.write_text("".join(json.dumps(r) + "\n" for r in records) + "\n")
+    assert read_traffic(str(path)) == records
+
+    path.write_text('{"json": {}}\n')
+    with pytest.raises(SystemExit):
+        read_traffic(str(path))
+
+
+def micro_result(tmp_path, name, p50):
+    results = {"benchmarks": {"analyze_url": {"p50Us": p50, "p95Us": 10.0}}}
+    return read_results(write_results("micro", results, {}, str(tmp_path / name)))
+
+
+def test_compare_fails_only_past_the_allowed_regression(tmp_path, capsys):
+    base = micro_result(tmp_path, "base.json", 10.0)
+    assert compare(base, micro_result(tmp_path, "same.json", 11.0), 0.15) == 0
+    assert compare(base, micro_result(tmp_path, "slow.json", 12.0), 0.15) == 1
+    assert "analyze_url p50 us" in capsys.readouterr().out
+
+    replay_result = read_results(write_results("replay", {"runs": []}, {}, str(tmp_path / "replay.json")))
+    with pytest.raises(SystemExit):
+        compare(base, replay_result, 0.15)
+
+
+def test_micro_benchmarks_run():
+    results = micro.run(n_urls=40, n_emails=10, batch=8, passes=1)
+    assert results["benchmarks"]["analyze_url.cold"]["calls"] == 40
+    assert results["benchmarks"]["URLDetector.analyze_batch8.cold"]["calls"] == 40
+    assert results["modelVersion"]
+
+
+def test_replay_reports_every_request(client):
+    import main
+
+    records = Corpus().traffic(30)
+    result = client.portal.call(replay.replay, main.app, records, 4, 30)
+    assert result["overall"]["requests"] == 30
+    assert result["overall"]["statuses"] == {"200": 30}
+    assert sum(p["requests"] for p in result["paths"].values()) == 30
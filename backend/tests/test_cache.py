@@ -0,0 +1,73 @@
+import threading
+
+from core.cache import TTLCache, canonicalize_url
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_equivalent_spellings_share_one_key():
+    assert canonicalize_url("HTTP://Example.COM:80/") == "http://example.com"
+    assert canonicalize_url("example.com./a?b=1#frag") == "http://example.com/a?b=1"
+    assert canonicalize_url("https://example.com:443/Path") == "https://example.com/Path"
+    assert canonicalize_url("https://example.com:8443/") == "https://example.com:8443"
+    assert canonicalize_url("http://user@Example.com/") == "http://user@example.com"
+    assert canonicalize_url("  ") == ""
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2 and cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_their_ttl():
+    clock = Clock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+    clock.now = 5
+    assert cache.get("b", "gone") == "gone"
+    assert cache.get("a") == 1
+    clock.now = 60
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["expirations"] == 2 and stats["size"] == 0
+    assert (stats["hits"], stats["misses"], stats["hitRatio"]) == (1, 2, round(1 / 3, 4))
+
+
+def test_invalidate_drops_matching_entries():
+    cache = TTLCache()
+    for i in range(6):
+        cache.set(i, {"modelVersion": "old" if i % 2 else "new"})
+    assert cache.invalidate(lambda key, value: value["modelVersion"] == "old") == 3
+    assert sorted(k for k in range(6) if cache.get(k) is not None) == [0, 2, 4]
+    assert cache.pop(0)["modelVersion"] == "new" and cache.get(0) is None
+
+
+def test_size_stays_bounded_under_concurrent_writers():
+    cache = TTLCache(maxsize=100)
+
+    def write(offset):
+        for i in range(2000):
+            cache.set(offset + i, i)
+            cache.get(offset + i // 2)
+
+    threads = [threading.Thread(target=write, args=(n * 10000,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(cache) == 100
+    assert cache.stats()["evictions"] == 4 * 2000 - 100
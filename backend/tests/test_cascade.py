@@ -0,0 +1,41 @@
+from check_cascade import compare, distinct, failures, sample_corpus
+from core.pipeline import DEFAULT_POLICY, rules_only_verdict, score_urls
+
+
+class FakeDetector:
+    version = "fake-v1"
+
+    def __init__(self):
+        self.calls = []
+
+    def analyze_batch(self, urls):
+        self.calls.append(list(urls))
+        return [{"prediction": "legitimate", "confidence": 60.0, "model_version": self.version} for _ in urls]
+
+
+def test_cascade_agrees_with_full_pipeline():
+    report = compare(distinct(sample_corpus()), DEFAULT_POLICY)
+    assert report["modelCallsAvoided"] > 0, report["tiers"]
+    assert not failures(report), failures(report)
+
+
+def test_rules_only_verdicts_carry_the_active_model_version():
+    verdict = rules_only_verdict((0.0, "safe", ["Trusted domain"]), "trusted", "v7")
+    assert verdict["meta"]["modelVersion"] == "v7"
+    assert verdict["meta"]["cascade"] == "trusted" and verdict["meta"]["mlScore"] is None
+
+    detector = FakeDetector()
+    keys = ["https://google.com", "http://paypa1-login-verify.xyz/secure/account/update"]
+    verdicts = score_urls(detector, keys, check_reputation=False)
+    assert [v["meta"]["modelVersion"] for v in verdicts] == ["fake-v1", "fake-v1"]
+    assert verdicts[0]["meta"]["cascade"] == "trusted"
+    assert keys[0] not in sum(detector.calls, [])
+
+
+def test_analyze_url_reports_the_registry_version_for_skipped_urls(client):
+    import main
+
+    main.verdict_cache.clear()
+    meta = client.post("/analyze-url", json={"url": "https://google.com/"}).json()["meta"]
+    assert meta["cascade"] == "trusted"
+    assert meta["modelVersion"] == main.model_registry.version
@@ -0,0 +1,124 @@
+import base64
+
+import numpy as np
+
+from detectors.domain_filter import BloomFilter, DomainFilterService, filter_keys, fnv1a32
+
+
+def service(state, history=8):
+    def url_host_keys():
+        hosts = state.get("urlHosts", [])
+        return None if hosts is None else filter_keys(hosts)
+
+    return DomainFilterService(
+        trusted_domains=lambda: state["trusted"],
+        bad_keys=lambda: filter_keys(state["bad"]),
+        inputs_version=lambda: (tuple(state["trusted"]), tuple(state["bad"]), repr(state.get("urlHosts", []))),
+        history=history,
+        url_host_keys=url_host_keys,
+    )
+
+
+def apply_words(bits, words):
+    out = np.frombuffer(bits, dtype="<u4").copy()
+    index = np.frombuffer(base64.b64decode(words["index"]), dtype="<u4")
+    out[index] = np.frombuffer(base64.b64decode(words["value"]), dtype="<u4")
+    return out.tobytes()
+
+
+def test_fnv1a32_matches_the_reference_values():
+    # Published FNV-1a 32-bit test vectors
+    assert [int(h) for h in fnv1a32([b"", b"a", b"foobar"])] == [0x811C9DC5, 0xE40C292C, 0xBF9CF968]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    domains = [f"host{i}.example" for i in range(5000)]
+    bloom = BloomFilter.build(filter_keys(domains), 0.001)
+    assert all(bloom.contains(d) for d in domains)
+    assert bloom.contains("WWW.Host7.example.")
+    assert sum(bloom.contains(f"other{i}.test") for i in range(5000)) < 25
+
+
+def test_versions_are_content_digests():
+    state = {"trusted": ["google.com", "paypal.com"], "bad": ["evil.com"]}
+    a, b = service(state).current(), service(dict(state, trusted=["paypal.com", "www.google.com"])).current()
+    assert a.version == b.version
+    assert a.trusted == ("google.com", "paypal.com")
+
+
+def test_bad_delta_rebuilds_the_new_filter():
+    state = {"trusted": ["google.com"], "bad": [f"evil{i}.com" for i in range(100)]}
+    filters = service(state)
+    first = filters.current()
+
+    state["bad"] = state["bad"] + ["new-evil.com"]
+    payload = filters.payload(since=first.version)
+    current = filters.current()
+    assert payload["full"] is False and payload["since"] == first.version
+    assert apply_words(first.bad.bits, payload["bad"]["words"]) == current.bad.bits
+    assert payload["trusted"] == {"version": first.trusted_version, "count": 1, "unchanged": True}
+
+
+def test_unchanged_and_unknown_versions():
+    state = {"trusted": ["google.com"], "bad": ["evil.com"]}
+    filters = service(state)
+    version = filters.current().version
+    assert filters.payload(since=version)["unchanged"] is True
+
+    full = filters.payload(since="forgotten")
+    assert full["full"] is True
+    assert full["trusted"]["domains"] == ["google.com"]
+    assert base64.b64decode(full["bad"]["bits"]) == filters.current().bad.bits
+
+
+def test_trusted_list_is_diffed_against_the_clients_copy():
+    state = {"trusted": [f"site{i}.com" for i in range(50)], "bad": ["evil.com"]}
+    filters = service(state)
+    first = filters.current()
+
+    state["trusted"] = state["trusted"][1:] + ["added.com"]
+    trusted = filters.payload(since=first.version)["trusted"]
+    assert trusted["since"] == first.trusted_version
+    assert trusted["added"] == ["added.com"] and trusted["removed"] == ["site0.com"]
+    assert "domains" not in trusted
+
+
+def test_a_full_bad_filter_does_not_resend_a_trusted_list_the_client_holds():
+    state = {"trusted": [f"site{i}.com" for i in range(50)], "bad": ["evil.com"]}
+    filters = service(state, history=1)
+    first = filters.current()
+    state["bad"] = ["other.com"]
+    filters.current()
+
+    payload = filters.payload(since=first.version, trusted_since=first.trusted_version)
+    assert payload["full"] is True
+    assert payload["trusted"]["unchanged"] is True
+
+
+def test_url_hosts_are_sent_and_diffed_like_the_bad_filter():
+    state = {"trusted": ["google.com"], "bad": ["evil.com"], "urlHosts": ["docs.google.com"]}
+    filters = service(state)
+    first = filters.current()
+    full = filters.payload()
+    assert first.url_hosts.contains("docs.google.com")
+    assert base64.b64decode(full["urlHosts"]["bits"]) == first.url_hosts.bits
+
+    state["urlHosts"] = ["docs.google.com", "sites.google.com"]
+    payload = filters.payload(since=first.version)
+    current = filters.current()
+    assert current.version != first.version
+    assert payload["full"] is False and payload["bad"]["words"]["index"] == ""
+    assert apply_words(first.url_hosts.bits, payload["urlHosts"]["words"]) == current.url_hosts.bits
+
+
+def test_unknown_url_hosts_are_null_and_change_the_version():
+    state = {"trusted": ["google.com"], "bad": ["evil.com"], "urlHosts": None}
+    filters = service(state)
+    unknown = filters.current()
+    assert unknown.url_hosts is None
+    assert filters.payload()["urlHosts"] is None
+
+    state["urlHosts"] = []
+    assert filters.current().version != unknown.version
+    # No copy to apply words to: the whole filter
+    assert "bits" in filters.payload(since=unknown.version)["urlHosts"]
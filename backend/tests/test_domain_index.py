@@ -0,0 +1,41 @@
+from detectors.domain_index import BrandIndex, DomainIndex, read_domain_list
+from detectors.url_detector import analyze_url
+
+
+def test_hosts_match_listed_domains_and_their_subdomains_only():
+    index = DomainIndex(["paypal.com", "docs.example.org", "WWW.Shop.test."])
+    assert index.match("paypal.com") == "paypal.com"
+    assert index.match("a.b.PAYPAL.com.") == "paypal.com"
+    assert index.match("www.shop.test") == "shop.test"
+    assert index.match("evilpaypal.com") is None
+    assert index.match("paypal.com.evil.net") is None
+    assert index.match("example.org") is None
+    assert not index.contains("")
+    assert len(index) == 3 and index.nbytes == 24
+
+
+def test_the_most_specific_listed_domain_wins():
+    index = DomainIndex(["example.org", "docs.example.org"])
+    assert index.match("a.docs.example.org") == "docs.example.org"
+    assert index.match("mail.example.org") == "example.org"
+
+
+def test_domain_lists_accept_tranco_csv_and_comments(tmp_path):
+    path = tmp_path / "top.csv"
+    path.write_text("# top sites\n1,Google.com\n\n2,www.wikipedia.org\nexample.net\n")
+    assert read_domain_list(str(path)) == ["google.com", "wikipedia.org", "example.net"]
+    index = DomainIndex.from_files(str(path), str(tmp_path / "missing.txt"), extra=["extra.io"])
+    assert index.contains("en.wikipedia.org") and index.contains("extra.io")
+
+
+def test_brand_names_are_found_inside_hosts():
+    brands = BrandIndex(["paypal.com", "apple.com", "paypal.de"])
+    assert dict(brands.brands) == {"paypal": "paypal.com", "apple": "apple.com"}
+    assert brands.find("login-paypal-secure.xyz") == "paypal"
+    assert brands.find_all("apple-paypal.verify.top") == ["paypal", "apple"]
+    assert brands.find("example.com") is None
+
+
+def test_url_rules_trust_subdomains_of_listed_domains_only():
+    assert analyze_url("https://accounts.google.com/signin")[2] == ["Trusted domain"]
+    assert analyze_url("https://google.com.account-verify.top/")[2] != ["Trusted domain"]
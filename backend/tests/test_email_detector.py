@@ -0,0 +1,26 @@
+from detectors.email_detector import analyze_email
+
+
+def test_rules_alone_score_the_message():
+    score, status, reasons = analyze_email("support@shop.test", "Action required", "Please open the attachment")
+    # One urgency phrase (0.15) and two call-to-click words (0.08 each)
+    assert (score, status) == (0.31, "low_risk")
+    assert reasons[0] == "Urgency language detected: action required"
+
+    assert analyze_email("", "Lunch", "See you at noon") == (0.0, "safe", ["No suspicious email indicators detected"])
+
+
+def test_wording_alone_decides_the_score():
+    # The old md5 stand-in gave identical wording different scores
+    scores = {analyze_email(f"friend{i}@mail.test", "Hello", f"Notes {i}")[0] for i in range(50)}
+    assert scores == {0.0}
+
+
+def test_analyze_email_without_a_model_uses_the_rules(client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "email_detector", None)
+    body = client.post("/analyze-email", json={"sender": "friend@mail.test", "subject": "Hello",
+                                               "body": "See you at noon"}).json()
+    assert body["riskScore"] == 0.0 and body["status"] == "safe"
+    assert body["meta"]["modelVersion"] is None
@@ -0,0 +1,85 @@
+from detectors.email_links import extract_links, fold_link_verdicts, worse_status
+
+
+def verdict(score, status, *reasons):
+    return {"riskScore": score, "status": status, "reasons": list(reasons)}
+
+
+def test_links_are_extracted_in_order_and_deduplicated():
+    body = """
+    <a href="https://bank.example/login?a=1&amp;b=2">Log in</a>
+    <img src='http://cdn.example/pixel.gif'>
+    <a href=mailto:help@bank.example>mail</a> <a href="#top">top</a> <a href="/relative">x</a>
+    See www.bank.example/help, or (https://en.wikipedia.org/wiki/Foo_(bar)).
+    Again: HTTPS://BANK.EXAMPLE/login?a=1&b=2
+    """
+    links = extract_links(body, max_chars=10000, max_links=10)
+    assert links.urls == [
+        "https://bank.example/login?a=1&b=2",
+        "http://cdn.example/pixel.gif",
+        "http://www.bank.example/help",
+        "https://en.wikipedia.org/wiki/Foo_(bar)",
+    ]
+    assert links.found == 5 and not links.truncated
+
+
+def test_extraction_is_bounded():
+    body = " ".join(f"https://site{i}.example/" for i in range(10))
+    assert extract_links(body, max_chars=10000, max_links=3) == (
+        ["https://site0.example/", "https://site1.example/", "https://site2.example/"], 4, True)
+
+    cut = extract_links(body, max_chars=len("https://site0.example/ "), max_links=10)
+    assert cut.urls == ["https://site0.example/"] and cut.truncated
+
+    assert extract_links("", 100, 10) == ([], 0, False)
+
+
+def test_the_worst_link_raises_the_email():
+    score, reasons, worst = fold_link_verdicts(
+        0.2, ["No suspicious email indicators detected"],
+        ["https://ok.example/", "http://evil.example/login"],
+        [verdict(0.1, "safe"), verdict(0.85, "high_risk", "a", "b", "c", "d")],
+    )
+    assert score == 0.85
+    assert reasons == ["Link to high-risk URL: http://evil.example/login", "Link: a", "Link: b", "Link: c"]
+    assert worst == {"url": "http://evil.example/login", "riskScore": 0.85, "status": "high_risk"}
+
+
+def test_safe_links_leave_the_email_alone():
+    assert fold_link_verdicts(0.4, ["Urgent wording"], ["https://ok.example/"], [verdict(0.2, "safe")]) == (
+        0.4, ["Urgent wording"], {"url": "https://ok.example/", "riskScore": 0.2, "status": "safe"})
+    assert fold_link_verdicts(0.4, ["Urgent wording"], [], []) == (0.4, ["Urgent wording"], None)
+    # A suspicious link scores below the email: the email keeps its own score
+    assert fold_link_verdicts(0.6, [], ["http://a.example/"], [verdict(0.5, "low_risk")])[:2] == (
+        0.6, ["Link to suspicious URL: http://a.example/"])
+
+
+def test_worse_status():
+    assert worse_status("safe", "high_risk") == "high_risk"
+    assert worse_status("low_risk", "safe") == "low_risk"
+    assert worse_status("high_risk", "low_risk") == "high_risk"
+
+
+def test_analyze_email_reports_its_links(client):
+    target = "http://paypal-secure-login.verify-account.xyz/signin.php"
+    body = client.post("/analyze-email", json={
+        "sender": "friend@example.com",
+        "subject": "Photos",
+        "body": f'Here they are: <a href="{target}">album</a> and https://github.com/ and {target}',
+    }).json()
+
+    links = body["meta"]["links"]
+    assert (links["found"], links["distinct"], links["scored"]) == (3, 2, 2)
+    assert not links["truncated"] and not links["timedOut"]
+    assert links["worst"]["url"] == target
+    assert body["riskScore"] >= links["worst"]["riskScore"]
+    assert worse_status(body["status"], links["worst"]["status"]) == body["status"]
+
+
+def test_analyze_emails_keeps_the_input_order(client):
+    results = client.post("/analyze-emails", json={"emails": [
+        {"sender": "a@example.com", "subject": "Hi", "body": "See https://github.com/"},
+        {"sender": "", "subject": "", "body": ""},
+    ]}).json()["results"]
+    assert results[0]["meta"]["links"]["distinct"] == 1
+    assert results[1]["reasons"] == ["Empty email content"]
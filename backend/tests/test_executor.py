@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.executor import DetectorPool, PoolSaturated
+
+
+def test_saturated_pool_rejects_at_once():
+    release = threading.Event()
+
+    async def scenario():
+        pool = DetectorPool(workers=1, queue_depth=1)
+        running = [asyncio.ensure_future(pool.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturated):
+            await pool.run(sum, [1, 2])
+        release.set()
+        assert await asyncio.gather(*running) == [True, True]
+        assert await pool.run(sum, [1, 2]) == 3
+        stats = pool.stats()
+        pool.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 3
+    assert stats["inFlight"] == 0
+
+
+def test_pool_jobs_fill_the_servers_verdict_cache(client):
+    import main
+
+    main.verdict_cache.clear()
+    client.post("/analyze-url", json={"url": "http://paypa1-login.xyz/verify"})
+    assert client.get("/cache-stats").json()["verdicts"]["size"] == 1
+    assert client.get("/domain-filter").status_code == 200
+
+
+def test_failed_jobs_raise_and_free_their_slot():
+    async def scenario():
+        pool = DetectorPool(workers=1, queue_depth=0)
+        with pytest.raises(ZeroDivisionError):
+            await pool.run(divmod, 1, 0)
+        assert await pool.run(divmod, 7, 2) == (3, 1)
+        stats = pool.stats()
+        pool.shutdown()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert (stats["failed"], stats["completed"], stats["inFlight"]) == (1, 1, 0)
+
+
+def test_jobs_run_on_a_worker_thread_not_the_event_loop():
+    async def scenario():
+        pool = DetectorPool(workers=2, queue_depth=0)
+        name = await pool.run(lambda: threading.current_thread().name)
+        pool.shutdown()
+        return name
+
+    assert asyncio.run(scenario()).startswith("detector")
+
+
+def test_a_saturated_pool_answers_503_with_retry_after(client, monkeypatch):
+    import main
+
+    async def saturated(fn, *args):
+        raise PoolSaturated("full")
+
+    monkeypatch.setattr(main.detector_pool, "run", saturated)
+    response = client.post("/analyze-urls", json={"urls": ["https://a.com"]})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,54 @@
+import numpy as np
+
+from detectors import url_features as features_module
+from detectors.url_detector import HOST_SIGNALS, analyze_url, host_signals
+from detectors.url_features import HOST_FEATURE_CACHE, url_features
+
+KIT_URLS = [f"http://paypa1.xyz/{i}/login?session=s{i}" for i in range(50)]
+
+
+def test_host_signals_are_computed_once_per_host():
+    HOST_SIGNALS.clear()
+    hits = HOST_SIGNALS.stats()["hits"]
+    cold = [analyze_url(u) for u in KIT_URLS]
+    assert len(HOST_SIGNALS) == 1
+    assert HOST_SIGNALS.stats()["hits"] - hits == len(KIT_URLS) - 1
+
+    warm = [analyze_url(u) for u in KIT_URLS]
+    assert warm == cold
+    assert host_signals("paypa1.xyz").typosquat == "paypal"
+
+
+def test_trusted_hosts_are_cached_as_trusted():
+    HOST_SIGNALS.clear()
+    assert analyze_url("https://www.google.com/a") == (0.0, "safe", ["Trusted domain"])
+    assert host_signals("google.com").trusted
+
+
+def test_host_features_are_computed_once_per_host(monkeypatch):
+    calls = []
+    original = features_module._host_features
+
+    def counting(urls):
+        calls.append(len(urls))
+        return original(urls)
+
+    monkeypatch.setattr(features_module, "_host_features", counting)
+    HOST_FEATURE_CACHE.clear()
+
+    first = url_features(KIT_URLS + ["https://github.com/x"])
+    assert calls == [2]
+    # Path and query columns still differ per URL on the same host
+    assert len({row.tobytes() for row in first[:-1]}) > 1
+
+    again = url_features(KIT_URLS[::-1] + ["https://github.com/x"])
+    assert calls == [2]
+    assert np.array_equal(again[:-1], first[:-1][::-1])
+    assert np.array_equal(again[-1], first[-1])
+
+
+def test_a_cached_row_is_not_shared_with_the_caller():
+    HOST_FEATURE_CACHE.clear()
+    X = url_features(["http://paypa1.xyz/a"])
+    X[:] = -1
+    assert (url_features(["http://paypa1.xyz/a"]) >= 0).all()
@@ -0,0 +1,55 @@
+import random
+
+from detectors.keyword_matcher import KeywordMatcher
+
+
+def naive(categories, text):
+    return sorted((i, i + len(p), p, c) for c, phrases in categories.items() for p in phrases
+                  for i in range(len(text)) if text.startswith(p, i))
+
+
+def test_overlapping_and_nested_phrases_are_all_found():
+    matcher = KeywordMatcher({"urgency": ["verify now", "now"], "phishing": ["verify", "ify"]})
+    hits = sorted((h.start, h.end, h.phrase, h.category) for h in matcher.scan("please verify now"))
+    assert hits == [(7, 13, "verify", "phishing"), (7, 17, "verify now", "urgency"),
+                    (10, 13, "ify", "phishing"), (14, 17, "now", "urgency")]
+
+
+def test_phrases_come_back_distinct_in_list_order():
+    matcher = KeywordMatcher({"phishing": ["login", "verify", "account"]})
+    hits = matcher.scan("account verify account login")
+    assert hits.phrases("phishing") == ["login", "verify", "account"]
+    assert hits.first("phishing") == "login"
+    assert hits.first("other") is None and hits.phrases("other") == []
+
+
+def test_a_phrase_in_two_categories_is_reported_for_both():
+    matcher = KeywordMatcher({"a": ["click"], "b": ["click", ""]})
+    assert sorted(h.category for h in matcher.scan("click")) == ["a", "b"]
+
+
+def test_matches_agree_with_a_naive_scan():
+    rng = random.Random(3)
+    alphabet = "abcde"
+    categories = {
+        "x": list({"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(40)}),
+        "y": list({"".join(rng.choice(alphabet) for _ in range(rng.randint(2, 6))) for _ in range(40)}),
+    }
+    matcher = KeywordMatcher(categories)
+    for _ in range(50):
+        text = "".join(rng.choice(alphabet + " ") for _ in range(rng.randint(0, 80)))
+        found = sorted((h.start, h.end, h.phrase, h.category) for h in matcher.scan(text))
+        assert found == naive(categories, text)
+
+
+def test_email_and_url_rules_use_the_shared_keyword_lists():
+    from detectors.email_detector import analyze_email
+
+    reasons = analyze_email("", "Unusual activity", "Reset your password immediately")[2]
+    assert "Social-engineering phrase detected: unusual activity" in reasons
+    assert "Social-engineering phrase detected: reset your password" in reasons
+    assert "Urgency language detected: immediately" in reasons
+
+    from detectors.url_detector import analyze_url
+
+    assert "Contains phishing keyword: login" in analyze_url("http://shop.example.net/login")[2]
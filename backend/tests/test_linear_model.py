@@ -0,0 +1,48 @@
+import numpy as np
+
+from detectors import train_url_model
+from detectors.export_url_model import SAMPLE_URLS
+from detectors.model_artifact import HashingNgramVectorizer, export_linear_hashing, load_artifact
+
+HOLDOUT_CSV = "backend/data/model_holdout.csv"
+
+
+def test_hashed_rows_are_stable_and_normalized():
+    vectorizer = HashingNgramVectorizer(n_features=2 ** 12)
+    X = vectorizer.transform(SAMPLE_URLS)
+    assert X.shape == (len(SAMPLE_URLS), 2 ** 12)
+
+    again = HashingNgramVectorizer(n_features=2 ** 12).transform(SAMPLE_URLS)
+    assert np.array_equal(X.indices, again.indices) and np.array_equal(X.data, again.data)
+
+    norms = np.sqrt(np.asarray(X.to_scipy().multiply(X.to_scipy()).sum(axis=1)).ravel())
+    assert np.allclose(norms[:-1], 1.0)
+    assert norms[-1] == 0.0  # "" has no n-grams
+
+
+def test_exported_linear_model_matches_sklearn(tmp_path):
+    from sklearn.linear_model import SGDClassifier
+
+    df = train_url_model.load_dataset(HOLDOUT_CSV)
+    vectorizer = HashingNgramVectorizer(n_features=2 ** 16)
+    X = vectorizer.transform(df["url"]).to_scipy()
+    model = SGDClassifier(loss="log_loss", alpha=1e-4, random_state=42).fit(X, df["label"])
+
+    path = str(tmp_path / "linear")
+    manifest = export_linear_hashing(model, vectorizer, path)
+    assert manifest["backend"] == "linear_hashing"
+
+    compact_model, compact_vectorizer, _ = load_artifact(path)
+    expected = model.predict_proba(vectorizer.transform(SAMPLE_URLS).to_scipy())[:, 1]
+    actual = compact_model.predict_proba(compact_vectorizer.transform(SAMPLE_URLS))[:, 1]
+    assert np.allclose(expected, actual, atol=1e-5)
+
+
+def test_train_linear_backend_end_to_end(tmp_path, capsys):
+    path = str(tmp_path / "model")
+    manifest = train_url_model.train("linear", HOLDOUT_CSV, path)
+
+    model, vectorizer, loaded = load_artifact(path)
+    assert loaded["version"] == manifest["version"]
+    assert model.predict_proba(vectorizer.transform(SAMPLE_URLS)).shape == (len(SAMPLE_URLS), 2)
+    assert "latency/URL" in capsys.readouterr().out
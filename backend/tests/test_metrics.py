@@ -0,0 +1,54 @@
+import threading
+
+from core.metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram([0.001, 0.01, 0.1])
+    for value in (0.0005, 0.001, 0.005, 0.05, 2.0):
+        h.observe(value)
+    snap = h.snapshot()
+    assert snap["buckets"] == {"0.001": 2, "0.01": 3, "0.1": 4, "+Inf": 5}
+    assert snap["count"] == 5 and snap["sum"] == 2.0565
+
+
+def test_concurrent_observations_are_all_counted():
+    h = Histogram([1.0])
+
+    def observe():
+        for _ in range(1000):
+            h.observe(0.5)
+
+    threads = [threading.Thread(target=observe) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert h.snapshot()["count"] == 8000
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter("hits_total", "Hits", ("path",)).labels('a"b').inc(2)
+    registry.histogram("stage_seconds", "Stages", ("stage",), buckets=(0.1,)).labels("rules").observe(0.05)
+    registry.gauge("ready", "Ready", (), lambda: [((), 1)])
+
+    text = registry.render()
+    assert '# TYPE hits_total counter\nhits_total{path="a\\"b"} 2.0' in text
+    assert 'stage_seconds_bucket{stage="rules",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="rules",le="+Inf"} 1' in text
+    assert 'stage_seconds_count{stage="rules"} 1' in text
+    assert "# TYPE ready gauge\nready 1" in text
+
+
+def test_metrics_endpoint_reports_pipeline_stages(client):
+    client.post("/analyze-url", json={"url": "http://metrics-test.example/login?token=abc"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    text = response.text
+    for stage in ("rules", "features", "predict_proba"):
+        assert f'safesurf_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'safesurf_request_seconds_count{endpoint="/analyze-url"}' in text
+    assert "safesurf_verdicts_total{" in text
@@ -0,0 +1,50 @@
+import pickle
+import socket
+
+import numpy as np
+
+from detectors.export_url_model import ARTIFACT_PATH, PICKLE_PATH, SAMPLE_URLS
+from detectors.model_artifact import char_wb_ngrams, is_artifact, load_artifact, read_manifest
+from detectors.suffix_list import PSL_VERSION, extract, read_psl_version
+
+
+def test_suffix_list_is_read_from_the_bundled_snapshot(monkeypatch):
+    def no_network(*args, **kwargs):
+        raise AssertionError("the suffix list must not be fetched")
+    monkeypatch.setattr(socket, "create_connection", no_network)
+
+    parts = extract("https://a.b.example.co.uk/login")
+    assert (parts.subdomain, parts.domain, parts.suffix) == ("a.b", "example", "co.uk")
+    assert extract("http://192.168.0.10/x").domain == "192.168.0.10"
+    assert PSL_VERSION != "unknown"
+
+
+def test_psl_version_is_unknown_without_a_header(tmp_path):
+    path = tmp_path / "list.dat"
+    path.write_text("// VERSION: 2025-01-01_00-00-00_UTC\ncom\n")
+    assert read_psl_version(str(path)) == "2025-01-01_00-00-00_UTC"
+    path.write_text("com\n")
+    assert read_psl_version(str(path)) == "unknown"
+    assert read_psl_version(str(tmp_path / "missing.dat")) == "unknown"
+
+
+def test_char_wb_ngrams_match_sklearn():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    analyzer = TfidfVectorizer(analyzer="char_wb", ngram_range=(1, 3)).build_analyzer()
+    for doc in SAMPLE_URLS + ["Two  Words\there", "a"]:
+        assert char_wb_ngrams(doc, 1, 3) == analyzer(doc)
+
+
+def test_shipped_artifact_matches_the_pickle():
+    assert is_artifact(ARTIFACT_PATH)
+    assert read_manifest(ARTIFACT_PATH)["backend"] == "gb_tfidf"
+
+    model, vectorizer, manifest = load_artifact(ARTIFACT_PATH)
+    with open(PICKLE_PATH, "rb") as f:
+        sk_model, sk_vectorizer = pickle.load(f)
+
+    expected = sk_model.predict_proba(sk_vectorizer.transform(SAMPLE_URLS))[:, 1]
+    actual = model.predict_proba(vectorizer.transform(SAMPLE_URLS))[:, 1]
+    assert np.allclose(expected, actual, atol=1e-9)
+    assert manifest["source"] == "url_ml_model.pkl"
@@ -0,0 +1,156 @@
+import os
+import pickle
+import threading
+
+import numpy as np
+import pytest
+
+from core.model_registry import ModelRegistry, ModelValidationError
+from detectors.export_url_model import PICKLE_PATH, SAMPLE_URLS
+from detectors.model_artifact import export_gb_tfidf, export_linear_hashing, load_artifact
+
+
+class FakeModel:
+    def __init__(self, p):
+        self.p = p
+
+    def predict_proba(self, X):
+        return np.array([[1 - self.p, self.p]] * len(X))
+
+
+class FakeVectorizer:
+    def transform(self, urls):
+        return list(urls)
+
+
+class FakeDetector:
+    def __init__(self, version, p):
+        self.version = version
+        self.model = FakeModel(p)
+        self.vectorizer = FakeVectorizer()
+        self.manifest = {"backend": "fake"}
+
+
+HOLDOUT = [("http://evil.example/login", 1), ("https://good.example/", 1)]
+
+
+def loader_of(*detectors):
+    it = iter(detectors)
+    return lambda: next(it)
+
+
+def test_reload_swaps_after_validation_and_reports_the_swap():
+    swaps = []
+    registry = ModelRegistry(loader_of(FakeDetector("v1", 0.9), FakeDetector("v2", 0.9)),
+                             holdout=HOLDOUT, min_accuracy=0.5, on_swap=lambda a, b: swaps.append((a, b)))
+    event = registry.reload()
+    assert registry.version == "v2"
+    assert event["holdoutAccuracy"] == 1.0
+    assert swaps == [("v1", "v2")]
+
+
+def test_reload_keeps_the_active_model_when_validation_fails():
+    registry = ModelRegistry(loader_of(FakeDetector("v1", 0.9), FakeDetector("v2", 0.1)),
+                             holdout=HOLDOUT, min_accuracy=0.5)
+    with pytest.raises(ModelValidationError):
+        registry.reload()
+    assert registry.version == "v1"
+    assert "ModelValidationError" in registry.status()["lastError"]
+
+
+def test_only_one_reload_runs_at_a_time():
+    release = threading.Event()
+    started = threading.Event()
+    detectors = iter([FakeDetector("v1", 0.9), FakeDetector("v2", 0.9)])
+
+    def loader():
+        detector = next(detectors)
+        if detector.version == "v2":
+            started.set()
+            release.wait(5)
+        return detector
+
+    registry = ModelRegistry(loader)
+    assert registry.reload_in_background()
+    started.wait(5)
+    assert not registry.reload_in_background()
+    with pytest.raises(RuntimeError):
+        registry.reload()
+    release.set()
+    for _ in range(100):
+        if not registry.status()["reloading"]:
+            break
+        threading.Event().wait(0.01)
+    assert registry.version == "v2"
+
+
+class Linear:
+    def __init__(self, coef, intercept):
+        self.coef_ = np.asarray(coef, dtype=np.float32)
+        self.intercept_ = np.array([intercept])
+
+
+def test_export_never_changes_a_mapped_artifact(tmp_path):
+    from detectors.model_artifact import HashingNgramVectorizer
+
+    vectorizer = HashingNgramVectorizer(n_features=64)
+    path = str(tmp_path / "model")
+    export_linear_hashing(Linear(np.linspace(-1, 1, 64), 0.0), vectorizer, path, version="v1")
+    model, vec, manifest = load_artifact(path)
+    X = vec.transform(SAMPLE_URLS)
+    before = model.predict_proba(X)
+
+    for i in range(2, 6):
+        export_linear_hashing(Linear(np.full(64, float(i)), 1.0), vectorizer, path, version=f"v{i}")
+        # The mapped arrays still belong to v1
+        assert np.array_equal(model.predict_proba(X), before)
+
+    assert os.path.islink(path)
+    assert load_artifact(path)[2]["version"] == "v5"
+    # The active version and the two before it
+    assert len(os.listdir(path + ".versions")) == 3
+
+
+def test_failed_export_leaves_the_active_artifact_alone(tmp_path, monkeypatch):
+    from detectors import model_artifact
+    from detectors.model_artifact import HashingNgramVectorizer
+
+    path = str(tmp_path / "model")
+    export_linear_hashing(Linear(np.zeros(64), 0.0), HashingNgramVectorizer(n_features=64), path, version="v1")
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(model_artifact, "_write_manifest", fail)
+    with pytest.raises(OSError):
+        export_linear_hashing(Linear(np.ones(64), 0.0), HashingNgramVectorizer(n_features=64), path)
+    assert load_artifact(path)[2]["version"] == "v1"
+    assert len(os.listdir(path + ".versions")) == 1
+
+
+def test_first_export_replaces_a_plain_directory(tmp_path):
+    with open(PICKLE_PATH, "rb") as f:
+        model, vectorizer = pickle.load(f)
+    path = str(tmp_path / "url_ml_model")
+    os.makedirs(path)
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        f.write("{}")
+
+    export_gb_tfidf(model, vectorizer, path, version="gb")
+    assert os.path.islink(path)
+    compact, compact_vectorizer, manifest = load_artifact(path)
+    assert manifest["version"] == "gb"
+    expected = model.predict_proba(vectorizer.transform(SAMPLE_URLS))[:, 1]
+    assert np.allclose(compact.predict_proba(compact_vectorizer.transform(SAMPLE_URLS))[:, 1], expected)
+
+
+def test_admin_routes_fail_closed_without_a_token(client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+    assert client.get("/admin/model").status_code == 403
+    assert client.post("/admin/reload-model").status_code == 403
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/admin/model", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/model", headers={"X-Admin-Token": "s3cret"}).status_code == 200
@@ -0,0 +1,57 @@
+from detectors.page_links import fold_form_verdicts, prioritize_links, worst_summary
+
+
+def verdict(score, status):
+    return {"riskScore": score, "status": status, "reasons": [f"reason {score}"]}
+
+
+def test_links_are_ordered_form_offsite_same_site():
+    links = prioritize_links(
+        "https://shop.example.com/cart",
+        ["https://shop.example.com/help", "https://other.org/x", "mailto:a@b.c",
+         "https://shop.example.com/cart", "https://other.org/x#top"],
+        [{"action": "https://collect.evil.test/post", "hasPassword": True},
+         {"action": "https://search.example.com/q", "hasPassword": False}],
+        max_links=10,
+    )
+    assert links.urls == ["https://collect.evil.test/post", "https://other.org/x",
+                          "https://search.example.com/q", "https://shop.example.com/help"]
+    assert links.priority["https://collect.evil.test/post"] == "form"
+    assert links.received == 7 and not links.truncated
+
+    assert prioritize_links("https://a.com/", ["https://b.com/1", "https://b.com/2"], [], max_links=1).truncated
+
+
+def test_a_risky_form_target_raises_the_page_and_is_summarized():
+    score, reasons, summary = fold_form_verdicts(0.2, ["page"], ["https://t.test/a", "https://t.test/b"],
+                                                 [verdict(0.4, "safe"), verdict(0.9, "high_risk")])
+    assert score == 0.9
+    assert reasons[1] == "Password form submits to high-risk URL: https://t.test/b"
+    assert summary == {"url": "https://t.test/b", "riskScore": 0.9, "status": "high_risk"}
+
+    assert fold_form_verdicts(0.2, [], [], []) == (0.2, [], None)
+
+
+def test_worst_summary_includes_form_targets():
+    form = {"url": "https://form.test/", "riskScore": 0.8, "status": "high_risk"}
+    link = {"url": "https://link.test/", "riskScore": 0.3, "status": "safe"}
+    assert worst_summary(form, link) == form
+    assert worst_summary(None, link) == link
+    assert worst_summary(None, None) is None
+
+
+def test_analyze_page_reports_a_form_target_as_the_worst_link(client):
+    target = "http://paypal-secure-login.verify-account.xyz/signin.php"
+    body = client.post("/analyze-page", json={
+        "url": "https://blog.example.org/post",
+        "title": "Post",
+        "textSample": "",
+        "hasPasswordForm": True,
+        "links": ["https://wikipedia.org/wiki/Phishing"],
+        "forms": [{"action": target, "hasPassword": True}],
+    }).json()
+
+    worst = body["meta"]["links"]["worst"]
+    assert worst["url"] == target
+    assert worst["riskScore"] == max(r["riskScore"] for r in body["meta"]["links"]["results"])
+    assert body["riskScore"] >= worst["riskScore"]
@@ -0,0 +1,147 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from core import pipeline
+from detectors.domain_filter import filter_keys
+from detectors.reputation import MAX_DELTAS, ReputationMatch, ReputationStore, compile_entries, read_feed
+
+
+def test_compile_entries_keeps_the_hosts_of_url_entries():
+    hashes, hosts, url_hosts = compile_entries(["evil.com", "https://docs.google.com/forms/d/x", "", "a.b/c"])
+    assert len(hashes) == 3
+    assert list(hosts) == list(filter_keys(["evil.com"]))
+    assert list(url_hosts) == list(np.sort(filter_keys(["docs.google.com", "a.b"])))
+
+
+def test_url_hosts_survive_removals_and_compaction(tmp_path):
+    store = ReputationStore(str(tmp_path))
+    store.update("feed", ["https://docs.google.com/forms/d/x"])
+    store.update("feed", removed=["https://docs.google.com/forms/d/x"])
+    for i in range(MAX_DELTAS):
+        store.update("feed", [f"http://site{i}.example/login"])
+
+    assert len(store.read_manifest()["sources"]["feed"]) == 1
+    # Delisting one URL keeps the host: others on it may be listed
+    assert set(store.url_host_filter_keys()) == set(
+        filter_keys(["docs.google.com"] + [f"site{i}.example" for i in range(MAX_DELTAS)]))
+
+
+def test_url_hosts_are_unknown_while_a_segment_predates_them(tmp_path):
+    store = ReputationStore(str(tmp_path))
+    store.update("old", ["http://evil.example/login"])
+    manifest = store.read_manifest()
+    del manifest["sources"]["old"][0]["urlHostKeys"]
+    with open(os.path.join(str(tmp_path), "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    store.update("new", ["evil.com"])
+    assert store.url_host_filter_keys() is None
+
+    store.replace("old", ["http://evil.example/login"])
+    assert list(store.url_host_filter_keys()) == list(filter_keys(["evil.example"]))
+
+
+def test_hosts_match_subdomains_and_urls_match_exactly(tmp_path):
+    store = ReputationStore(str(tmp_path))
+    store.update("feed", ["evil.com", "http://docs.example.org/forms/x"])
+
+    assert store.lookup("https://login.evil.com/a") == ReputationMatch("host", "evil.com", "feed")
+    assert store.lookup("http://notevil.com/") is None
+    assert store.lookup("http://docs.example.org/forms/x") == ReputationMatch(
+        "url", "http://docs.example.org/forms/x", "feed")
+    assert store.lookup("http://docs.example.org/forms/y") is None
+    assert store.lookup("http://example.org/") is None
+
+
+def test_urls_match_across_http_and_https(tmp_path):
+    store = ReputationStore(str(tmp_path))
+    store.update("feed", ["https://a.example/login", "http://b.example/login"])
+    for url in ("http://a.example/login", "https://a.example/login",
+                "http://b.example/login", "https://b.example/login"):
+        match = store.lookup(url)
+        assert match is not None and match.value == url
+
+
+def test_removals_delist_and_a_later_add_wins(tmp_path):
+    store = ReputationStore(str(tmp_path))
+    store.update("feed", ["evil.com", "bad.net"])
+    result = store.update("feed", ["bad.net"], removed=["evil.com", "bad.net"])
+    assert (result["added"], result["removed"]) == (1, 1)
+    assert store.lookup("http://evil.com/") is None
+    assert store.lookup("http://bad.net/") is not None
+
+    store.update("other", ["evil.com"])
+    assert store.lookup("http://evil.com/").source == "other"
+
+
+def test_compaction_keeps_every_lookup(tmp_path):
+    store = ReputationStore(str(tmp_path))
+    listed = []
+    for i in range(MAX_DELTAS + 1):
+        listed.append(f"site{i}.example")
+        store.update("feed", [f"site{i}.example", f"gone{i}.example"], removed=[f"gone{i - 1}.example"])
+    expected = [store.lookup(f"http://{host}/") for host in listed + ["gone0.example", f"gone{MAX_DELTAS}.example"]]
+
+    result = store.update("feed", ["site-last.example"])
+    assert result["compacted"]
+    chain = store.read_manifest()["sources"]["feed"]
+    assert len(chain) == 1
+    # Only the compacted base is left on disk
+    assert sorted(f for f in os.listdir(str(tmp_path)) if f.endswith(".add.npy") and ".hosts" not in f
+                  and ".urlhosts" not in f) == [chain[0]["name"] + ".add.npy"]
+
+    assert [store.lookup(f"http://{host}/") for host in listed + ["gone0.example", f"gone{MAX_DELTAS}.example"]] \
+        == expected
+    assert expected[-2] is None and expected[-1] is not None
+    assert store.lookup("http://site-last.example/") is not None
+    assert set(store.host_filter_keys()) == set(filter_keys(listed + [f"gone{MAX_DELTAS}.example",
+                                                                      "site-last.example"]))
+
+
+def test_replace_makes_the_feed_the_whole_source(tmp_path):
+    store = ReputationStore(str(tmp_path))
+    store.update("feed", ["old.example"])
+    store.update("feed", ["older.example"])
+    assert store.replace("feed", ["new.example"])["entries"] == 1
+    assert len(store.read_manifest()["sources"]["feed"]) == 1
+    assert store.lookup("http://old.example/") is None
+    assert store.lookup("http://new.example/") is not None
+
+    store.drop_source("feed")
+    assert store.lookup("http://new.example/") is None
+
+
+def test_readers_pick_up_another_writers_changes(tmp_path):
+    writer = ReputationStore(str(tmp_path))
+    reader = ReputationStore(str(tmp_path), check_seconds=0)
+    assert reader.lookup("http://evil.com/") is None
+    writer.update("feed", ["evil.com"])
+    assert reader.lookup("http://evil.com/") is not None
+    assert reader.version == writer.version == 1
+
+
+def test_invalid_source_names_are_refused(tmp_path):
+    store = ReputationStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.update("../feed", ["evil.com"])
+
+
+def test_read_feed_formats(tmp_path):
+    feed = tmp_path / "feed.txt"
+    feed.write_text("# comment\n0.0.0.0 evil.com\n1,bad.net\nhttp://x.example/a,b\n\n")
+    assert list(read_feed(str(feed))) == ["evil.com", "bad.net", "http://x.example/a,b"]
+
+
+def test_a_listed_url_is_high_risk(tmp_path, monkeypatch):
+    store = ReputationStore(str(tmp_path))
+    store.update("openphish", ["https://docs.example.org/forms/x"])
+    monkeypatch.setattr(pipeline, "REPUTATION", store)
+
+    verdicts = pipeline.reputation_verdicts(["http://docs.example.org/forms/x", "http://docs.example.org/"])
+    assert list(verdicts) == ["http://docs.example.org/forms/x"]
+    verdict = verdicts["http://docs.example.org/forms/x"]
+    assert (verdict["riskScore"], verdict["status"]) == (0.99, "high_risk")
+    assert verdict["meta"]["reputation"] == {"kind": "url", "value": "http://docs.example.org/forms/x",
+                                             "source": "openphish"}
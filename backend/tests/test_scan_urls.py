@@ -0,0 +1,84 @@
+import argparse
+import io
+import json
+
+import pytest
+
+import scan_urls
+
+
+def read(text, fmt="csv", column="url"):
+    return list(scan_urls.read_urls(io.StringIO(text), fmt, column, "url"))
+
+
+def test_csv_without_a_header_row_keeps_the_first_url():
+    assert read("https://a.com/x,1\nhttps://b.com,2\n", column="0") == ["https://a.com/x", "https://b.com"]
+    assert read("evil.example/login,1\nb.com,2\n", column="0") == ["evil.example/login", "b.com"]
+
+
+def test_csv_header_rows_are_not_records():
+    assert read("link,hits\nhttps://a.com,1\n,2\n", column="0") == ["https://a.com", None]
+    assert read("id,url\n1,https://a.com\n2\n") == ["https://a.com", None]
+    with pytest.raises(SystemExit):
+        read("id,link\n1,https://a.com\n")
+
+
+def options(tmp_path, **overrides):
+    values = dict(input=str(tmp_path / "in.txt"), output=str(tmp_path / "out.jsonl"), format=None,
+                  column="url", field="url", workers=0, chunk_size=2, no_cascade=False, resume=False,
+                  skip=0, quiet=True)
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
+URLS = ["https://a.com/1", "https://b.com/", "https://a.com/1", "#comment", "http://c.com/x",
+        "https://d.com", "HTTPS://B.com", "https://e.com/y", "https://f.com", "https://g.com/z"]
+
+
+def output_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [(line["line"], line["key"]) for line in map(json.loads, f)]
+
+
+def test_resume_continues_an_interrupted_scan(tmp_path, monkeypatch):
+    (tmp_path / "in.txt").write_text("\n".join(URLS) + "\n")
+    scan_urls.scan(options(tmp_path, output=str(tmp_path / "full.jsonl")))
+    expected = output_lines(tmp_path / "full.jsonl")
+    assert [key for _, key in expected] == ["https://a.com/1", "https://b.com", "http://c.com/x", "https://d.com",
+                                            "https://e.com/y", "https://f.com", "https://g.com/z"]
+
+    # Checkpoint after every chunk, and fail on the third chunk
+    monkeypatch.setattr(scan_urls, "CHECKPOINT_SECONDS", 0.0)
+    real_scan_chunk = scan_urls.scan_chunk
+    calls = []
+
+    def failing(keys, urls):
+        calls.append(keys)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return real_scan_chunk(keys, urls)
+
+    monkeypatch.setattr(scan_urls, "scan_chunk", failing)
+    with pytest.raises(KeyboardInterrupt):
+        scan_urls.scan(options(tmp_path))
+    checkpoint = scan_urls.read_checkpoint(str(tmp_path / "out.jsonl"))
+    # Two chunks of two distinct URLs: up to and including "https://d.com" (record 5)
+    assert checkpoint["records"] == 6
+    # A half-written line past the checkpoint is cut off on resume
+    with open(tmp_path / "out.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"url": "https://d.com", "ke')
+
+    monkeypatch.setattr(scan_urls, "scan_chunk", real_scan_chunk)
+    summary = scan_urls.scan(options(tmp_path, resume=True))
+    assert output_lines(tmp_path / "out.jsonl") == expected
+    # "HTTPS://B.com" (record 6) is still a duplicate of what was written before the stop
+    assert summary["scored"] == 3
+    assert scan_urls.read_checkpoint(str(tmp_path / "out.jsonl"))["complete"] is True
+
+
+def test_resume_refuses_another_inputs_checkpoint(tmp_path):
+    (tmp_path / "in.txt").write_text("https://a.com\n")
+    (tmp_path / "other.txt").write_text("https://b.com\n")
+    scan_urls.scan(options(tmp_path))
+    with pytest.raises(SystemExit):
+        scan_urls.scan(options(tmp_path, input=str(tmp_path / "other.txt"), resume=True))
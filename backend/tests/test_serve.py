@@ -0,0 +1,74 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork") or not os.path.isdir("/proc"),
+                                reason="serve.py forks; worker pids come from /proc")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return set(map(int, f.read().split()))
+
+
+def wait_for(predicate, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if predicate():
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise AssertionError("timed out")
+
+
+def post(port, path, body):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+
+def test_forked_workers_serve_respawn_and_stop():
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", "2", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        wait_for(lambda: urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=2).status == 200)
+        workers = children(server.pid)
+        assert len(workers) == 2
+
+        verdict = post(port, "/analyze-url", {"url": "http://paypa1-login.xyz/verify"})
+        assert verdict["status"] != "safe" and verdict["meta"]["modelVersion"]
+
+        # A dead worker is replaced, and the others keep serving
+        dead = min(workers)
+        os.kill(dead, signal.SIGKILL)
+        wait_for(lambda: len(children(server.pid) - {dead}) == 2)
+        assert post(port, "/analyze-url", {"url": "https://github.com/"})["status"] == "safe"
+
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=30) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+        server.stderr.close()
@@ -0,0 +1,99 @@
+import random
+from difflib import SequenceMatcher
+
+from detectors.similarity_index import SimilarityIndex, levenshtein_bits, pattern_bits
+
+BRANDS = ["google", "facebook", "amazon", "paypal", "microsoft", "apple", "instagram"]
+
+
+def levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+    return row[-1]
+
+
+def synthetic_brands(n, rng):
+    syllables = ["ba", "co", "de", "fi", "go", "ka", "li", "mo", "pa", "ri", "sa", "te", "an", "er", "st", "ex"]
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 7)))[:rng.randint(4, 14)])
+    return sorted(words)
+
+
+def mutate(word, rng):
+    chars = list(word)
+    for _ in range(rng.randint(0, 4)):
+        i = rng.randrange(len(chars) + 1)
+        op = rng.random()
+        if op < 0.4 and chars:
+            chars[min(i, len(chars) - 1)] = rng.choice("abcdefgikmoprst01-")
+        elif op < 0.7:
+            chars.insert(i, rng.choice("abcdeilmnoprst01"))
+        elif chars:
+            del chars[min(i, len(chars) - 1)]
+    return "".join(chars) + ("secure" if rng.random() < 0.2 else "")
+
+
+def test_levenshtein_bits_matches_the_dynamic_program():
+    rng = random.Random(1)
+    for _ in range(500):
+        a = "".join(rng.choice("abc") for _ in range(rng.randint(1, 12)))
+        b = "".join(rng.choice("abc") for _ in range(rng.randint(0, 12)))
+        assert levenshtein_bits(pattern_bits(a), len(a), b) == levenshtein(a, b)
+
+
+def test_lookup_finds_every_word_within_the_cutoff():
+    rng = random.Random(2)
+    index = SimilarityIndex(BRANDS + synthetic_brands(150, rng), max_distance=2)
+    for _ in range(200):
+        term = mutate(rng.choice(BRANDS), rng)
+        expected = {w for w in index._words if levenshtein(term, w) <= 2}
+        assert {w for w, _ in index.lookup(term)} == expected
+
+
+def test_first_is_the_earliest_listed_brand_not_the_nearest():
+    index = SimilarityIndex(["paypal", "paypalx"], max_distance=2)
+    # "paypalx" is at distance 1, "paypal" at 2: the loop over the list stops at "paypal"
+    assert index.first("paypalxy") == ("paypal", 2)
+    assert index.nearest("paypalxy") == ("paypalx", 1)
+    # Exact matches are skipped
+    assert index.first("paypal") == ("paypalx", 1)
+
+
+def test_ratio_candidates_drop_no_brand_that_passes_the_ratio_test():
+    rng = random.Random(3)
+    brands = BRANDS + synthetic_brands(200, rng)
+    index = SimilarityIndex(brands, max_distance=2)
+    for _ in range(600):
+        term = mutate(rng.choice(brands), rng)
+        expected = {w for w in index._words if SequenceMatcher(None, term, w).ratio() > 0.8}
+        found = index.ratio_candidates(term, 0.8)
+        assert expected <= set(found), term
+        assert found == sorted(found, key=brands.index)
+
+
+def test_ratio_candidates_of_long_labels_use_the_shared_characters():
+    index = SimilarityIndex(BRANDS, max_distance=2)
+    assert index.ratio_candidates("amaz0nsecure", 0.8) == []
+    assert index.ratio_candidates("instagrarn", 0.8) == ["instagram"]
+    assert index.ratio_candidates("micros0ft-", 0.8) == ["microsoft"]
+
+
+def test_words_can_be_added_after_the_index_is_built():
+    index = SimilarityIndex(["paypal"], max_distance=2)
+    assert index.lookup("netfl1x") == []
+    index.add("netflix")
+    assert index.lookup("netfl1x") == [("netflix", 1)]
+    assert len(index) == 2
+
+
+def test_url_rules_flag_typosquats_of_listed_brands():
+    from detectors.url_detector import analyze_url
+
+    assert "Possible typosquatting of 'paypal'" in analyze_url("http://paypa1.com/login")[2]
+    assert "Possible typosquatting of 'google'" in analyze_url("https://gooogle.com/")[2]
+    assert analyze_url("https://paypal.com/")[2] == ["Trusted domain"]
+    assert not any("typosquatting" in r for r in analyze_url("https://example.com/")[2])
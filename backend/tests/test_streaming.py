@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+from core.executor import PoolSaturated
+from core.streaming import looks_like_url, parse_record, split_lines, stream_verdicts
+
+
+def classify(value):
+    if isinstance(value, str):
+        return "url", value.strip()
+    if "url" in value:
+        return "url", value["url"]
+    if "body" in value:
+        return "email", value["body"]
+    return None, "Record needs a 'url' or 'body'"
+
+
+def parse(text):
+    return parse_record(0, text.encode(), classify)
+
+
+def test_objects_and_urls_are_records():
+    record = parse('{"url": "https://a.com/x", "id": 7}')
+    assert (record.kind, record.payload, record.record_id) == ("url", "https://a.com/x", 7)
+    assert parse("https://a.com/x").payload == "https://a.com/x"
+    assert parse("example.org/login").kind == "url"
+    assert parse('"http://b.com"').payload == "http://b.com"
+    assert parse("1.2.3.4/login").kind == "url"
+
+
+def test_non_object_json_and_non_urls_are_errors():
+    for text in ("null", "123", "1.5", "true", "[1, 2]", '"x"', "hello world", "localhost", "ftp://a.com/"):
+        record = parse(text)
+        assert record.kind is None, text
+        assert isinstance(record.payload, str)
+    assert parse("{broken").payload == "Invalid JSON"
+    assert parse('{"other": 1}').payload == "Record needs a 'url' or 'body'"
+
+
+def test_looks_like_url():
+    assert looks_like_url("https://x") and looks_like_url("a.b")
+    assert not looks_like_url("a b.com") and not looks_like_url("...") and not looks_like_url("https://")
+
+
+def test_over_long_lines_are_reported_once_and_skipped():
+    async def body():
+        for data in (b"short\n" + b"x" * 30, b"y" * 30 + b"\nnext\n", b"tail"):
+            yield data
+
+    async def collect():
+        return [item async for item in split_lines(body(), 20)]
+
+    assert asyncio.run(collect()) == [(b"short", False), (b"", True), (b"next", False), (b"tail", False)]
+
+
+def run_stream(lines, runners, submit, **options):
+    async def body():
+        for line in lines:
+            yield (line + "\n").encode()
+
+    async def collect():
+        out = b""
+        async for data in stream_verdicts(body(), classify, runners, submit, **{
+            "chunk_records": 2, "chunk_bytes": 1 << 20, "max_in_flight": 2, "max_record_bytes": 1000, **options,
+        }):
+            out += data
+        return [json.loads(line) for line in out.decode().splitlines()]
+
+    return asyncio.run(collect())
+
+
+async def inline(fn, arg):
+    return fn(arg)
+
+
+RUNNERS = {
+    "url": lambda urls: [{"status": "safe", "value": u} for u in urls],
+    "email": lambda bodies: [{"status": "safe", "value": b} for b in bodies],
+}
+
+
+def test_stream_answers_in_input_order_with_errors_in_place():
+    out = run_stream(['{"url": "http://a.com", "id": "a"}', "null", '{"body": "hi"}', "b.com", "c.com"],
+                     RUNNERS, inline)
+    *lines, summary = out
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert lines[0] == {"index": 0, "id": "a", "kind": "url", "status": "safe", "value": "http://a.com"}
+    assert "error" in lines[1]
+    assert lines[2]["kind"] == "email" and lines[4]["value"] == "c.com"
+    assert summary["summary"]["urls"] == 3 and summary["summary"]["errors"] == 1
+    assert summary["summary"]["records"] == 5
+
+
+def test_a_saturated_pool_is_retried_not_failed():
+    attempts = []
+
+    async def busy_once(fn, arg):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise PoolSaturated()
+        return fn(arg)
+
+    *lines, summary = run_stream(["a.com"], RUNNERS, busy_once)
+    assert lines[0]["kind"] == "url"
+    assert summary["summary"]["poolRetries"] == 1
+
+
+def test_a_failed_chunk_becomes_error_lines():
+    errors = []
+
+    async def broken(fn, arg):
+        raise RuntimeError("boom")
+
+    *lines, summary = run_stream(["a.com", "b.com"], RUNNERS, broken, on_error=errors.append)
+    assert [line["error"] for line in lines] == ["Server error: boom"] * 2
+    assert len(errors) == 1
@@ -0,0 +1,41 @@
+from detectors import train_url_model
+from detectors.export_url_model import SAMPLE_URLS
+from detectors.model_artifact import load_artifact
+
+HOLDOUT_CSV = "backend/data/model_holdout.csv"
+
+
+def test_holdout_split_is_by_url():
+    urls = [f"http://site{i}.example/" for i in range(1000)]
+    held = [u for u in urls if train_url_model.is_holdout(u)]
+    assert held == [u for u in urls if train_url_model.is_holdout(u)]
+    assert 100 < len(held) < 300
+
+
+def test_featurize_chunk_keeps_one_side_of_the_split():
+    urls = [f"http://site{i}.example/" for i in range(50)]
+    labels = [i % 2 for i in range(50)]
+    params = {"nFeatures": 2 ** 10, "ngramRange": [1, 3], "lowercase": True}
+
+    X_train, y_train, _ = train_url_model.featurize_chunk(urls, labels, False, params)
+    X_test, y_test, _ = train_url_model.featurize_chunk(urls, labels, True, params)
+    assert X_train.shape[0] + X_test.shape[0] == 50
+    assert X_test.shape[0] == sum(train_url_model.is_holdout(u) for u in urls)
+    assert X_train.shape[1] == 2 ** 10
+    assert len(y_train) == X_train.shape[0] and len(y_test) == X_test.shape[0]
+
+
+def test_train_stream_sees_every_training_row_once(tmp_path, capsys):
+    df = train_url_model.load_dataset(HOLDOUT_CSV)
+    train_rows = sum(not train_url_model.is_holdout(u) for u in df["url"])
+
+    for chunk_rows in (7, 1000):
+        path = str(tmp_path / f"model-{chunk_rows}")
+        manifest = train_url_model.train_stream(HOLDOUT_CSV, path, chunk_rows=chunk_rows, workers=2)
+        assert manifest["backend"] == "linear_hashing"
+        assert manifest["trainedRows"] == train_rows
+
+        model, vectorizer, _ = load_artifact(path)
+        assert model.predict_proba(vectorizer.transform(SAMPLE_URLS)).shape == (len(SAMPLE_URLS), 2)
+
+    assert "holdout rows" in capsys.readouterr().out
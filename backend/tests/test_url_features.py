@@ -0,0 +1,84 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from detectors.export_url_model import SAMPLE_URLS
+from detectors.model_artifact import export_hgb_features, load_artifact
+from detectors.url_features import (
+    FEATURE_NAMES,
+    HOST_FEATURE_CACHE,
+    URLFeatureVectorizer,
+    rule_risk,
+    shannon_entropy,
+    url_features,
+)
+
+URLS = SAMPLE_URLS + [
+    "http://paypa1.com/a?x=1",
+    "http://paypa1.com/b?session=" + "A" * 60,
+    "https://login.secure.bank.example.co.uk/",
+    "http://[2001:db8::1]/admin",
+]
+
+
+def test_a_batch_gives_the_same_rows_as_one_url_at_a_time():
+    HOST_FEATURE_CACHE.clear()
+    batch = url_features(URLS)
+    HOST_FEATURE_CACHE.clear()
+    single = np.vstack([url_features([u]) for u in URLS])
+    assert batch.shape == (len(URLS), len(FEATURE_NAMES))
+    assert np.array_equal(batch, single)
+    assert url_features([]).shape == (0, len(FEATURE_NAMES))
+
+
+def test_feature_values():
+    X = url_features(["http://192.168.0.10/@secure-bank/login.php",
+                      "http://paypa1.com/b?session=" + "A" * 60,
+                      "https://login.secure.bank.example.co.uk/"])
+    ip, typo, deep = (dict(zip(FEATURE_NAMES, row)) for row in X)
+
+    assert ip["ip_host"] == 1 and ip["at_sign"] == 1 and ip["https"] == 0
+    assert typo["brand_typos"] == 1 and typo["query_params"] == 1
+    assert typo["suspicious_params"] == 1 and typo["long_param_values"] == 1
+    assert deep["subdomains"] == 3 and deep["https"] == 1 and deep["ip_host"] == 0
+
+
+def test_shannon_entropy_matches_the_per_string_formula():
+    strings = ["", "a", "aaaa", "abcd", "paypa1", "xn--80ak6aa92e", "日本語日本"]
+
+    def entropy(s):
+        return -sum(c / len(s) * math.log2(c / len(s)) for c in Counter(s).values()) if s else 0.0
+
+    assert np.allclose(shannon_entropy(strings), [entropy(s) for s in strings])
+
+
+def test_rule_risk_is_the_weighted_rule_score():
+    X = url_features(["https://www.google.com/",
+                      "http://paypa1-login.xyz/verify?token=abc",
+                      "http://paypa1.com/login"])
+    # http 5, .xyz 5, login/verify/token 3 * 3, token= 5
+    # http 5, paypal typo 15, login 3
+    assert list(rule_risk(X)) == [0, 24, 23]
+
+
+def test_vectorizer_refuses_another_feature_set():
+    assert URLFeatureVectorizer().params() == {"features": FEATURE_NAMES}
+    with pytest.raises(ValueError):
+        URLFeatureVectorizer(FEATURE_NAMES[:-1])
+
+
+def test_exported_hgb_model_matches_sklearn(tmp_path):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    X = url_features(URLS * 4)
+    y = (rule_risk(X) > 10).astype(int)
+    model = HistGradientBoostingClassifier(max_iter=20, min_samples_leaf=2, random_state=0).fit(X, y)
+
+    path = str(tmp_path / "hgb")
+    export_hgb_features(model, URLFeatureVectorizer(), path)
+    compact_model, vectorizer, manifest = load_artifact(path)
+    assert manifest["backend"] == "hgb_features"
+    assert np.allclose(compact_model.predict_proba(vectorizer.transform(URLS))[:, 1],
+                       model.predict_proba(url_features(URLS))[:, 1], atol=1e-9)
@@ -0,0 +1,99 @@
+import json
+import multiprocessing
+import sqlite3
+import threading
+
+from core.verdict_store import MAX_PARAMS, VerdictStore
+
+
+def verdict(score, version="v1", **meta):
+    return {"riskScore": score, "status": "safe", "reasons": [], "meta": {"modelVersion": version, **meta}}
+
+
+def test_verdicts_are_keyed_by_model_version(tmp_path):
+    store = VerdictStore(str(tmp_path / "v.db"))
+    assert store.put_many([("a", verdict(0.1)), ("b", verdict(0.2))], "v1") == 2
+
+    assert store.get_many(["a", "b", "a", "c"], "v1") == {"a": verdict(0.1), "b": verdict(0.2)}
+    assert store.get_many(["a", "b"], "v2") == {}
+    assert (store.hits, store.misses) == (2, 3)
+
+    store.put_many([("a", verdict(0.5, "v2"))], "v2")
+    assert store.get_many(["a"], "v1") == {}
+    assert store.get_many(["a"], "v2") == {"a": verdict(0.5, "v2")}
+
+
+def test_expired_rows_are_ignored_and_purged(tmp_path):
+    store = VerdictStore(str(tmp_path / "v.db"), ttl=60)
+    store.put_many([("old", verdict(0.1))], "v1", ttl=-1)
+    store.put_many([("new", verdict(0.2))], "v1")
+    store.put_many([("other", verdict(0.3))], "v0")
+
+    assert store.get_many(["old", "new"], "v1") == {"new": verdict(0.2)}
+    assert store.purge() == 1
+    assert len(store) == 2
+    assert store.purge(keep_version="v1") == 1
+    assert len(store) == 1
+
+
+def test_lookups_are_split_under_the_parameter_limit(tmp_path):
+    store = VerdictStore(str(tmp_path / "v.db"))
+    keys = [f"http://site{i}.example/" for i in range(2 * MAX_PARAMS + 5)]
+    store.put_many(((k, verdict(0.1)) for k in keys), "v1")
+    assert len(store.get_many(keys, "v1")) == len(keys)
+
+
+def _write_from_child(path, key):
+    VerdictStore(path).put_many([(key, verdict(0.9))], "v1")
+
+
+def test_threads_and_processes_share_one_file(tmp_path):
+    path = str(tmp_path / "v.db")
+    store = VerdictStore(path)
+    store.get_many(["warm"], "v1")  # the parent's connection must not leak into the child
+
+    threads = [threading.Thread(target=store.put_many, args=([(f"t{i}", verdict(0.1))], "v1")) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    child = multiprocessing.get_context("fork").Process(target=_write_from_child, args=(path, "child"))
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+
+    assert len(store.get_many([f"t{i}" for i in range(8)] + ["child"], "v1")) == 9
+
+
+def test_a_broken_file_is_a_miss_not_a_failure(tmp_path):
+    store = VerdictStore(str(tmp_path / "v.db"))
+    store.put_many([("a", verdict(0.1))], "v1")
+    store._connect().execute("DROP TABLE verdicts")
+
+    assert store.get_many(["a"], "v1") == {}
+    assert store.put_many([("a", verdict(0.1))], "v1") == 0
+    assert store.purge() == 0
+    assert store.errors == 3
+
+
+def test_warm_start_loads_only_current_verdicts(tmp_path):
+    lines = [
+        {"key": "a", **verdict(0.1)},
+        {"key": "b", **verdict(0.2, "v0")},
+        {"key": "c", **verdict(0.3, version=None, cascade="rules")},
+        {"key": "d", **verdict(0.0, error="RuntimeError")},
+        {"url": "no key"},
+    ]
+    source = tmp_path / "scan.jsonl"
+    source.write_text("\n".join(json.dumps(line) for line in lines) + "\nnot json\n")
+
+    store = VerdictStore(str(tmp_path / "v.db"))
+    assert store.warm_start(str(source), "v1") == {"loaded": 2, "stale": 2, "invalid": 2}
+    assert set(store.get_many(["a", "b", "c", "d"], "v1")) == {"a", "c"}
+
+
+def test_the_schema_is_wal(tmp_path):
+    path = str(tmp_path / "v.db")
+    VerdictStore(path)
+    assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
@@ -3,14 +3,32 @@ function safeText(el) {
   return (el?.innerText || el?.textContent || "").trim();
 }
 
+// Links sent to /analyze-page; the backend scores them by priority within its time budget
+const MAX_PAGE_LINKS = 1000;
+
 function collectPageSignals() {
   const title = document.title || "";
   const text = (document.body?.innerText || "").slice(0, 3000);
   const hasPasswordForm = !!document.querySelector('input[type="password"]');
-  const links = Array.from(document.querySelectorAll("a[href]"))
+  const hrefs = Array.from(document.querySelectorAll("a[href]"))
     .map((a) => a.href)
     .filter((h) => h.startsWith("http"));
-  return { title, textSample: text, hasPasswordForm, linkCount: links.length };
+  // Same link repeated in nav, body and footer: send it once (fragment ignored)
+  const links = Array.from(new Set(hrefs.map((h) => h.split("#")[0]))).slice(0, MAX_PAGE_LINKS);
+  // form.action is absolute (the page URL when the attribute is missing)
+  const forms = Array.from(document.forms).map((f) => ({
+    action: typeof f.action === "string" ? f.action : "",
+    hasPassword: !!f.querySelector('input[type="password"]'),
+  }));
+  return {
+    url: location.href,
+    title,
+    textSample: text,
+    hasPasswordForm,
+    linkCount: hrefs.length,
+    links,
+    forms,
+  };
 }
 
 function isGmail() {
@@ -14,8 +14,10 @@ import {
   Check,
   Settings,
 } from "lucide-react";
+import { loadDomainFilter, localDecision, syncDomainFilter } from "./domainFilter";
 
 const API_ANALYZE_URL = "http://127.0.0.1:8000/analyze-url";
+const API_ANALYZE_PAGE = "http://127.0.0.1:8000/analyze-page";
 const API_ANALYZE_EMAIL = "http://127.0.0.1:8000/analyze-email";
 
 const App = () => {
@@ -93,6 +95,28 @@ const App = () => {
     });
   };
 
+  // ---------------------------
+  // URL: Page signals from content.js (links, forms) for /analyze-page
+  // ---------------------------
+  // null when the tab has no content script (chrome:// pages, the Web Store)
+  const fetchPageSignals = () =>
+    new Promise((resolve) => {
+      if (!isChromeExt() || !chrome?.tabs?.query || !chrome?.tabs?.sendMessage) return resolve(null);
+
+      chrome.tabs.query({ active: true, currentWindow: true }, (tabs) => {
+        const tabId = tabs?.[0]?.id;
+        if (!tabId) return resolve(null);
+
+        chrome.tabs.sendMessage(tabId, { type: "GET_PAGE_SIGNALS" }, (res) => {
+          if (chrome.runtime.lastError) {
+            console.warn("GET_PAGE_SIGNALS error:", chrome.runtime.lastError.message);
+            return resolve(null);
+          }
+          resolve(res?.signals || null);
+        });
+      });
+    });
+
   // ---------------------------
   // EMAIL: Read open email from page (Gmail)
   // ---------------------------
@@ -127,6 +151,8 @@ const App = () => {
   // أول ما popup يفتح: هات URL
   useEffect(() => {
     fetchActiveTabUrl();
+    // Refresh the local trusted / known-bad filter in the background
+    syncDomainFilter();
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
@@ -143,7 +169,24 @@ const App = () => {
   const analyzeCurrentUrl = async (url) => {
     try {
       setIsUrlAnalyzing(true);
-      const response = await axios.post(API_ANALYZE_URL, { url: url || "" });
+
+      // On the local trusted list (exact, not a Bloom filter) and no URL on the
+      // host is listed: the backend would answer "Trusted domain". Known-bad,
+      // unknown, or URL-listed hosts still go to the backend.
+      if (localDecision(await loadDomainFilter(), url || "") === "trusted") {
+        setUrlRiskScore(0);
+        setUrlStatus("safe");
+        setUrlReasons(["Trusted domain"]);
+        return;
+      }
+
+      // The whole page (its links and form targets too) when content.js can
+      // read it; the URL alone otherwise, or when the tab moved on meanwhile
+      const signals = await fetchPageSignals();
+      const samePage = signals?.url && signals.url.split("#")[0] === (url || "").split("#")[0];
+      const response = samePage
+        ? await axios.post(API_ANALYZE_PAGE, signals)
+        : await axios.post(API_ANALYZE_URL, { url: url || "" });
 
       setUrlRiskScore(typeof response.data.riskScore === "number" ? response.data.riskScore : 0);
       setUrlStatus(response.data.status || "safe");
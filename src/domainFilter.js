@@ -0,0 +1,219 @@
+/* global chrome */
+
+// Local copy of the backend's trusted domain list and known-bad domain
+// filter (GET /domain-filter, backend/detectors/domain_filter.py), so most
+// navigations are decided without a request to /analyze-url.
+//
+// The trusted list is exact: only the bad filter is a Bloom filter, since
+// a false positive there costs a request, never a wrong "safe". It has its
+// own version and is sent whole only once: afterwards the backend answers
+// "unchanged" or the domains added and removed.
+//
+// urlHosts is a second Bloom filter: hosts with URL-level reputation
+// entries (a listed docs.google.com/forms/... page). A trusted host in it,
+// or any trusted host while it is null (unknown), still goes to the backend.
+//
+// Same hashing as the backend:
+//   key = host, lowercased, trailing "." and leading "www." removed (UTF-8)
+//   h1 = crc32(key), h2 = fnv1a32(key) | 1
+//   bit i of k = (h1 + i * h2) mod m, bit p = byte p >> 3, mask 1 << (p & 7)
+
+export const API_DOMAIN_FILTER = "http://127.0.0.1:8000/domain-filter";
+
+const STORAGE_KEY = "safesurfDomainFilter";
+
+const CRC_TABLE = (() => {
+  const table = new Uint32Array(256);
+  for (let n = 0; n < 256; n++) {
+    let c = n;
+    for (let k = 0; k < 8; k++) c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+    table[n] = c >>> 0;
+  }
+  return table;
+})();
+
+const encoder = new TextEncoder();
+
+const crc32 = (bytes) => {
+  let c = 0xffffffff;
+  for (const b of bytes) c = CRC_TABLE[(c ^ b) & 0xff] ^ (c >>> 8);
+  return (c ^ 0xffffffff) >>> 0;
+};
+
+const fnv1a32 = (bytes) => {
+  let h = 0x811c9dc5;
+  for (const b of bytes) h = Math.imul(h ^ b, 0x01000193) >>> 0;
+  return h >>> 0;
+};
+
+export const normalizeHost = (host) => {
+  let h = (host || "").trim().toLowerCase().replace(/\.+$/, "");
+  if (h.startsWith("www.")) h = h.slice(4);
+  return h;
+};
+
+const fromBase64 = (text) => Uint8Array.from(atob(text || ""), (c) => c.charCodeAt(0));
+
+const toBase64 = (bytes) => {
+  let text = "";
+  for (let i = 0; i < bytes.length; i += 0x8000) {
+    text += String.fromCharCode(...bytes.subarray(i, i + 0x8000));
+  }
+  return btoa(text);
+};
+
+export const bloomHas = (filter, domain) => {
+  const key = normalizeHost(domain);
+  if (!filter?.bytes || !filter.m || !key) return false;
+  const bytes = encoder.encode(key);
+  // BigInt keeps (h1 + i * h2) exact past 2^53
+  const h1 = BigInt(crc32(bytes));
+  const h2 = BigInt(fnv1a32(bytes) | 1) & 0xffffffffn;
+  const m = BigInt(filter.m);
+  for (let i = 0n; i < BigInt(filter.k); i++) {
+    const p = Number((h1 + i * h2) % m);
+    if (!(filter.bytes[p >> 3] & (1 << (p & 7)))) return false;
+  }
+  return true;
+};
+
+// "a.b.evil.com" -> ["a.b.evil.com", "b.evil.com", "evil.com"] (never the bare TLD)
+const candidateDomains = (host) => {
+  const labels = host.split(".");
+  const out = [];
+  for (let i = 0; i < Math.max(labels.length - 1, 1); i++) out.push(labels.slice(i).join("."));
+  return out;
+};
+
+// "bad" (ask the backend: could be a false positive), "trusted" (exact match), or null (unknown)
+export const localDecision = (filters, url) => {
+  if (!filters) return null;
+  let host;
+  try {
+    host = normalizeHost(new URL(url).hostname);
+  } catch {
+    return null;
+  }
+  if (!host) return null;
+  const domains = candidateDomains(host);
+  if (domains.some((d) => bloomHas(filters.bad, d))) return "bad";
+  if (!domains.some((d) => filters.trusted.has(d))) return null;
+  // The host may be fine but one of its URLs listed: only the backend checks paths
+  if (!filters.urlHosts || domains.some((d) => bloomHas(filters.urlHosts, d))) return null;
+  return "trusted";
+};
+
+const trustedSet = (part) => new Set((part?.domains || []).map(normalizeHost));
+
+// New trusted Set, or null when the update doesn't apply to our copy
+const applyTrusted = (filters, part) => {
+  if (!part) return null;
+  if (part.domains) return trustedSet(part);
+  if (part.unchanged) return filters?.trustedVersion === part.version ? filters.trusted : null;
+  if (!filters || filters.trustedVersion !== part.since) return null;
+  const trusted = new Set(filters.trusted);
+  for (const d of part.removed) trusted.delete(normalizeHost(d));
+  for (const d of part.added) trusted.add(normalizeHost(d));
+  return trusted;
+};
+
+const applyPart = (old, part) => {
+  if (part.bits !== undefined) return { m: part.m, k: part.k, bytes: fromBase64(part.bits) };
+  // Delta: overwrite the changed little-endian 32-bit words
+  const bytes = old.bytes.slice();
+  const words = new DataView(bytes.buffer);
+  const index = new DataView(fromBase64(part.words.index).buffer);
+  const value = new DataView(fromBase64(part.words.value).buffer);
+  for (let j = 0; j < index.byteLength; j += 4) {
+    words.setUint32(index.getUint32(j, true) * 4, value.getUint32(j, true), true);
+  }
+  return { m: part.m, k: part.k, bytes };
+};
+
+// urlHosts: null stays null; a delta needs our copy (undefined when it doesn't apply)
+const applyUrlHosts = (old, part) => {
+  if (!part) return null;
+  if (part.bits === undefined && !old) return undefined;
+  return applyPart(old, part);
+};
+
+export const applyFilterUpdate = (filters, payload) => {
+  if (payload.unchanged) return filters;
+  if (!payload.full && (!filters || filters.version !== payload.since)) return null;
+  const trusted = applyTrusted(filters, payload.trusted);
+  if (!trusted) return null;
+  const urlHosts = applyUrlHosts(filters?.urlHosts, payload.urlHosts);
+  if (urlHosts === undefined) return null;
+  return {
+    version: payload.version,
+    trustedVersion: payload.trusted.version,
+    trusted,
+    bad: applyPart(filters?.bad, payload.bad),
+    urlHosts,
+  };
+};
+
+const hasChromeStorage = () => typeof chrome !== "undefined" && chrome?.storage?.local;
+
+const serialize = (filters) => ({
+  version: filters.version,
+  trusted: { version: filters.trustedVersion, domains: [...filters.trusted] },
+  bad: { m: filters.bad.m, k: filters.bad.k, bits: toBase64(filters.bad.bytes) },
+  urlHosts: filters.urlHosts
+    ? { m: filters.urlHosts.m, k: filters.urlHosts.k, bits: toBase64(filters.urlHosts.bytes) }
+    : null,
+});
+
+// Copies saved before the trusted list was exact and versioned, or before
+// urlHosts existed: refetch
+const deserialize = (stored) =>
+  stored?.version && stored.trusted?.version && Array.isArray(stored.trusted.domains) && "urlHosts" in stored
+    ? {
+        version: stored.version,
+        trustedVersion: stored.trusted.version,
+        trusted: trustedSet(stored.trusted),
+        bad: applyPart(null, stored.bad),
+        urlHosts: applyUrlHosts(null, stored.urlHosts) || null,
+      }
+    : null;
+
+export const loadDomainFilter = async () => {
+  try {
+    if (hasChromeStorage()) return deserialize((await chrome.storage.local.get(STORAGE_KEY))[STORAGE_KEY]);
+    return deserialize(JSON.parse(localStorage.getItem(STORAGE_KEY) || "null"));
+  } catch {
+    return null;
+  }
+};
+
+const saveStored = async (filters) => {
+  try {
+    const data = serialize(filters);
+    if (hasChromeStorage()) await chrome.storage.local.set({ [STORAGE_KEY]: data });
+    else localStorage.setItem(STORAGE_KEY, JSON.stringify(data));
+  } catch (err) {
+    console.warn("Domain filter not saved:", err);
+  }
+};
+
+// Stored filters, updated from the backend (a delta when it still knows our version)
+export const syncDomainFilter = async () => {
+  let filters = await loadDomainFilter();
+  try {
+    // Our trusted version too: a full bad filter doesn't resend a list we hold
+    const query = filters?.version
+      ? `?since=${encodeURIComponent(filters.version)}&trusted=${encodeURIComponent(filters.trustedVersion)}`
+      : "";
+    let response = await fetch(API_DOMAIN_FILTER + query);
+    let updated = applyFilterUpdate(filters, await response.json());
+    if (!updated) {
+      response = await fetch(API_DOMAIN_FILTER);
+      updated = applyFilterUpdate(null, await response.json());
+    }
+    if (updated !== filters) await saveStored(updated);
+    filters = updated;
+  } catch (err) {
+    console.warn("Domain filter sync failed:", err);
+  }
+  return filters;
+};